@@ -1,30 +1,45 @@
 """
 Streamlit WhatsApp Chat Analyzer
 """
-import re
-import os
 import time
 import warnings
 import logging
 import logging.config
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import yaml
-from typing import Dict, Any
 import streamlit as st
-from numpy import sum as npsum
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud, STOPWORDS
-from processor.transformers.chat_eda import WhatsAppProcess, sorted_authors_df,\
-    statistics, process_data, WhatsAppConfig
+import numpy as np
+import pandas as pd
+from processor.transformers.chat_eda import WhatsAppProcess, WhatsAppConfig,\
+    merge_chats
+from processor.transformers.aggregates import member_frequencies,\
+    DailyTotals, day_span, rows_between
+from processor.transformers.message_index import MessageIndex, page_frame
+from processor.transformers.search import SearchIndex
 from processor.graphs.charts import pie_display_emojis, time_series_plot,\
-    message_cluster, most_active_member, most_active_day,\
-    max_words_used, top_media_contributor, who_shared_links,\
-    sentiment_analysis, most_suitable_day, most_suitable_hour
+    message_cluster, top_domains, domains_over_time
+from processor.graphs import display
+from processor.graphs.display import render_pending
+from processor.common.cache import content_hash, get_cache, chart_key
+from processor.common.snapshot import SnapshotStore, describe_upload
+from processor.common.uploads import collect_sources, open_source,\
+    parse_source, attachment_usage
+from processor.common.stopwords import detect_languages
+from processor.common import profiling
 from processor.common.configure import BANNER, TITLE, REPO_URL, FORMAT_BUTTON,\
     HIDE_STREAMLIT_STYLE, MAIN_STYLE, APPLICATION_FEATURE
 
 
 st.set_option('deprecation.showPyplotGlobalUse', False)
 
+# Charts drawn without being opened, the others render on demand
+OPENED_CHARTS = ('most_active_member',)
+
+# Cached chart display on the page
+show_chart = partial(display.show_chart, st)
+show_figure = partial(display.show_figure, st)
+
 warnings.filterwarnings(
     "ignore", message="Glyph 128584 missing from current font.")
 
@@ -61,84 +76,123 @@ st.sidebar.markdown(APPLICATION_FEATURE)
 
 
 
-def add_multilingual_stopwords() -> Dict:
-    """
-    Function read language file stop words and covert
-    them into List of STOPWORDS.
-    Top languages added under stopwords folder.
+def next_page():
+    """Pagination page Increment"""
+    st.session_state.page += 1
 
-    attributes
-    ----------
-    None
 
-    Returns
-    -------
-    set: Distinct list of words
-    """
-    multilingul_list = []
-    for file in os.listdir('configs/stopwords'):
-        stopword = open('configs/stopwords/' + file, "r")
-        for word in stopword:
-            word = re.sub('[\n]', '', word)
-            multilingul_list.append(word)
-    return set(STOPWORDS).union(set(multilingul_list))
-    
+def prev_page():
+    """Pagination page Decrement"""
+    st.session_state.page -= 1
 
-def generate_word_cloud(text: str, title: str) -> Any:
-    """
-    Function takes text as input and transform it to
-    WordCloud display
 
-    attributes
-    ----------
-    text (str): String of words
-    title (str): title Sting
+def first_page():
+    """Pagination back to the first page after a filter change"""
+    st.session_state.page = 0
 
-    Return
-    ------
-    Matplotlib figure for wordcloud
-    """
-    # wordcloud = WordCloud(
-    #   stopwords=stopwords, background_color="white").generate(text)
-    wordcloud = WordCloud(
-        scale=3,
-        width=500,
-        height=330,
-        max_words=200,
-        colormap='tab20c',
-        stopwords=add_multilingual_stopwords(),
-        collocations=True,
-        contour_color='#5d0f24',
-        contour_width=3,
-        font_path='Laila-Regular.ttf',
-        background_color="white").generate(text)
-    # Display the generated image:
-    # the matplotlib way:
-    plt.figure(figsize=(10, 8))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis("off")
-    plt.title(title)
-    st.pyplot()
 
+def jump_to_date():
+    """Pagination page holding the chosen date, set on the next run"""
+    st.session_state.jump = True
 
-def next_page():
-    """Pagination page Increment"""
-    st.session_state.page += 1
 
+def chat_structure(chat_key, kind, config, build):
+    """
+    Lookup structure of a chat, built on first use and kept with the
+    pipeline outputs
+    """
+    pipeline_cache = get_cache(
+        'pipeline', config['cache']['pipeline_megabytes'])
+    key = chart_key(chat_key, kind)
+    structure = pipeline_cache.get(key)
+    if structure is None:
+        structure = build()
+        pipeline_cache.put(key, structure, size=structure.nbytes())
+    return structure
 
-def prev_page():
-    """Pagination page Decrement"""
-    st.session_state.page -= 1
+
+def date_range_filter(totals):
+    """
+    Sidebar date range, None while the whole chat is selected
+    """
+    dates = totals.dates
+    if not len(dates):
+        return None
+    first, last = dates[0].date(), dates[-1].date()
+    picked = st.sidebar.date_input(
+        "Date range", value=(first, last), min_value=first,
+        max_value=last, key='date_range')
+    # Half picked ranges keep the whole chat until the end date is set
+    if len(picked) != 2 or tuple(picked) == (first, last):
+        return None
+    return pd.Timestamp(picked[0]), pd.Timestamp(picked[1])
+
+
+def display_matches(chat, index, found):
+    """
+    Matches of a search per member, against all their messages
+    """
+    counts = index.member_counts(found).to_frame()
+    counts['share_of_messages'] = (
+        counts['matches'] / chat.members['messages'].reindex(counts.index)
+    ).round(3)
+    st.write(f"{len(found)} matching messages")
+    st.dataframe(counts)
 
 
-def pagination_of_dataframe(raw_df):
+def pagination_of_dataframe(chat, chat_key, config, span=None):
     """
-    Display DataFrame in Pagination format
+    Display DataFrame in Pagination format, every page of the chat, of
+    one member or of a search is reachable and only the shown page is
+    read. Searches are limited to the selected date range.
     """
+    raw_df = chat.raw_df
+    page_size = config['browser']['page_size']
+    index = chat_structure(
+        chat_key, 'message_index', config,
+        lambda: MessageIndex.build(chat.raw_df, chat.members.index))
     if "page" not in st.session_state:
         st.session_state.page = 0
+    query = st.text_input(
+        "Search messages: words, prefix* or \"exact phrase\"",
+        key='browse_query', on_change=first_page)
+    col1, col2 = st.columns(2)
+    member = col1.selectbox(
+        "Member", [None] + list(index.member_names),
+        format_func=lambda name: "All members" if name is None else name,
+        key='browse_member', on_change=first_page)
+    day = col2.date_input(
+        "Jump to date", value=index.stamps[0].astype('M8[D]').item(),
+        min_value=index.stamps[0].astype('M8[D]').item(),
+        max_value=index.stamps[-1].astype('M8[D]').item(),
+        key='browse_date', on_change=jump_to_date)
+    found = None
+    if query:
+        texts = chat_structure(
+            chat_key, 'search_index', config,
+            lambda: SearchIndex.build(
+                chat.raw_df, chat.cloud_df, chat.members.index))
+        start, end = day_span(*(span or (None, None)))
+        found = texts.search(
+            query, members=None if member is None else [member],
+            start=start, end=end)
+        display_matches(chat, texts, found)
+    count = index.count(member) if found is None else len(found)
+    pages = max(1, -(-count // page_size))
+    if st.session_state.get('jump'):
+        st.session_state.jump = False
+        moment = pd.Timestamp(day)
+        if found is None:
+            position = index.locate(moment, member)
+        else:
+            # Search results are in timestamp order as well
+            position = int(np.searchsorted(
+                texts.row_stamps[found], np.datetime64(moment)))
+        st.session_state.page = position // page_size
+    # Pages of a longer chat or filter used before may be out of range
+    st.session_state.page = min(max(st.session_state.page, 0), pages - 1)
     col1, _, _, col2, _, col3 = st.columns(6)
-    if st.session_state.page < 10:
+    if st.session_state.page < pages - 1:
         col3.button("Next", on_click=next_page)
     else:
         col3.write("")  # this makes the empty column show up on mobile
@@ -146,11 +200,14 @@ def pagination_of_dataframe(raw_df):
         col1.button("Previous", on_click=prev_page)
     else:
         col1.write("")  # this makes the empty column show up on mobile
-    col2.write(f"Page {1+st.session_state.page} of {5}")
-    start = 10 * st.session_state.page
-    end = start + 10
+    col2.write(f"Page {1+st.session_state.page} of {pages}")
+    page = st.session_state.page
+    if found is None:
+        rows = index.page(page, page_size, member)
+    else:
+        rows = found[page * page_size:(page + 1) * page_size]
     st.write("")
-    st.dataframe(raw_df[["datetime", "name", "message"]].iloc[start:end])
+    st.dataframe(page_frame(raw_df, rows))
     st.markdown("#")
 
 
@@ -172,158 +229,395 @@ def display_statistics(stats):
     st.text("")
 
 
-def chart_display(data_frame):
+def chart_section(title, info, name):
     """
-    Combine Charts display function
+    Chart heading with a toggle, only opened charts are computed
     """
     st.markdown("----")
-    st.header("🔘 Most Active Member")
-    st.info("🔋 Member comparision based on the number of messages\
-        he/she posted in group chat")
-    st.pyplot(most_active_member(data_frame))
-
-    st.markdown("----")
-    st.header("🔘  Most Active Day")
-    st.info("🔋 Member comparision based on the number of messages\
-        he/she posted in group chat whatsapp.r.t Day")
-    st.pyplot(most_active_day(data_frame))
-
-    st.markdown("----")
-    st.header("🔘 Who uses more words in sentences")
-    st.info("🔋 Member uses more number of sentences during the conversation")
-    st.pyplot(max_words_used(data_frame))
-
-    st.markdown("----")
-    st.header("🔘 Who shares Links in group most? ")
-    st.info("🔋 Members who shares internet links of information with others")
-    st.pyplot(who_shared_links(data_frame))
+    st.header(title)
+    st.info(info)
+    return st.checkbox(
+        "Show chart", value=name in OPENED_CHARTS, key=f'show_{name}')
 
-    
-    st.markdown("----")
-    st.header("🔘 Most Active Day ")
-    st.info("🔋 Member who active for suitable Day")
-    st.pyplot(most_suitable_day(data_frame))
-
-    st.markdown("----")
-    st.header("🔘 Most Active Hour")
-    st.info("🔋 Member who active during suitable hours")
-    st.pyplot(most_suitable_hour(data_frame))
-
-    st.markdown("----")
-    st.header("🔘 Member activity Cluster")
-    st.info("🔋 Cluster hover about the total messages, Emoji's, Links, Words\
-        and Letter by individual member")
-    st.write(message_cluster(data_frame))
-
-    st.markdown("----")
-    st.header("🔘 Over the Time Analysis ")
-    st.info("🔋 Group activity over the time whatsapp.r.t to\
-        number of messages")
-    st.write(time_series_plot(data_frame))
 
+def chart_display(
+        chat, chat_key, view_key, members, time_cube, links, images,
+        figures, pending):
+    """
+    Combine Charts display function, member, time and link charts are
+    drawn from the date range view
+    """
+    if chart_section(
+            "🔘 Most Active Member",
+            "🔋 Member comparision based on the number of messages\
+        he/she posted in group chat", 'most_active_member'):
+        show_chart(
+            images, pending, chart_key(view_key, 'most_active_member'),
+            'most_active_member', members)
+
+    if chart_section(
+            "🔘  Most Active Day",
+            "🔋 Member comparision based on the number of messages\
+        he/she posted in group chat whatsapp.r.t Day", 'most_active_day'):
+        show_chart(
+            images, pending, chart_key(view_key, 'most_active_day'),
+            'most_active_day', time_cube)
+
+    if chart_section(
+            "🔘 Who uses more words in sentences",
+            "🔋 Member uses more number of sentences during the conversation",
+            'max_words_used'):
+        show_chart(
+            images, pending, chart_key(view_key, 'max_words_used'),
+            'max_words_used', members)
+
+    if chart_section(
+            "🔘 Who shares Links in group most? ",
+            "🔋 Members who shares internet links of information with others",
+            'who_shared_links'):
+        show_chart(
+            images, pending, chart_key(view_key, 'who_shared_links'),
+            'who_shared_links', links)
+
+    if chart_section(
+            "🔘 Shared link domains",
+            "🔋 Websites the links point to, per member and over the time",
+            'top_domains'):
+        sharers = links['name'].value_counts()
+        sharers = list(sharers[sharers > 0].index)
+        domain_member = st.selectbox(
+            'Links shared by', ['Everyone'] + sharers, key='domain_member')
+        if domain_member == 'Everyone':
+            domain_member = None
+        show_figure(
+            figures, chart_key(view_key, 'top_domains', domain_member),
+            lambda: top_domains(links, domain_member))
+        show_figure(
+            figures, chart_key(view_key, 'domains_over_time'),
+            lambda: domains_over_time(links))
+
+    if chart_section(
+            "🔘 Most Active Day ",
+            "🔋 Member who active for suitable Day", 'most_suitable_day'):
+        show_chart(
+            images, pending, chart_key(view_key, 'most_suitable_day'),
+            'most_suitable_day', time_cube)
+
+    if chart_section(
+            "🔘 Most Active Hour",
+            "🔋 Member who active during suitable hours",
+            'most_suitable_hour'):
+        show_chart(
+            images, pending, chart_key(view_key, 'most_suitable_hour'),
+            'most_suitable_hour', time_cube)
+
+    if chart_section(
+            "🔘 Member activity Cluster",
+            "🔋 Cluster hover about the total messages, Emoji's, Links, Words\
+        and Letter by individual member", 'message_cluster'):
+        show_figure(
+            figures, chart_key(view_key, 'message_cluster'),
+            lambda: message_cluster(members))
+
+    if chart_section(
+            "🔘 Over the Time Analysis ",
+            "🔋 Group activity over the time whatsapp.r.t to\
+        number of messages", 'time_series_plot'):
+        show_figure(
+            figures, chart_key(view_key, 'time_series_plot'),
+            lambda: time_series_plot(time_cube))
+
+    if chart_section(
+            "🔘 Curious about Emoji's ?",
+            "🔋 The most use Emoji's in converstion is show with\
+        larger sector", 'pie_display_emojis'):
+        show_figure(
+            figures, chart_key(chat_key, 'pie_display_emojis'),
+            lambda: pie_display_emojis(chat.data_frame))
+
+
+def import_chat(whatsapp, snapshots, pipeline_cache, uploaded_file):
+    """
+    Process an upload, or only its new tail when it is a re-export
+    extending a chat processed before
+    """
+    upload = describe_upload(whatsapp, uploaded_file)
+    if upload is None:
+        return None, None
+    base = snapshots.find_base(upload, uploaded_file)
+    chat = None if base is None else pipeline_cache.get(base)
+    if base is not None and chat is None:
+        chat = snapshots.load(base)
+    if chat is None:
+        # Streamed in chunks, the upload is never decoded as one string.
+        # The frames are kept: browser, search and charts read the rows,
+        # bounded memory statistics streaming is cli.py --stats-only
+        return whatsapp.process_chat(uploaded_file), upload
+    size = snapshots.upload_size(base)
+    last_message = chat.raw_df[['datetime', 'name', 'message']].iloc[-1]
+    if whatsapp.tail_offset(uploaded_file, size, last_message) is None:
+        # The stored last message goes on past the old export's end
+        return whatsapp.process_chat(uploaded_file), upload
+    uploaded_file.seek(size)
+    tail = whatsapp.process_chat(uploaded_file)
+    uploaded_file.seek(0)
+    if tail is not None:
+        chat = merge_chats(chat, tail)
+    return chat, upload
+
+
+def load_chat(uploaded_file, config, key=None):
+    """
+    Processing pipeline cached by upload content and configuration,
+    in memory and as on-disk snapshots, widget reruns on a loaded chat
+    skip parsing entirely. key is the content hash when already known.
+    """
+    source_config = WhatsAppConfig(**config['whatsapp'])
+    pipeline_cache = get_cache(
+        'pipeline', config['cache']['pipeline_megabytes'])
+    snapshots = SnapshotStore(
+        config['cache']['snapshot_dir'],
+        config['cache']['snapshot_megabytes'])
+    with profiling.stage('load_chat') as probe:
+        if key is None:
+            key = content_hash(uploaded_file, source_config)
+        chat = pipeline_cache.get(key)
+        if chat is None:
+            # Reopened chats and server restarts reuse the disk snapshot
+            chat = snapshots.load(key)
+            if chat is None:
+                chat, upload = import_chat(
+                    WhatsAppProcess(source_config), snapshots,
+                    pipeline_cache, uploaded_file)
+                if chat is not None:
+                    snapshots.save(key, chat, upload)
+            if chat is not None:
+                pipeline_cache.put(key, chat)
+        if chat is not None:
+            probe.rows = len(chat.raw_df)
+    return key, chat
+
+
+def preload_chats(sources, config):
+    """
+    Parse every chat of a multi-chat upload that is not cached yet
+    across a process pool
+    """
+    pipeline_cache = get_cache(
+        'pipeline', config['cache']['pipeline_megabytes'])
+    snapshots = SnapshotStore(
+        config['cache']['snapshot_dir'],
+        config['cache']['snapshot_megabytes'])
+    pending = {
+        source.key: source for source in sources
+        if source.key not in pipeline_cache}
+    if not pending:
+        return
+    # A chat failing to parse leaves the others loaded, it is parsed
+    # again (and reported) once selected
+    with ProcessPoolExecutor(
+            max_workers=config['uploads']['workers']) as executor:
+        futures = {}
+        for key, source in pending.items():
+            # Workers get the chat text only, never the whole archive
+            with open_source(source) as stream:
+                futures[executor.submit(
+                    parse_source, source.label, stream.read(),
+                    config['whatsapp'])] = key
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                chat, upload = future.result()
+            except Exception as diag:
+                logging.error(
+                    "Preloading %s failed: %s", pending[key].label, diag)
+                continue
+            if chat is not None:
+                snapshots.save(key, chat, upload)
+                pipeline_cache.put(key, chat)
+
+
+def display_attachments(raw_df, attachments):
+    """
+    Media statistics from the attachments of an export archive
+    """
+    st.header("🔘 Attachments")
+    kinds = attachments.groupby('kind')['size'].agg(['count', 'sum'])
+    columns = st.columns(max(len(kinds), 1))
+    for column, (kind, row) in zip(columns, kinds.iterrows()):
+        column.metric(
+            kind.title(), int(row['count']),
+            delta=f"{row['sum'] / 2 ** 20:.1f} MB")
+    usage = attachment_usage(raw_df, attachments)
+    if not usage.empty:
+        st.dataframe(usage)
     st.markdown("----")
-    st.header("🔘 Curious about Emoji's ?")
-    st.info("🔋 The most use Emoji's in converstion is show with\
-        larger sector")
-    pie_display = pie_display_emojis(data_frame)
-    st.plotly_chart(pie_display)
 
 
-def file_process(data, config):
+def file_process(uploaded_file, config, attachments=None, key=None):
     """
     Regex passed message format frocessing function
     """
-    # reading source configuration
-    source_config = WhatsAppConfig(**config['whatsapp'])
-    whatsapp = WhatsAppProcess(source_config)
-    message = whatsapp.apply_regex(data)
-    raw_df = process_data(message)
-    data_frame = whatsapp.get_dataframe(raw_df)
-    stats = statistics(raw_df, data_frame)
+    chat_key, chat = load_chat(uploaded_file, config, key)
+    if chat is None:
+        st.error("No messages found, unsupported chat export format")
+        return
+    raw_df, _, stats, cloud_df = chat[:4]
+    members, time_cube, links = chat.members, chat.time_cube, chat.links
+    # Dashboards of a date range come from running totals, not rows
+    totals = chat_structure(
+        chat_key, 'daily_totals', config,
+        lambda: DailyTotals.build(
+            raw_df, chat.data_frame, cloud_df, members.index))
+    span = date_range_filter(totals)
+    view_key = chat_key
+    if span is not None:
+        view_key = chart_key(chat_key, 'date_range', *span)
+        stats = {**stats, **totals.statistics(*span)}
+        members = totals.members_between(*span)
+        time_cube = time_cube.between(*span)
+        # The link table is small, a timestamp mask is enough
+        links = links[rows_between(links['datetime'], *span)]
+    images = get_cache('images', config['cache']['image_megabytes'])
+    figures = get_cache('figures', config['cache']['figure_megabytes'])
+    # Opened charts missing from the image cache, rendered together
+    pending = {}
 
     st.markdown(f'# {stats.get("group_name")}')
 
     st.markdown("----")
 
     # Pagination of dataframe Display
-    pagination_of_dataframe(raw_df)
+    pagination_of_dataframe(chat, chat_key, config, span)
 
     # Display Statistics
     display_statistics(stats)
 
-    # Formation of Word Cloud Dataframe
-    cloud_df = whatsapp.cloud_data(raw_df)
+    # Attachments indexed from an export archive
+    if attachments is not None:
+        display_attachments(raw_df, attachments)
+
+    # Stopwords of every language unless the chat languages are detected
+    languages = None
+    if st.sidebar.checkbox("Stopwords of detected chat languages only"):
+        languages = detect_languages(cloud_df.message)
+        st.sidebar.write("Detected: " + ", ".join(languages))
+
+    if members.empty:
+        st.warning("No messages in the selected date range")
+        return
 
     # Frequently used word and word Cloud display for
     #   Indidvidual member and statitics
     st.header("🔘 Frequently used words")
-    sorted_authors = sorted_authors_df(cloud_df)
+    sorted_authors = members.sort_values(
+        'messages', ascending=False, kind='mergesort').index
     select_author = []
     select_author.append(st.selectbox('', sorted_authors))
-    dummy_df = cloud_df[cloud_df['name'] == select_author[0]]
-    text = " ".join(review for review in dummy_df.message)
 
+    # Member metrics are a lookup in the precomputed summary
+    member = members.loc[select_author[0]]
     col1, col2, col3, col4, col5 = st.columns(5)
 
-    col1.metric(
-        "Posted Messages",
-        dummy_df[dummy_df['name'] == select_author[0]].shape[0])
-    col2.metric(
-        "Emoji's Shared", sum(
-            data_frame[data_frame.name.str.contains(
-                select_author[0][-5:])].emojis.str.len()))
-    col3.metric("Link Shared", int(
-        data_frame[data_frame.name == select_author[0]].urlcount.sum()))
-    col4.metric("Total Words", int(
-        data_frame[data_frame.name == select_author[0]].word_count.sum()))
-    user_df = data_frame[data_frame.name.str.contains(
-        select_author[0][-5:])]
-    average = round(npsum(user_df.word_count)/user_df.shape[0], 2)
-    col5.metric("Average words/Message", average)
-
-    if len(text) != 0:
-        generate_word_cloud(
-            text, "Word Cloud for individual Words")
-    else:
-        generate_word_cloud(
-            "NOWORD", "Word Cloud for individual Words")
-
-    st.markdown("----")
-    st.header("🔘 Words and Phrases frequently used in Chat")
-    st.info("🔋 Frequently used words or phrases by all members in group chat.\
-        Most dicussion occurs around below words or used frequently.")
-    text = " ".join(review for review in cloud_df.message)
-    generate_word_cloud(
-        text, "Word Cloud for Chat words")
-    
-    st.markdown("----")
-    st.header("🔘 Who has Positive Sentiment? ")
-    st.info("🔋 Member sentiment analysis score base on the words used in\
+    col1.metric("Posted Messages", int(member.messages))
+    col2.metric("Emoji's Shared", int(member.emojis))
+    col3.metric("Link Shared", int(member.links))
+    col4.metric("Total Words", int(member.words))
+    col5.metric("Average words/Message", member.average_words)
+
+    if st.checkbox("Show word cloud", key='show_member_word_cloud'):
+        show_chart(
+            images, pending, chart_key(
+                chat_key, 'member_word_cloud', select_author[0], languages),
+            'generate_word_cloud',
+            member_frequencies(chat.tokens, select_author[0]),
+            "Word Cloud for individual Words", languages)
+
+    if chart_section(
+            "🔘 Words and Phrases frequently used in Chat",
+            "🔋 Frequently used words or phrases by all members in group chat.\
+        Most dicussion occurs around below words or used frequently.",
+            'chat_word_cloud'):
+        show_chart(
+            images, pending,
+            chart_key(chat_key, 'chat_word_cloud', languages),
+            'generate_word_cloud',
+            chat.chat_tokens, "Word Cloud for Chat words", languages)
+
+    if chart_section(
+            "🔘 Who has Positive Sentiment? ",
+            "🔋 Member sentiment analysis score base on the words used in\
         messages. Sentiment Score above 0.5 to 1 is consider as Positive.\
-        Pure English words and Phrases is ideal for calcalation")
-    st.pyplot(sentiment_analysis(cloud_df))
-
-    # DataFrame processing w.r.t Day hour and Date
-    whatsapp.day_analysis(data_frame)
+        Pure English words and Phrases is ideal for calcalation",
+            'sentiment_analysis'):
+        sentiment_config = config['sentiment']
+        mode = sentiment_config['mode']
+        if mode == 'auto':
+            mode = 'lexicon' if cloud_df.shape[0] > \
+                sentiment_config['lexicon_above'] else 'textblob'
+        # Scoring runs its own process pool, drawn here and not pooled
+        show_chart(
+            images, None, chart_key(chat_key, 'sentiment_analysis', mode),
+            'sentiment_analysis',
+            cloud_df, mode=mode, workers=sentiment_config['workers'])
 
     # Calling Combine chart function
-    chart_display(data_frame)
-    
-    
+    chart_display(
+        chat, chat_key, view_key, members, time_cube, links, images,
+        figures, pending)
 
-    st.markdown("----")
-    st.header("🔘 Top-10 Media Contributor ")
-    st.info("🔋 Comparision of members who contributes more number of Images,\
-        Video or Documents")
-    st.pyplot(top_media_contributor(raw_df))
+    if chart_section(
+            "🔘 Top-10 Media Contributor ",
+            "🔋 Comparision of members who contributes more number of Images,\
+        Video or Documents", 'top_media_contributor'):
+        show_chart(
+            images, pending, chart_key(view_key, 'top_media_contributor'),
+            'top_media_contributor', members)
 
-    
+    render_pending(images, pending, config['rendering']['workers'])
 
     # Footer Message for Tree Plantation
     st.markdown("----")
     
 
 
+def analyse_uploads(uploaded_files, config):
+    """
+    Select one chat of the uploaded exports and analyse it
+    """
+    # Uploads are listed and hashed once, reruns read nothing until a
+    # chat is parsed. Attachments are indexed from the zip directory
+    sources, attachments = collect_sources(
+        uploaded_files, WhatsAppConfig(**config['whatsapp']),
+        get_cache('uploads', config['cache']['upload_megabytes']))
+    if not sources:
+        st.error("No chat found in the uploaded files")
+        return
+    if len(sources) > 1:
+        with profiling.stage('preload_chats'):
+            preload_chats(sources, config)
+    labels = [source.label for source in sources]
+    label = st.sidebar.selectbox("Chat", labels)
+    source = sources[labels.index(label)]
+    # Compatible iOS and Android regex search
+    st.markdown("The Genesis chatter of the group:")
+    with open_source(source) as stream:
+        file_process(
+            stream, config, attachments.get(source.label), source.key)
+
+
+def display_diagnostics(profiler):
+    """
+    Sidebar table of the stages measured during this run
+    """
+    timings = profiler.frame()
+    st.sidebar.markdown("### Performance diagnostics")
+    top = timings[~timings['stage'].str.startswith(' ')]
+    st.sidebar.text(
+        f"{top['wall'].sum():.2f}s wall, {top['cpu'].sum():.2f}s CPU")
+    st.sidebar.dataframe(timings.round(3))
+
+
 def main():
     """
     Function will process the txt data and process into
@@ -340,18 +634,26 @@ def main():
 
     c1, c2 = st.columns([3, 1])
     # Uploaded file processing function
-    uploaded_file = c1.file_uploader(
-        "Choose a TXT file only",
-        type=['txt'],
-        accept_multiple_files=False)
+    uploaded_files = c1.file_uploader(
+        "Choose TXT exports or export ZIP archives",
+        type=['txt', 'zip'],
+        accept_multiple_files=True)
         
 
-    if uploaded_file is not None:
-        # Convert txt string to utf-8 Encoding
-        data = uploaded_file.getvalue().decode("utf-8")
-        # Compatible iOS and Android regex search
-        st.markdown("The Genesis chatter of the group:")
-        file_process(data, config)
+    if uploaded_files:
+        # Stages are only measured while the panel is switched on
+        profiler = None
+        if st.sidebar.checkbox(
+                "Performance diagnostics",
+                value=config['profiling']['enabled']):
+            profiler = profiling.start(config['profiling']['memory'])
+        try:
+            with profiling.stage('analyse_uploads'):
+                analyse_uploads(uploaded_files, config)
+        finally:
+            profiling.stop()
+        if profiler is not None:
+            display_diagnostics(profiler)
         
     
     
@@ -0,0 +1,378 @@
+"""
+Stage by stage benchmark of the WhatsApp Chat Analyzer pipeline
+"""
+import io
+import os
+import sys
+import json
+import time
+import logging
+import logging.config
+import platform
+import argparse
+import statistics
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+import yaml
+import numpy
+import plotly
+import wordcloud
+import matplotlib
+matplotlib.use('Agg')
+import pandas as pd
+from processor.transformers.chat_eda import WhatsAppProcess, WhatsAppConfig,\
+    process_data, member_statistics, link_table
+from processor.transformers.aggregates import TimeCube, token_frequencies,\
+    chat_frequencies
+from processor.graphs import charts
+from processor.common.synthetic import EXPORT_FORMATS, SyntheticConfig,\
+    write_chat
+from processor.common.configure import BANNER
+
+
+# Chart functions and the pipeline output each one is drawn from
+PLOTLY_CHARTS = [
+    ('message_cluster', 'members'),
+    ('pie_display_emojis', 'data_frame'),
+    ('time_series_plot', 'time_cube'),
+    ('top_domains', 'links'),
+    ('domains_over_time', 'links')]
+MATPLOTLIB_CHARTS = [
+    ('max_words_used', 'members'),
+    ('most_active_member', 'members'),
+    ('top_media_contributor', 'members'),
+    ('who_shared_links', 'links'),
+    ('most_active_day', 'time_cube'),
+    ('time_when_group_active', 'time_cube'),
+    ('most_suitable_hour', 'time_cube'),
+    ('most_suitable_day', 'time_cube')]
+
+# Differences below these are noise, never reported as regressions
+MIN_SECONDS = 0.01
+MIN_MEGABYTES = 1.0
+
+
+def pipeline_stages(
+        whatsapp: WhatsAppProcess,
+        sentiment: str) -> List[Tuple[str, str, Callable[[Dict], Any]]]:
+    """
+    Benchmarked stages in pipeline order
+
+    Every stage reads earlier outputs from a shared state dict and its
+    result is stored back under its output name. Matplotlib charts are
+    timed up to the rasterized image the app displays.
+
+    attributes
+    ----------
+    whatsapp (WhatsAppProcess): configured processor
+    sentiment (str): 'none', 'textblob' or 'lexicon'
+
+    Returns
+    -------
+    list: (stage name, output name, function of the state) tuples
+    """
+    stages = [
+        ('apply_regex', 'messages',
+            lambda state: whatsapp.apply_regex(state['text'])),
+        ('process_data', 'raw_df',
+            lambda state: process_data(state['messages'])),
+        ('link_table', 'links',
+            lambda state: link_table(
+                state['raw_df'], whatsapp.app_config.url_pattern)),
+        ('get_dataframe', 'data_frame',
+            lambda state: whatsapp.get_dataframe(
+                state['raw_df'], state['links'])),
+        ('cloud_data', 'cloud_df',
+            lambda state: whatsapp.cloud_data(state['raw_df'])),
+        ('day_analysis', 'day_df',
+            lambda state: whatsapp.day_analysis(state['data_frame'])),
+        ('member_statistics', 'members',
+            lambda state: member_statistics(
+                state['raw_df'], state['data_frame'], state['cloud_df'])),
+        ('time_cube', 'time_cube',
+            lambda state: TimeCube.build(
+                state['data_frame'], whatsapp.app_config.weeks,
+                state['members'].index)),
+        ('token_frequencies', 'tokens',
+            lambda state: token_frequencies(state['cloud_df'])),
+        ('chat_frequencies', 'chat_tokens',
+            lambda state: chat_frequencies(state['tokens']))]
+    for name, source in PLOTLY_CHARTS:
+        stages.append((
+            name, None,
+            lambda state, chart=getattr(charts, name), source=source:
+                chart(state[source])))
+    for name, source in MATPLOTLIB_CHARTS:
+        stages.append((
+            name, None,
+            lambda state, chart=getattr(charts, name), source=source:
+                charts.figure_to_image(chart(state[source]))))
+    if sentiment != 'none':
+        stages.append((
+            'sentiment_analysis', None,
+            lambda state: charts.figure_to_image(charts.sentiment_analysis(
+                state['cloud_df'], mode=sentiment))))
+    stages.append((
+        'generate_word_cloud', None,
+        lambda state: charts.figure_to_image(charts.generate_word_cloud(
+            state['chat_tokens'], 'Word Cloud'))))
+    stages.append((
+        'process_chat', None,
+        lambda state: whatsapp.process_chat(io.BytesIO(state['data']))))
+    return stages
+
+
+def measure(
+        function: Callable[[], Any], repeat: int,
+        memory: bool) -> Tuple[Any, Dict]:
+    """
+    Wall time of repeated calls and peak memory of one traced call
+
+    Tracing slows Python code down, so the traced call is never timed.
+
+    attributes
+    ----------
+    function (callable): stage to run
+    repeat (int): timed calls
+    memory (bool): trace allocations of one extra call
+
+    Returns
+    -------
+    tuple: result of the last call and the measurements
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    measured = {
+        'seconds': min(timings),
+        'median_seconds': statistics.median(timings)}
+    if memory:
+        tracemalloc.start()
+        try:
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        measured['peak_megabytes'] = peak / 2 ** 20
+    if isinstance(result, (list, pd.DataFrame, pd.Series)):
+        measured['rows'] = len(result)
+    return result, measured
+
+
+def run_case(
+        whatsapp: WhatsAppProcess, config: SyntheticConfig, repeat: int,
+        memory: bool, sentiment: str) -> Dict:
+    """
+    Benchmark every stage on one synthetic export
+
+    Returns
+    -------
+    dict: export config, size and per stage measurements
+    """
+    buffer = io.BytesIO()
+    write_chat(buffer, config)
+    state = {'data': buffer.getvalue()}
+    state['text'] = state['data'].decode('utf-8')
+    results = {}
+    for name, output, stage in pipeline_stages(whatsapp, sentiment):
+        result, results[name] = measure(
+            lambda: stage(state), repeat, memory)
+        if output is not None:
+            state[output] = result
+        print(
+            f"{config.export_format}-{config.lines} {name}: "
+            f"{results[name]['seconds']:.3f}s", file=sys.stderr)
+    return {
+        'config': config._asdict(), 'bytes': len(state['data']),
+        'stages': results}
+
+
+def environment() -> Dict:
+    """Interpreter, platform and library versions of a run"""
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'packages': {
+            'pandas': pd.__version__, 'numpy': numpy.__version__,
+            'matplotlib': matplotlib.__version__,
+            'plotly': plotly.__version__,
+            'wordcloud': wordcloud.__version__}}
+
+
+def compare(
+        baseline: Dict, current: Dict,
+        tolerance: float) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Stage by stage comparison of two benchmark results
+
+    attributes
+    ----------
+    baseline (dict): earlier results
+    current (dict): new results
+    tolerance (float): allowed relative slowdown or memory growth
+
+    Returns
+    -------
+    tuple: comparison table and its regressed rows
+    """
+    rows = []
+    for case, result in current['cases'].items():
+        stages = baseline['cases'].get(case, {}).get('stages', {})
+        for stage, measured in result['stages'].items():
+            if stage not in stages:
+                continue
+            before = stages[stage]
+            rows.append({
+                'case': case, 'stage': stage,
+                'baseline_seconds': before['seconds'],
+                'seconds': measured['seconds'],
+                'baseline_megabytes': before.get('peak_megabytes'),
+                'megabytes': measured.get('peak_megabytes')})
+    table = pd.DataFrame(rows, columns=[
+        'case', 'stage', 'baseline_seconds', 'seconds',
+        'baseline_megabytes', 'megabytes'])
+    table['time_ratio'] = table['seconds'] / table['baseline_seconds']
+    table['memory_ratio'] = table['megabytes'] / table['baseline_megabytes']
+    slower = (table['time_ratio'] > 1 + tolerance) & (
+        table['seconds'] - table['baseline_seconds'] > MIN_SECONDS)
+    larger = (table['memory_ratio'] > 1 + tolerance) & (
+        table['megabytes'] - table['baseline_megabytes'] > MIN_MEGABYTES)
+    return table, table[slower | larger]
+
+
+def add_export_arguments(parser: argparse.ArgumentParser):
+    """Synthetic export shape options shared by both commands"""
+    defaults = SyntheticConfig()
+    parser.add_argument(
+        '--members', type=int, default=defaults.members,
+        help="group members")
+    parser.add_argument(
+        '--emoji-rate', type=float, default=defaults.emoji_rate,
+        help="share of messages carrying emojis")
+    parser.add_argument(
+        '--url-rate', type=float, default=defaults.url_rate,
+        help="share of messages carrying a link")
+    parser.add_argument(
+        '--media-rate', type=float, default=defaults.media_rate,
+        help="share of media messages")
+    parser.add_argument(
+        '--multiline-rate', type=float, default=defaults.multiline_rate,
+        help="share of messages spanning several lines")
+    parser.add_argument(
+        '--seed', type=int, default=defaults.seed, help="random seed")
+
+
+def export_config(
+        args: argparse.Namespace, export_format: str,
+        lines: int) -> SyntheticConfig:
+    """SyntheticConfig from the command line options"""
+    return SyntheticConfig(
+        export_format=export_format, lines=lines, members=args.members,
+        emoji_rate=args.emoji_rate, url_rate=args.url_rate,
+        media_rate=args.media_rate, multiline_rate=args.multiline_rate,
+        seed=args.seed)
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Synthetic chat exports and pipeline benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser(
+        'generate', help="write a synthetic chat export")
+    generate.add_argument('output', help="export file to write")
+    generate.add_argument(
+        '--format', dest='export_format', default='android',
+        choices=sorted(EXPORT_FORMATS), help="export format")
+    generate.add_argument(
+        '--lines', type=int, default=SyntheticConfig().lines,
+        help="lines written")
+    add_export_arguments(generate)
+
+    run = commands.add_parser('run', help="benchmark the pipeline stages")
+    run.add_argument(
+        '--formats', nargs='+', default=sorted(EXPORT_FORMATS),
+        choices=sorted(EXPORT_FORMATS), help="export formats")
+    run.add_argument(
+        '--lines', type=int, nargs='+', default=[10000, 100000],
+        help="export sizes in lines")
+    add_export_arguments(run)
+    run.add_argument(
+        '-c', '--config', default='configs/app_configuration.yml',
+        help="application configuration")
+    run.add_argument(
+        '-r', '--repeat', type=int, default=3,
+        help="timed calls per stage, the fastest is kept")
+    run.add_argument(
+        '--no-memory', dest='memory', action='store_false',
+        help="skip the traced peak memory call")
+    run.add_argument(
+        '-s', '--sentiment', default='lexicon',
+        choices=['none', 'textblob', 'lexicon'],
+        help="sentiment scoring benchmarked")
+    run.add_argument(
+        '-o', '--output', default='benchmarks/latest.json',
+        help="results file")
+    run.add_argument(
+        '-b', '--baseline', help="earlier results compared against")
+    run.add_argument(
+        '-t', '--tolerance', type=float, default=0.2,
+        help="relative slowdown or memory growth counted as regression")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Generate an export or run the benchmark suite
+
+    Returns
+    -------
+    int: exit status, 1 when a stage regressed against the baseline
+    """
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if args.command == 'generate':
+        with open(args.output, 'wb') as stream:
+            write_chat(stream, export_config(
+                args, args.export_format, args.lines))
+        return 0
+
+    with open(args.config) as config_file:
+        config = yaml.safe_load(config_file)
+    logging.config.dictConfig(config['logging'])
+    # Per call pipeline logs would be timed along with the stages
+    logging.getLogger().setLevel(logging.WARNING)
+    whatsapp = WhatsAppProcess(WhatsAppConfig(**config['whatsapp']))
+    results = {'meta': environment(), 'cases': {}}
+    results['meta']['repeat'] = args.repeat
+    for export_format in args.formats:
+        for lines in args.lines:
+            results['cases'][f'{export_format}-{lines}'] = run_case(
+                whatsapp, export_config(args, export_format, lines),
+                args.repeat, args.memory, args.sentiment)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as handle:
+        json.dump(results, handle, indent=2)
+
+    if args.baseline is None:
+        return 0
+    with open(args.baseline, encoding='utf-8') as handle:
+        baseline = json.load(handle)
+    table, regressions = compare(baseline, results, args.tolerance)
+    print(table.to_string(index=False, float_format='{:.3f}'.format))
+    if not regressions.empty:
+        print("\nRegressions:")
+        print(regressions[['case', 'stage', 'time_ratio', 'memory_ratio']]
+              .to_string(index=False, float_format='{:.2f}'.format))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    print(BANNER)
+    sys.exit(main())
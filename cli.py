@@ -0,0 +1,234 @@
+"""
+Headless batch WhatsApp Chat Analyzer
+"""
+import os
+import sys
+import json
+import glob
+import logging
+import logging.config
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+import yaml
+import pandas as pd
+from processor.transformers.chat_eda import WhatsAppProcess, WhatsAppConfig
+from processor.transformers.sentiment import score_messages
+from processor.common.configure import BANNER
+
+
+def find_chats(paths: List[str]) -> List[Tuple[str, str]]:
+    """
+    Expand files and directories into the list of chat exports
+
+    Every chat is named by its path relative to the directory it was
+    found in, without extension, so the iOS "_chat.txt" of different
+    export folders get different output directories.
+
+    attributes
+    ----------
+    paths (list): chat files or directories holding *.txt exports
+
+    Returns
+    -------
+    list: sorted (chat file path, output name) tuples
+    """
+    chats = {}
+    for path in paths:
+        if os.path.isdir(path):
+            for chat in glob.glob(
+                    os.path.join(path, '**', '*.txt'), recursive=True):
+                chats[chat] = os.path.relpath(chat, path)
+        else:
+            chats[path] = os.path.basename(path)
+    return sorted(
+        (chat, os.path.splitext(name)[0]) for chat, name in chats.items())
+
+
+def chat_summary(chat, sentiment: str) -> Dict:
+    """
+    JSON ready statistics and chart aggregates of a processed chat
+
+    attributes
+    ----------
+    chat (ProcessedChat): pipeline outputs
+    sentiment (str): 'none', 'textblob' or 'lexicon'
+
+    Returns
+    -------
+    dict: stats, members, hours, weekdays, days and emojis
+    """
+    per_date = chat.time_cube.per_date()
+    members = chat.members.copy()
+    if sentiment != 'none':
+        scores = score_messages(chat.cloud_df.message, mode=sentiment)
+        members['sentiment'] = scores.groupby(
+            chat.cloud_df['name'], observed=True).mean()\
+            .reindex(members.index)
+    emojis = chat.data_frame.emojis.explode().value_counts()
+    return {
+        'stats': {
+            key: value.item() if hasattr(value, 'item') else value
+            for key, value in chat.stats.items()},
+        'members': json.loads(members.to_json(orient='index')),
+        'hours': chat.time_cube.per_hour().reindex(
+            range(24), fill_value=0).tolist(),
+        'weekdays': chat.time_cube.per_weekday().to_dict(),
+        'days': {
+            str(day.date()): int(count)
+            for day, count in per_date[per_date > 0].items()},
+        'emojis': {
+            str(code): int(count) for code, count in emojis.items()}}
+
+
+def stream_statistics(path: str, config: Dict) -> Dict:
+    """
+    Chat statistics of an export streamed in batches
+
+    Only the running statistics are kept, each batch is dropped once
+    folded, so memory stays at one batch whatever the export size.
+
+    attributes
+    ----------
+    path (str): chat export
+    config (dict): parsed application configuration
+
+    Returns
+    -------
+    dict: JSON ready statistics
+    """
+    source_config = WhatsAppConfig(**config['whatsapp'])
+    with open(path, 'rb') as stream:
+        stats = WhatsAppProcess(source_config).process_stream(
+            stream, keep_frames=False)[2]
+    if stats['group_name'] is None:
+        raise ValueError("No messages found, unsupported chat export format")
+    return {
+        key: value.item() if hasattr(value, 'item') else value
+        for key, value in stats.items()}
+
+
+def process_file(
+        path: str, name: str, output: str, config: Dict,
+        output_format: str, sentiment: str, stats_only: bool = False) -> str:
+    """
+    Process one chat export and write its results
+
+    attributes
+    ----------
+    path (str): chat export
+    name (str): output name from find_chats, unique per run
+    output (str): output directory
+    config (dict): parsed application configuration
+    output_format (str): 'json' or 'parquet'
+    sentiment (str): 'none', 'textblob' or 'lexicon'
+    stats_only (bool): write the streamed statistics only, without
+        building the message frames
+
+    Returns
+    -------
+    str: path of the written summary
+    """
+    target = os.path.join(output, name)
+    if stats_only:
+        summary = {'stats': stream_statistics(path, config), 'file': path}
+        os.makedirs(target, exist_ok=True)
+        return write_summary(target, summary)
+    source_config = WhatsAppConfig(**config['whatsapp'])
+    with open(path, 'rb') as stream:
+        chat = WhatsAppProcess(source_config).process_chat(stream)
+    if chat is None:
+        raise ValueError("No messages found, unsupported chat export format")
+    os.makedirs(target, exist_ok=True)
+    summary = chat_summary(chat, sentiment)
+    summary['file'] = path
+    if output_format == 'parquet':
+        chat.members.to_parquet(os.path.join(target, 'members.parquet'))
+        daily = pd.DataFrame(
+            chat.time_cube.members, index=chat.time_cube.dates,
+            columns=chat.time_cube.member_names)
+        daily.columns = daily.columns.astype(str)
+        daily.to_parquet(os.path.join(target, 'daily.parquet'))
+    return write_summary(target, summary)
+
+
+def write_summary(target: str, summary: Dict) -> str:
+    """Write summary.json into the output directory of a chat"""
+    summary_path = os.path.join(target, 'summary.json')
+    with open(summary_path, 'w', encoding='utf-8') as handle:
+        json.dump(summary, handle, ensure_ascii=False, indent=2)
+    return summary_path
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Analyse WhatsApp chat exports without a browser")
+    parser.add_argument(
+        'paths', nargs='+', help="chat exports or directories of exports")
+    parser.add_argument(
+        '-o', '--output', default='output', help="output directory")
+    parser.add_argument(
+        '-c', '--config', default='configs/app_configuration.yml',
+        help="application configuration")
+    parser.add_argument(
+        '-w', '--workers', type=int, default=os.cpu_count(),
+        help="worker processes")
+    parser.add_argument(
+        '-f', '--format', dest='output_format', default='json',
+        choices=['json', 'parquet'], help="aggregate tables format")
+    parser.add_argument(
+        '-s', '--sentiment', default='none',
+        choices=['none', 'textblob', 'lexicon'],
+        help="per member sentiment scoring")
+    parser.add_argument(
+        '--stats-only', action='store_true',
+        help="stream the chat statistics in bounded memory, no member, "
+             "time or emoji tables")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Process every chat export across a process pool
+
+    Returns
+    -------
+    int: exit status, 1 when any chat failed
+    """
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    with open(args.config) as config_file:
+        config = yaml.safe_load(config_file)
+    logging.config.dictConfig(config['logging'])
+    logger = logging.getLogger(__name__)
+    chats = find_chats(args.paths)
+    logger.info("Processing %d chats with %d workers", len(chats), args.workers)
+    failed = 0
+    # Chats sharing an output name would overwrite each other's results
+    names = Counter(name for _, name in chats)
+    for path, name in chats:
+        if names[name] > 1:
+            failed += 1
+            logger.error(
+                "Failed %s: output name %s is used by %d chats, pass their "
+                "directory instead", path, name, names[name])
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(
+                process_file, path, name, args.output, config,
+                args.output_format, args.sentiment, args.stats_only): path
+            for path, name in chats if names[name] == 1}
+        for future in as_completed(futures):
+            try:
+                logger.info("Written %s", future.result())
+            except Exception as diag:
+                failed += 1
+                logger.error("Failed %s: %s", futures[future], diag)
+    logger.info("Done, %d of %d chats failed", failed, len(chats))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    print(BANNER)
+    sys.exit(main())
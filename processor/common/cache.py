@@ -0,0 +1,194 @@
+"""Process wide caches shared by Streamlit sessions and reruns"""
+import sys
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional
+import pandas as pd
+
+# Bytes hashed at a time when fingerprinting an upload
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def content_hash(stream: BinaryIO, *parts: Any) -> str:
+    """
+    Fingerprint of an upload's content plus any extra key parts
+
+    Attributes
+    ----------
+    stream (BinaryIO): file-like object opened in binary mode, rewound
+        to the start afterwards
+    parts: hashable configuration values, e.g. a WhatsAppConfig
+
+    Retrurns
+    --------
+    str: hex digest
+    """
+    digest = hashlib.sha1()
+    stream.seek(0)
+    for block in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+        digest.update(block)
+    stream.seek(0)
+    for part in parts:
+        digest.update(repr(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def prefix_hash(stream: BinaryIO, size: int) -> str:
+    """
+    Fingerprint of the first size bytes of an upload
+
+    Attributes
+    ----------
+    stream (BinaryIO): file-like object opened in binary mode, rewound
+        to the start afterwards
+    size (int): number of leading bytes hashed
+
+    Retrurns
+    --------
+    str: hex digest, equal to content_hash of an upload of that size
+        without extra key parts
+    """
+    digest = hashlib.sha1()
+    stream.seek(0)
+    while size > 0:
+        block = stream.read(min(HASH_CHUNK_SIZE, size))
+        if not block:
+            break
+        digest.update(block)
+        size -= len(block)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def chart_key(chat_key: str, kind: str, *params: Any) -> str:
+    """
+    Cache key of a rendered chart
+
+    Attributes
+    ----------
+    chat_key (str): content hash of the chat
+    kind (str): chart name
+    params: anything the drawing depends on, e.g. the selected member
+
+    Retrurns
+    --------
+    str: cache key
+    """
+    return f'{chat_key}/{kind}/{params!r}'
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate memory held by a cached value
+
+    Attributes
+    ----------
+    value: DataFrame, Series, container of them or any object
+
+    Retrurns
+    --------
+    int: size in bytes
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(item) for item in value.values())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(
+            estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache():
+    """
+    Thread safe least recently used cache bounded by memory
+    """
+    def __init__(self, max_bytes: int):
+        """
+        Constructor for LRUCache
+
+        :param max_bytes: memory cap, least recently used entries are
+            evicted once the cached values exceed it
+        """
+        self._logger = logging.getLogger(__name__)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Cached value of key, marked as most recently used
+
+        :param key: cache key
+        :param default: returned when the key is not cached
+
+        :returns:
+            value: cached value or default
+        """
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key: str, value: Any, size: Optional[int] = None) -> Any:
+        """
+        Cache a value and evict least recently used entries over the cap
+
+        :param key: cache key
+        :param value: value to cache
+        :param size: size in bytes, estimated when not given
+
+        :returns:
+            value: the cached value
+        """
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                evicted, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self._logger.info("Cache evicted %s", evicted)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_CACHES: Dict[str, LRUCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_cache(name: str, max_megabytes: float) -> LRUCache:
+    """
+    Named cache living for the whole server process
+
+    Streamlit re-executes the script on every rerun, so caches are held
+    here in an imported module instead of in app.py.
+
+    Attributes
+    ----------
+    name (str): cache name
+    max_megabytes (float): memory cap used when the cache is created
+
+    Retrurns
+    --------
+    LRUCache: the named cache
+    """
+    with _CACHES_LOCK:
+        if name not in _CACHES:
+            _CACHES[name] = LRUCache(int(max_megabytes * 1024 * 1024))
+        return _CACHES[name]
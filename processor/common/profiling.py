@@ -0,0 +1,269 @@
+"""
+Per stage wall time, CPU time, row count and peak memory records
+"""
+import time
+import logging
+import threading
+import tracemalloc
+from functools import wraps
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, NamedTuple
+import numpy as np
+import pandas as pd
+
+
+_LOCAL = threading.local()
+# tracemalloc is process wide while profilers are per thread: tracing
+# runs while any memory profiler does, and the traced peak is only reset
+# when no other thread has a traced stage running
+_TRACING_LOCK = threading.Lock()
+_TRACING = {'profilers': 0, 'owned': False, 'stages': 0}
+
+
+class StageTiming(NamedTuple):
+    """
+    Measurements of one profiled stage
+
+    stage: stage name
+    depth: nesting level below the outermost profiled stage
+    start: seconds from the start of profiling to the stage start
+    wall: elapsed seconds
+    cpu: process CPU seconds, worker threads included
+    rows: rows of the stage result, None when unknown
+    peak_megabytes: traced allocation peak, None without memory tracing
+    """
+    stage: str
+    depth: int
+    start: float
+    wall: float
+    cpu: float
+    rows: Any
+    peak_megabytes: Any
+
+
+class Probe():
+    """
+    Handle of a running stage, rows may be set before it ends
+    """
+    __slots__ = ('rows', 'start', 'base', 'child_peak')
+
+    def __init__(self):
+        self.rows = None
+        self.start = self.base = self.child_peak = 0
+
+
+# Handed out by stage() while profiling is off, its rows are never read
+_IDLE_PROBE = Probe()
+
+
+def result_rows(result: Any) -> Any:
+    """Row count of a pipeline result, None for other values"""
+    if isinstance(result, (pd.DataFrame, pd.Series, np.ndarray, list)):
+        return len(result)
+    # Processed chats count their messages
+    raw_df = getattr(result, 'raw_df', None)
+    return None if raw_df is None else len(raw_df)
+
+
+class Profiler():
+    """
+    Collects the stages run by one thread
+    """
+
+    def __init__(self, memory: bool = False):
+        """
+        :param memory: trace allocations for peak memory, this slows
+            Python code down noticeably
+        """
+        self.memory = memory
+        self.records: List[StageTiming] = []
+        self._stack: List[Probe] = []
+        self._tracing = False
+        self._traced_stages = 0
+        self._origin = time.perf_counter()
+        self._logger = logging.getLogger(__name__)
+
+    def begin(self):
+        """Start tracing allocations when memory peaks are recorded"""
+        if not self.memory or self._tracing:
+            return
+        with _TRACING_LOCK:
+            if _TRACING['profilers'] == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _TRACING['owned'] = True
+            _TRACING['profilers'] += 1
+        self._tracing = True
+
+    def end(self):
+        """Stop the allocation tracing once no other profiler uses it"""
+        if not self._tracing:
+            return
+        with _TRACING_LOCK:
+            _TRACING['profilers'] -= 1
+            if _TRACING['profilers'] == 0 and _TRACING['owned']:
+                tracemalloc.stop()
+                _TRACING['owned'] = False
+        self._tracing = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Probe]:
+        """
+        Measure the enclosed block
+
+        Nested stages are recorded before the stage enclosing them, the
+        peak of an enclosing stage includes the peaks of its children.
+
+        :param name: stage name
+
+        :returns:
+            iterator: the running stage Probe
+        """
+        probe = Probe()
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            with _TRACING_LOCK:
+                probe.base = tracemalloc.get_traced_memory()[0]
+                # Before Python 3.9 peaks include earlier allocations.
+                # A stage of another thread keeps its peak, this stage's
+                # peak is then an upper bound
+                if (hasattr(tracemalloc, 'reset_peak') and
+                        _TRACING['stages'] == self._traced_stages):
+                    tracemalloc.reset_peak()
+                _TRACING['stages'] += 1
+            self._traced_stages += 1
+        self._stack.append(probe)
+        cpu = time.process_time()
+        probe.start = time.perf_counter()
+        try:
+            yield probe
+        finally:
+            wall = time.perf_counter() - probe.start
+            cpu = time.process_time() - cpu
+            self._stack.pop()
+            peak = None
+            if tracing:
+                with _TRACING_LOCK:
+                    _TRACING['stages'] -= 1
+                    traced = tracemalloc.get_traced_memory()[1]
+                self._traced_stages -= 1
+                absolute = max(traced, probe.child_peak)
+                peak = (absolute - probe.base) / 2 ** 20
+                if self._stack:
+                    parent = self._stack[-1]
+                    parent.child_peak = max(parent.child_peak, absolute)
+            self.records.append(StageTiming(
+                name, len(self._stack), probe.start - self._origin, wall,
+                cpu, probe.rows, peak))
+            self._logger.info(
+                "%s wall=%.3fs cpu=%.3fs rows=%s peak=%s", name, wall, cpu,
+                probe.rows, 'n/a' if peak is None else f'{peak:.1f}MB')
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Records in start order with nested stages indented
+
+        :returns:
+            DataFrame: stage, wall, cpu, rows and peak_megabytes
+        """
+        # Records are appended on exit, starts order them outer first
+        ordered = sorted(self.records, key=lambda record: record.start)
+        return pd.DataFrame([
+            {
+                'stage': '  ' * record.depth + record.stage,
+                'wall': record.wall,
+                'cpu': record.cpu,
+                'rows': record.rows,
+                'peak_megabytes': record.peak_megabytes}
+            for record in ordered],
+            columns=['stage', 'wall', 'cpu', 'rows', 'peak_megabytes'])\
+            .astype({'rows': 'Int64', 'peak_megabytes': float})
+
+
+def active() -> Any:
+    """Profiler of the current thread, None while profiling is off"""
+    return getattr(_LOCAL, 'profiler', None)
+
+
+def start(memory: bool = False) -> Profiler:
+    """
+    Profile the stages run by the current thread
+
+    Attributes
+    ----------
+    memory (bool): record traced peak memory of every stage
+
+    Retrurns
+    --------
+    Profiler: collects the records until stop is called
+    """
+    profiler = Profiler(memory)
+    profiler.begin()
+    _LOCAL.profiler = profiler
+    return profiler
+
+
+def stop() -> Any:
+    """
+    Stop profiling the current thread
+
+    Retrurns
+    --------
+    Profiler: the stopped profiler, None if none was running
+    """
+    profiler = active()
+    _LOCAL.profiler = None
+    if profiler is not None:
+        profiler.end()
+    return profiler
+
+
+@contextmanager
+def stage(name: str) -> Iterator[Probe]:
+    """
+    Measure the enclosed block when the current thread is profiled
+
+    Attributes
+    ----------
+    name (str): stage name
+
+    Retrurns
+    --------
+    iterator: Probe whose rows attribute may be set by the block
+    """
+    profiler = active()
+    if profiler is None:
+        yield _IDLE_PROBE
+        return
+    with profiler.stage(name) as probe:
+        yield probe
+
+
+def profiled(name: str = None, rows: Callable[[Any], Any] = result_rows):
+    """
+    Decorator recording every call of a function as a stage
+
+    Unprofiled calls cost one thread local lookup.
+
+    Attributes
+    ----------
+    name (str): stage name, the function name by default
+    rows (callable): row count of the function result
+
+    Retrurns
+    --------
+    callable: decorator
+    """
+    def decorator(function: Callable) -> Callable:
+        stage_name = name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = getattr(_LOCAL, 'profiler', None)
+            if profiler is None:
+                return function(*args, **kwargs)
+            with profiler.stage(stage_name) as probe:
+                result = function(*args, **kwargs)
+                probe.rows = rows(result)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,276 @@
+"""Columnar on-disk snapshots of processed chats"""
+import os
+import json
+import hashlib
+import shutil
+import logging
+import tempfile
+import threading
+from typing import Any, BinaryIO, Dict, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+from processor.transformers.chat_eda import ProcessedChat, WhatsAppProcess,\
+    leading_digests
+from processor.transformers.aggregates import TimeCube
+from processor.common.cache import prefix_hash
+from processor.common.profiling import profiled
+
+# Bumped when the content of a pipeline output changes, older snapshots
+# are dropped on load (2: bigram counts in the token tables)
+SNAPSHOT_VERSION = 2
+
+# One lock per snapshot folder, shared by the stores of every session
+_LOCKS: Dict[str, threading.Lock] = {}
+_LOCKS_LOCK = threading.Lock()
+
+
+def _directory_lock(directory: str) -> threading.Lock:
+    """Lock guarding the snapshots of a folder within this process"""
+    with _LOCKS_LOCK:
+        return _LOCKS.setdefault(
+            os.path.realpath(directory), threading.Lock())
+
+
+class SnapshotStore():
+    """
+    Processed chats persisted as Arrow IPC (Feather) files by content
+    hash, least recently used snapshots are evicted over the size limit
+
+    Tables are read through a memory map, converting them to pandas
+    copies the columns, so a load costs memory like the parsed chat.
+    Only the time cube faces stay memory mapped.
+    """
+    def __init__(self, directory: str, max_megabytes: float):
+        """
+        Constructor for SnapshotStore
+
+        :param directory: folder holding one sub folder per snapshot
+        :param max_megabytes: disk budget of all snapshots together
+        """
+        self._logger = logging.getLogger(__name__)
+        self.directory = directory
+        self.max_bytes = int(max_megabytes * 1024 * 1024)
+        # Stores are created per rerun, the lock belongs to the folder
+        self._lock = _directory_lock(directory)
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    @profiled(name='SnapshotStore.load')
+    def load(self, key: str) -> Optional[ProcessedChat]:
+        """
+        Read a snapshot back into a ProcessedChat
+
+        Holds the folder lock, so eviction by a concurrent save cannot
+        remove the files being read.
+
+        :param key: content hash of the chat
+
+        :returns:
+            ProcessedChat: restored pipeline outputs, None when missing
+        """
+        with self._lock:
+            return self._load(key)
+
+    def _load(self, key: str) -> Optional[ProcessedChat]:
+        path = self._path(key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            with open(os.path.join(path, 'meta.json'), encoding='utf-8')\
+                    as handle:
+                meta = json.load(handle)
+            if meta.get('version') != SNAPSHOT_VERSION:
+                raise ValueError(f"layout version {meta.get('version')}")
+            values = {}
+            for field in ProcessedChat._fields:
+                kind = meta['fields'][field]
+                if kind == 'frame':
+                    values[field] = self._read_table(path, field)
+                elif kind == 'series':
+                    values[field] = self._read_table(
+                        path, field)['values'].rename(meta[field])
+                elif kind == 'time_cube':
+                    values[field] = self._read_cube(path, field, meta[field])
+                else:
+                    values[field] = meta[field]
+        except (OSError, ValueError, KeyError, pa.ArrowException) as diag:
+            self._logger.warning(
+                "Dropping unreadable snapshot %s: %s", key, diag)
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        # Touch the snapshot, eviction goes by modification time
+        os.utime(path)
+        self._logger.info("Snapshot %s loaded", key)
+        return ProcessedChat(**values)
+
+    @profiled(name='SnapshotStore.save')
+    def save(
+            self, key: str, chat: ProcessedChat,
+            upload: Optional[dict] = None) -> None:
+        """
+        Persist a ProcessedChat and evict snapshots over the size limit
+
+        :param key: content hash of the chat
+        :param chat: pipeline outputs
+        :param upload: description of the upload used by find_base
+        """
+        staging = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+        meta = {'version': SNAPSHOT_VERSION, 'fields': {}, 'upload': upload}
+        for field, value in zip(ProcessedChat._fields, chat):
+            if isinstance(value, pd.DataFrame):
+                meta['fields'][field] = 'frame'
+                self._write_table(staging, field, value)
+            elif isinstance(value, pd.Series):
+                meta['fields'][field] = 'series'
+                meta[field] = value.name
+                self._write_table(staging, field, value.to_frame('values'))
+            elif isinstance(value, TimeCube):
+                meta['fields'][field] = 'time_cube'
+                meta[field] = self._write_cube(staging, field, value)
+            else:
+                meta['fields'][field] = 'json'
+                meta[field] = value
+        with open(os.path.join(staging, 'meta.json'), 'w', encoding='utf-8')\
+                as handle:
+            json.dump(meta, handle, default=_json_default)
+        with self._lock:
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            os.replace(staging, self._path(key))
+            self._evict()
+
+    def find_base(self, upload: dict, stream: BinaryIO) -> Optional[str]:
+        """
+        Snapshot of an earlier export the upload extends
+
+        Candidates share the group name and the configuration, start with
+        the same messages and are smaller than the upload. The largest
+        one whose bytes are an exact prefix of the upload is returned.
+
+        :param upload: description of the new upload
+        :param stream: the new upload opened in binary mode
+
+        :returns:
+            str: key of the base snapshot, None when there is none
+        """
+        candidates = []
+        for name in os.listdir(self.directory):
+            try:
+                with open(os.path.join(self._path(name), 'meta.json'),
+                          encoding='utf-8') as handle:
+                    stored = json.load(handle).get('upload')
+            except (OSError, ValueError):
+                continue
+            if stored and stored['size'] < upload['size'] and all(
+                    stored[field] == upload[field]
+                    for field in ('group_name', 'config')) and \
+                    stored['leading'] == \
+                    upload['leading'][:len(stored['leading'])]:
+                candidates.append((stored['size'], stored['raw_hash'], name))
+        for size, raw_hash, name in sorted(candidates, reverse=True):
+            if prefix_hash(stream, size) == raw_hash:
+                return name
+        return None
+
+    def upload_size(self, key: str) -> int:
+        """
+        Byte size of the upload a snapshot was built from
+
+        :param key: content hash of the chat
+
+        :returns:
+            int: size in bytes
+        """
+        with self._lock, open(
+                os.path.join(self._path(key), 'meta.json'),
+                encoding='utf-8') as handle:
+            return json.load(handle)['upload']['size']
+
+    def _evict(self) -> None:
+        """Remove least recently used snapshots above the size limit"""
+        snapshots = []
+        for name in os.listdir(self.directory):
+            path = self._path(name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            size = sum(
+                entry.stat().st_size for entry in os.scandir(path))
+            snapshots.append((os.stat(path).st_mtime, size, path))
+        total = sum(size for _, size, _ in snapshots)
+        for _, size, path in sorted(snapshots)[:-1]:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            self._logger.info("Snapshot evicted %s", path)
+
+    @staticmethod
+    def _write_table(path: str, field: str, frame: pd.DataFrame) -> None:
+        table = pa.Table.from_pandas(frame, preserve_index=True)
+        feather.write_feather(table, os.path.join(path, field + '.feather'))
+
+    @staticmethod
+    def _read_table(path: str, field: str) -> pd.DataFrame:
+        table = feather.read_table(
+            os.path.join(path, field + '.feather'), memory_map=True)
+        return table.to_pandas()
+
+    @staticmethod
+    def _write_cube(path: str, field: str, cube: TimeCube) -> dict:
+        np.save(os.path.join(path, field + '_minutes.npy'), cube.minutes)
+        np.save(os.path.join(path, field + '_members.npy'), cube.members)
+        return {
+            'start': str(cube.start),
+            'member_names': list(cube.member_names),
+            'weeks': cube.weeks}
+
+    @staticmethod
+    def _read_cube(path: str, field: str, meta: dict) -> TimeCube:
+        return TimeCube(
+            pd.Timestamp(meta['start']),
+            np.load(
+                os.path.join(path, field + '_minutes.npy'), mmap_mode='r'),
+            np.load(
+                os.path.join(path, field + '_members.npy'), mmap_mode='r'),
+            pd.Index(meta['member_names']),
+            {int(day): name for day, name in meta['weeks'].items()})
+
+
+def describe_upload(
+        whatsapp: WhatsAppProcess, stream: BinaryIO) -> Optional[dict]:
+    """
+    Lineage of an upload, used to recognise re-exports of a chat
+
+    Attributes
+    ----------
+    whatsapp (WhatsAppProcess): processor with the active configuration
+    stream (BinaryIO): the upload opened in binary mode
+
+    Retrurns
+    --------
+    dict: group name, leading message digests, configuration digest,
+        size and content hash, None if no message is found
+    """
+    leading = whatsapp.leading_messages(stream)
+    if leading is None:
+        return None
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return {
+        'group_name': str(leading['name'].iloc[0]),
+        'leading': leading_digests(leading),
+        'config': hashlib.sha1(
+            repr(whatsapp.app_config).encode('utf-8')).hexdigest(),
+        'size': size,
+        'raw_hash': prefix_hash(stream, size)}
+
+
+def _json_default(value: Any) -> Any:
+    """numpy scalars in statistics are written as plain numbers"""
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"{type(value)} is not JSON serializable")
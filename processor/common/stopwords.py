@@ -0,0 +1,99 @@
+"""Stopword index for the Word Cloud filter"""
+import os
+import logging
+from collections import Counter
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Iterable, Mapping, FrozenSet, Tuple, Optional
+from wordcloud import STOPWORDS
+
+# Folder with one stopword file per language
+STOPWORDS_DIR = 'configs/stopwords'
+
+# Share of sampled chat tokens a language must reach to be detected
+DETECTION_SHARE = 0.05
+
+
+@lru_cache(maxsize=None)
+def stopword_index(
+        directory: str = STOPWORDS_DIR) -> Mapping[str, FrozenSet[str]]:
+    """
+    Immutable stopword sets keyed by language, read once per process
+
+    Attributes
+    ----------
+    directory (str): folder with <language>.txt stopword files
+
+    Retrurns
+    --------
+    Mapping: language name to frozenset of words, english comes from
+        the wordcloud STOPWORDS
+    """
+    logging.info("WhatsApp/stopword_index()")
+    index = {'english': frozenset(STOPWORDS)}
+    for file in sorted(os.listdir(directory)):
+        language, _ = os.path.splitext(file)
+        with open(os.path.join(directory, file), encoding='utf-8') as words:
+            index[language] = frozenset(
+                word.strip() for word in words if word.strip())
+    return MappingProxyType(index)
+
+
+@lru_cache(maxsize=None)
+def stopwords_for(
+        languages: Optional[Tuple[str, ...]] = None) -> FrozenSet[str]:
+    """
+    Cached union of the stopword sets of the given languages
+
+    Attributes
+    ----------
+    languages (tuple): language names, None for every language
+
+    Retrurns
+    --------
+    frozenset: Distinct list of words
+    """
+    index = stopword_index()
+    if languages is None:
+        languages = tuple(index)
+    return frozenset().union(
+        *(index[language] for language in languages if language in index))
+
+
+def detect_languages(
+        texts: Iterable[str], sample: int = 5000,
+        share: float = DETECTION_SHARE, top: int = 3) -> Tuple[str, ...]:
+    """
+    Dominant chat languages from stopword hits on a token sample
+
+    Languages are ranked by hits and kept while they reach the minimum
+    share and at least half the hits of the best language, so short
+    words shared by many stopword lists do not select them all.
+
+    Attributes
+    ----------
+    texts (iterable): lower cased messages
+    sample (int): number of tokens inspected
+    share (float): minimum share of sampled tokens hitting a language
+    top (int): maximum number of languages returned
+
+    Retrurns
+    --------
+    tuple: sorted language names, english alone when nothing is detected
+    """
+    tokens = []
+    for text in texts:
+        tokens.extend(text.split())
+        if len(tokens) >= sample:
+            break
+    tokens = Counter(tokens[:sample])
+    total = sum(tokens.values()) or 1
+    hits = sorted((
+        (sum(count for token, count in tokens.items() if token in words),
+         language) for language, words in stopword_index().items()),
+        reverse=True)
+    best = hits[0][0]
+    detected = tuple(sorted(
+        language for count, language in hits[:top]
+        if count / total >= share and count * 2 >= best))
+    return detected or ('english',)
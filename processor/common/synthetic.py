@@ -0,0 +1,228 @@
+"""
+Deterministic synthetic WhatsApp chat exports for benchmarks
+"""
+from itertools import islice
+from typing import BinaryIO, Iterator, List, NamedTuple
+import numpy as np
+import pandas as pd
+
+
+# Timestamp and record layout of each export format matched by regex_list
+EXPORT_FORMATS = {
+    'samsung': '{y}-{mo:02d}-{d:02d}, {h}:{mi:02d} {dotted} - {name}: ',
+    'android': '{d:02d}/{mo:02d}/{yy:02d}, {h}:{mi:02d} {upper} - {name}: ',
+    'ios': '[{d:02d}/{mo:02d}/{yy:02d}, {h}:{mi:02d}:{s:02d} {upper}] '
+           '{name}: ',
+    'oppo': '{d:02d}/{mo:02d}/{y}, {h}:{mi:02d} {lower} - {name}: '}
+
+# Media placeholder written by each export format
+MEDIA_MARKERS = {
+    'samsung': '<Media omitted>',
+    'android': '<Media omitted>',
+    'ios': 'image omitted',
+    'oppo': '<Media omitted>'}
+
+GROUP_NAME = 'Synthetic Group'
+SYSTEM_MESSAGE = "Messages and calls are end-to-end encrypted. No one " \
+    "outside of this chat, not even WhatsApp, can read or listen to them."
+
+FIRST_NAMES = [
+    'Max', 'Furiosa', 'Nux', 'Capable', 'Toast', 'Slit', 'Ace', 'Dag',
+    'Cheedo', 'Morsov', 'Valkyrie', 'Keeper', 'Rictus', 'Corpus', 'Ananya',
+    'Rahul', 'Sofia', 'Mateo', 'Yuki', 'Chen', 'Amara', 'Olga', 'Pierre',
+    'Fatima']
+
+VOCABULARY = (
+    "the a to and of you i it is in that for on we this be are with have "
+    "not at so can will just what do all your was but me my get if like "
+    "know going about there one time see good now they out up come go "
+    "well really today tomorrow tonight meeting road war rig fuel water "
+    "guzzoline citadel boys witness chrome shiny valhalla desert storm "
+    "engine wheel convoy bullet farm gas town people history hope home "
+    "hola gracias bonjour merci namaste danke ciao obrigado").split()
+
+# Single code points, skin tone modifiers, ZWJ sequences, flags and keycaps
+EMOJIS = [
+    '\U0001F603', '\U0001F525', '\U0001F52B', '\U0001F631', '❤️',
+    '\U0001F602', '\U0001F44D\U0001F3FD', '☝\U0001F3FB',
+    '\U0001F468‍\U0001F469‍\U0001F467', '\U0001F1EE\U0001F1F3',
+    '\U0001F1FA\U0001F1F8', '1️⃣', '\U0001F6FB', '\U0001F64F']
+
+DOMAINS = [
+    'youtube.com', 'www.google.com', 'github.com', 'en.wikipedia.org',
+    'www.instagram.com', 'twitter.com', 'docs.python.org', 'example.org']
+
+# Messages generated per vectorized block
+BLOCK_MESSAGES = 10000
+
+
+class SyntheticConfig(NamedTuple):
+    """
+    Shape of a synthetic chat export
+
+    export_format: one of EXPORT_FORMATS
+    lines: number of lines written, continuation lines included
+    members: number of group members
+    emoji_rate: share of messages carrying emojis
+    url_rate: share of messages carrying a link
+    media_rate: share of media placeholder messages
+    multiline_rate: share of messages spanning several lines
+    seed: random seed, equal configs produce equal exports
+    start: timestamp of the first message
+    """
+    export_format: str = 'android'
+    lines: int = 10000
+    members: int = 8
+    emoji_rate: float = 0.2
+    url_rate: float = 0.05
+    media_rate: float = 0.03
+    multiline_rate: float = 0.05
+    seed: int = 0
+    start: str = '2019-01-01 08:00'
+
+
+def member_names(count: int) -> List[str]:
+    """
+    Distinct member names, extended with a number past the name list
+
+    Attributes
+    ----------
+    count (int): number of members
+
+    Retrurns
+    --------
+    list: member names
+    """
+    return [
+        FIRST_NAMES[i % len(FIRST_NAMES)] +
+        (f' {i // len(FIRST_NAMES) + 1}' if i >= len(FIRST_NAMES) else '')
+        for i in range(count)]
+
+
+def _prefixes(
+        template: str, stamps: pd.DatetimeIndex, names: List[str],
+        authors: np.ndarray) -> List[str]:
+    """Timestamp and author prefix of every message of a block"""
+    hours = stamps.hour.to_numpy()
+    twelve = (hours + 11) % 12 + 1
+    afternoon = hours >= 12
+    return [
+        template.format(
+            y=y, yy=y % 100, mo=mo, d=d, h=h, mi=mi, s=s,
+            dotted='p.m.' if pm else 'a.m.',
+            upper='PM' if pm else 'AM',
+            lower='pm' if pm else 'am',
+            name=names[author])
+        for y, mo, d, h, mi, s, pm, author in zip(
+            stamps.year, stamps.month, stamps.day, twelve,
+            stamps.minute, stamps.second, afternoon, authors)]
+
+
+def _messages(
+        config: SyntheticConfig, random: np.random.RandomState,
+        size: int) -> List[str]:
+    """Message bodies of a block, multi-line ones joined by newlines"""
+    lengths = random.poisson(6, size) + 1
+    words = np.array(VOCABULARY, dtype=object)[
+        random.randint(0, len(VOCABULARY), lengths.sum())]
+    bounds = np.concatenate(([0], np.cumsum(lengths)))
+    emojis = random.rand(size) < config.emoji_rate
+    emoji_picks = random.randint(0, len(EMOJIS), (size, 3))
+    emoji_counts = random.randint(1, 4, size)
+    urls = random.rand(size) < config.url_rate
+    domains = random.randint(0, len(DOMAINS), size)
+    media = random.rand(size) < config.media_rate
+    breaks = np.where(
+        random.rand(size) < config.multiline_rate,
+        random.randint(1, 4, size), 0)
+    marker = MEDIA_MARKERS[config.export_format]
+    messages = []
+    for row in range(size):
+        if media[row]:
+            messages.append(marker)
+            continue
+        parts = list(words[bounds[row]:bounds[row + 1]])
+        for line in range(breaks[row]):
+            # Continuation lines start with a word, never a timestamp
+            parts.insert((line + 1) * len(parts) // (breaks[row] + 1), '\n')
+        if urls[row]:
+            parts.append(
+                f'https://{DOMAINS[domains[row]]}/watch?v={row:x}')
+        text = ' '.join(parts).replace(' \n ', '\n')
+        if emojis[row]:
+            text += ''.join(
+                EMOJIS[pick]
+                for pick in emoji_picks[row, :emoji_counts[row]])
+        messages.append(text)
+    return messages
+
+
+def _chat_lines(config: SyntheticConfig) -> Iterator[str]:
+    """Endless lines of a synthetic export"""
+    template = EXPORT_FORMATS[config.export_format]
+    random = np.random.RandomState(config.seed)
+    names = member_names(config.members)
+    # A few members write most of the messages
+    activity = random.zipf(1.6, config.members).astype(float)
+    activity /= activity.sum()
+    clock = pd.Timestamp(config.start)
+    # Exports open with a notice written in the name of the group
+    yield _prefixes(
+        template, pd.DatetimeIndex([clock]), [GROUP_NAME],
+        np.zeros(1, dtype=int))[0] + SYSTEM_MESSAGE
+    while True:
+        # Bursty conversation: mostly seconds apart, sometimes hours
+        gaps = np.where(
+            random.rand(BLOCK_MESSAGES) < 0.05,
+            random.exponential(6 * 3600, BLOCK_MESSAGES),
+            random.exponential(90, BLOCK_MESSAGES))
+        stamps = clock + pd.to_timedelta(
+            np.cumsum(gaps).astype('int64'), unit='s')
+        clock = stamps[-1]
+        authors = random.choice(config.members, BLOCK_MESSAGES, p=activity)
+        prefixes = _prefixes(template, stamps, names, authors)
+        for prefix, text in zip(
+                prefixes, _messages(config, random, BLOCK_MESSAGES)):
+            yield from (prefix + text).split('\n')
+
+
+def iter_chat_lines(config: SyntheticConfig) -> Iterator[str]:
+    """
+    Lines of a synthetic export, equal configs yield equal lines
+
+    Attributes
+    ----------
+    config (SyntheticConfig): export shape
+
+    Retrurns
+    --------
+    iterator: config.lines text lines without line endings
+    """
+    if config.export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {config.export_format}")
+    return islice(_chat_lines(config), config.lines)
+
+
+def write_chat(stream: BinaryIO, config: SyntheticConfig) -> int:
+    """
+    Write a synthetic export as utf-8 text
+
+    Attributes
+    ----------
+    stream: file-like object opened in binary mode
+    config (SyntheticConfig): export shape
+
+    Retrurns
+    --------
+    int: bytes written
+    """
+    written = 0
+    batch = []
+    for line in iter_chat_lines(config):
+        batch.append(line)
+        if len(batch) == BLOCK_MESSAGES:
+            written += stream.write(('\n'.join(batch) + '\n').encode())
+            batch = []
+    if batch:
+        written += stream.write(('\n'.join(batch) + '\n').encode())
+    return written
@@ -0,0 +1,228 @@
+"""Chat sources of uploaded exports, plain text or WhatsApp zip archives"""
+import io
+import os
+import zipfile
+import logging
+import mimetypes
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple,\
+    BinaryIO
+import pandas as pd
+from processor.transformers.chat_eda import WhatsAppProcess, WhatsAppConfig
+from processor.common.cache import LRUCache, content_hash
+from processor.common.snapshot import describe_upload
+
+# Attachment messages, iOS <attached: 00000012-PHOTO-...jpg> and
+# Android IMG-20200101-WA0001.jpg (file attached)
+ATTACHED_PATTERN = (
+    r'<attached: ([^>]+)>|^\u200e?(.+?) \(file attached\)')
+
+
+class ChatSource(NamedTuple):
+    """
+    class for one chat of an upload
+
+    label: name shown to the user
+    key: content_hash of the chat text and the WhatsAppConfig
+    member: chat entry inside a zip archive, None for plain text
+    upload: uploaded file holding the chat, read only when opened
+    """
+    label: str
+    key: str
+    member: Optional[str]
+    upload: Any
+
+
+def _chat_entries(names: List[str]) -> List[str]:
+    """
+    Chat text entries of an export archive
+
+    WhatsApp names the chat _chat.txt (iOS) or "WhatsApp Chat with
+    ....txt" (Android), other .txt entries are shared documents unless
+    no entry follows that naming.
+    """
+    texts = [name for name in names if name.lower().endswith('.txt')]
+    chats = [
+        name for name in texts
+        if os.path.basename(name).startswith(('_chat', 'WhatsApp Chat'))]
+    return chats or texts
+
+
+def _attachment_kind(name: str) -> str:
+    """Attachment kind guessed from the file extension"""
+    kind = (mimetypes.guess_type(name)[0] or '').split('/')[0]
+    return kind if kind in ('image', 'video', 'audio') else 'document'
+
+
+def attachment_index(
+        archive: zipfile.ZipFile, chats: List[str]) -> pd.DataFrame:
+    """
+    Attachments of an archive indexed from its directory, contents unread
+
+    Attributes
+    ----------
+    archive (ZipFile): export archive
+    chats (list): chat entries left out of the index
+
+    Retrurns
+    --------
+    DataFrame (pandas DF): file name, size in bytes and kind (image,
+        video, audio, document) per attachment
+    """
+    entries = [
+        info for info in archive.infolist()
+        if not info.is_dir() and info.filename not in chats]
+    names = [os.path.basename(info.filename) for info in entries]
+    return pd.DataFrame({
+        'file': names,
+        'size': [info.file_size for info in entries],
+        'kind': [_attachment_kind(name) for name in names]})
+
+
+def upload_id(uploaded_file: Any) -> str:
+    """
+    Identity of an uploaded file across Streamlit reruns
+
+    Attributes
+    ----------
+    uploaded_file: uploaded file, streamlit files carry a unique id
+
+    Retrurns
+    --------
+    str: file id, name and size
+    """
+    size = getattr(uploaded_file, 'size', None)
+    if size is None:
+        size = uploaded_file.seek(0, io.SEEK_END)
+        uploaded_file.seek(0)
+    file_id = getattr(uploaded_file, 'id', None)
+    return f'{file_id}/{uploaded_file.name}/{size}'
+
+
+def _list_upload(
+        uploaded_file: Any,
+        source_config: WhatsAppConfig) -> Tuple[List[Tuple], Dict]:
+    """Chat entries with their content keys and attachment indexes"""
+    uploaded_file.seek(0)
+    if not zipfile.is_zipfile(uploaded_file):
+        uploaded_file.seek(0)
+        key = content_hash(uploaded_file, source_config)
+        return [(uploaded_file.name, key, None)], {}
+    entries, attachments = [], {}
+    uploaded_file.seek(0)
+    with zipfile.ZipFile(uploaded_file) as archive:
+        chats = _chat_entries(archive.namelist())
+        index = attachment_index(archive, chats)
+        for member in chats:
+            label = f'{uploaded_file.name}/{os.path.basename(member)}'
+            # Hashed while decompressed block by block, never extracted
+            with archive.open(member) as stream:
+                key = content_hash(stream, source_config)
+            entries.append((label, key, member))
+            attachments[label] = index
+    return entries, attachments
+
+
+def collect_sources(
+        uploaded_files: List[Any], source_config: WhatsAppConfig,
+        listings: LRUCache) -> Tuple[List[ChatSource], Dict]:
+    """
+    Chats and attachment indexes of the uploaded files
+
+    Uploads are listed and hashed once, reruns find their chat entries
+    and content keys in the listings cache and read nothing.
+
+    Attributes
+    ----------
+    uploaded_files (list): uploaded .txt and .zip files
+    source_config (WhatsAppConfig): configuration the keys depend on
+    listings (LRUCache): chat entries and attachments by upload_id
+
+    Retrurns
+    --------
+    tuple: chat sources and attachment index by source label
+    """
+    sources, attachments = [], {}
+    for uploaded_file in uploaded_files:
+        listing_key = f'{upload_id(uploaded_file)}/{source_config!r}'
+        listing = listings.get(listing_key)
+        if listing is None:
+            listing = listings.put(
+                listing_key, _list_upload(uploaded_file, source_config))
+        entries, index = listing
+        sources.extend(
+            ChatSource(label, key, member, uploaded_file)
+            for label, key, member in entries)
+        attachments.update(index)
+    return sources, attachments
+
+
+@contextmanager
+def open_source(source: ChatSource) -> Iterator[BinaryIO]:
+    """
+    Binary stream of a chat, zip entries are decompressed while read
+
+    Attributes
+    ----------
+    source (ChatSource): chat of an upload
+
+    Retrurns
+    --------
+    iterator: seekable stream of the chat text, the archive is closed
+        on exit and a plain upload is left open
+    """
+    source.upload.seek(0)
+    if source.member is None:
+        yield source.upload
+        return
+    with zipfile.ZipFile(source.upload) as archive,\
+            archive.open(source.member) as stream:
+        yield stream
+
+
+def parse_source(
+        label: str, data: bytes, whatsapp_config: Dict) -> Tuple[Any, Any]:
+    """
+    Process one chat, run in pool workers
+
+    Attributes
+    ----------
+    label (str): chat name for the log
+    data (bytes): chat text
+    whatsapp_config (dict): whatsapp section of the configuration
+
+    Retrurns
+    --------
+    tuple: ProcessedChat (None without messages) and upload description
+    """
+    logging.info("WhatsApp/parse_source(%s)", label)
+    whatsapp = WhatsAppProcess(WhatsAppConfig(**whatsapp_config))
+    stream = io.BytesIO(data)
+    upload = describe_upload(whatsapp, stream)
+    return whatsapp.process_chat(stream), upload
+
+
+def attachment_usage(
+        raw_df: pd.DataFrame, attachments: pd.DataFrame) -> pd.DataFrame:
+    """
+    Attachments shared per member and kind, joined on the file names
+    of the chat's attachment messages
+
+    Attributes
+    ----------
+    Dataframe (pandas DF): raw Dataframe
+    Dataframe (pandas DF): attachment_index of the archive
+
+    Retrurns
+    --------
+    DataFrame (pandas DF): files and megabytes by member and kind
+    """
+    markers = raw_df['message'].astype(object).str.extract(ATTACHED_PATTERN)
+    files = markers[0].fillna(markers[1])
+    shared = pd.DataFrame({
+        'name': raw_df['name'].astype(object), 'file': files}).dropna()
+    shared = shared.merge(attachments, on='file')
+    usage = shared.groupby(['name', 'kind'])['size'].agg(['count', 'sum'])
+    usage.columns = ['files', 'megabytes']
+    usage['megabytes'] = (usage['megabytes'] / 2 ** 20).round(2)
+    return usage.reset_index()
@@ -2,41 +2,51 @@
 Analysis Chats are at one Place
 """
 # Import support labaraies
+import io
+import os
 import logging
-from typing import Any
-from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Tuple
 import numpy as np
 import pandas as pd
 import plotly.express as px
-from textblob import TextBlob
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from wordcloud import WordCloud
+from processor.transformers.aggregates import TimeCube, collocations
+from processor.transformers.sentiment import score_messages
+from processor.common.stopwords import stopwords_for
+from processor.common.profiling import profiled
 
 
-def message_cluster(data_frame: pd.DataFrame):
+# Words drawn in a Word Cloud
+WORD_CLOUD_WORDS = 200
+
+
+@profiled()
+def message_cluster(members: pd.DataFrame):
     """
     Display Message Cluster base on the message statistics
 
     Attributes
     ----------
-    Dataframe (pandas DF)
+    Member Dataframe (pandas DF) from member_statistics
 
     Retrurns
     --------
-    Matplotlib Figure
+    Plotly Figure (pyDash)
     """
-    new_df = pd.DataFrame(data_frame[['message']].groupby(
-        by=data_frame['name']).count())
-    new_df['media_count'] = data_frame[['media']].groupby(
-        by=data_frame['name']).sum()
-    new_df['emoji_count'] = data_frame[['emojis']].groupby(
-        by=data_frame['name']).sum()
-    new_df['urlcount_count'] = data_frame[['urlcount']].groupby(
-        by=data_frame['name']).sum()
-    new_df['letter_count'] = data_frame[['letter_count']].groupby(
-        by=data_frame['name']).sum()
-    new_df['words_count'] = data_frame[['word_count']].groupby(
-        by=data_frame['name']).sum()
-    new_df.reset_index(level=0, inplace=True)
+    logging.info("WhatsApp/message_cluster()")
+    new_df = pd.DataFrame({
+        'name': members.index,
+        'message': members['text_messages'].values,
+        'media_count': members['media'].values,
+        'emoji_count': members['emojis'].values,
+        'urlcount_count': members['links'].values,
+        'letter_count': members['letters'].values,
+        'words_count': members['words'].values})
     fig = px.scatter(
         new_df, x="message", y="words_count",
         size="letter_count", color="name",
@@ -44,6 +54,7 @@ def message_cluster(data_frame: pd.DataFrame):
     return fig
 
 
+@profiled()
 def pie_display_emojis(data_frame: pd.DataFrame):
     """
     Pie chart formation for Emoji's Distrubution
@@ -57,37 +68,33 @@ def pie_display_emojis(data_frame: pd.DataFrame):
     Plotly Figure (pyDash)
     """
     logging.info("WhatsApp/pie_display_emojis()")
-    total_emojis_list = list(set([a for b in data_frame.emojis for a in b]))
-    total_emojis_list = (a for b in data_frame.emojis for a in b)
-    emoji_dict = dict(Counter(total_emojis_list))
-    emoji_dict = sorted(
-        emoji_dict.items(), key=lambda x: x[1], reverse=True)
-    # for i in emoji_dict:
-    #     print(i)
-    emoji_df = pd.DataFrame(emoji_dict, columns=['emojis', 'count'])
+    # Emoji sequences were extracted once by split_emojis
+    emoji_counts = data_frame.emojis.explode().value_counts()
+    emoji_df = pd.DataFrame({
+        'emojis': emoji_counts.index, 'count': emoji_counts.values})
     fig = px.pie(emoji_df, values='count', names='emojis')
     fig.update_traces(textposition='inside', textinfo='percent+label')
     return fig
 
 
-def time_series_plot(data_frame: pd.DataFrame):
+@profiled()
+def time_series_plot(time_cube: TimeCube):
     """
     Time analysis w.r.t to message in chat
 
     Attributes
     ----------
-    Dataframe (pandas DF)
+    TimeCube: precomputed message counts
 
     Retrurns
     --------
     Plotly Figure (pyDash)
     """
     logging.info("WhatsApp/time_series_plot()")
-    z_value = data_frame['date'].value_counts()
-    z_dict = z_value.to_dict()  # converts to dictionary
-    data_frame['msg_count'] = data_frame['date'].map(z_dict)
+    per_date = time_cube.per_date()
+    per_date = per_date[per_date > 0]
     # Timeseries plot
-    fig = px.line(x=data_frame['date'], y=data_frame['msg_count'])
+    fig = px.line(x=per_date.index, y=per_date.values)
     fig.update_layout(
         title='Analysis of number of messages using Time Series plot.',
         xaxis_title='Time Stamp',
@@ -96,6 +103,112 @@ def time_series_plot(data_frame: pd.DataFrame):
     return fig
 
 
+@profiled()
+def top_domains(links: pd.DataFrame, member: str = None):
+    """
+    Top 10 domains of the shared links
+
+    Attributes
+    ----------
+    Link Dataframe (pandas DF) from link_table
+    member (str): member whose links are counted, None for everyone
+
+    Retrurns
+    --------
+    Plotly Figure (pyDash)
+    """
+    logging.info("WhatsApp/top_domains()")
+    if member is not None:
+        links = links[links['name'] == member]
+    domains = links['domain'].value_counts()
+    domains = domains[domains > 0].head(10).sort_values()
+    domain_df = pd.DataFrame({
+        'domain': domains.index.astype(str), 'links': domains.values})
+    fig = px.bar(domain_df, x='links', y='domain', orientation='h')
+    fig.update_layout(
+        title='Top domains shared' + (f' by {member}' if member else ''),
+        xaxis_title='Number of Links',
+        yaxis_title='Domain')
+    return fig
+
+
+@profiled()
+def domains_over_time(links: pd.DataFrame, top: int = 5):
+    """
+    Monthly links of the most shared domains
+
+    Attributes
+    ----------
+    Link Dataframe (pandas DF) from link_table
+    top (int): number of domains drawn, the others are summed up
+
+    Retrurns
+    --------
+    Plotly Figure (pyDash)
+    """
+    logging.info("WhatsApp/domains_over_time()")
+    domains = links['domain'].astype(object)
+    leading = domains.value_counts().index[:top]
+    domains = domains.where(domains.isin(leading), 'other')
+    months = links['datetime'].dt.to_period('M').dt.to_timestamp()
+    monthly = domains.groupby([months, domains]).size().unstack(fill_value=0)
+    if len(monthly):
+        # Months without links are drawn as zeros, not skipped
+        monthly = monthly.reindex(pd.date_range(
+            monthly.index.min(), monthly.index.max(), freq='MS'),
+            fill_value=0)
+    fig = px.line(monthly)
+    fig.update_layout(
+        title='Links shared per month by domain',
+        xaxis_title='Month',
+        yaxis_title='Number of Links')
+    return fig
+
+
+def new_figure(**kwargs) -> Figure:
+    """
+    Matplotlib Figure drawn by its own Agg canvas
+
+    The figure is not registered with pyplot, so figures of different
+    threads or processes share no global state and the figure is freed
+    as soon as it is no longer referenced.
+
+    Attributes
+    ----------
+    kwargs: Figure arguments such as figsize
+
+    Retrurns
+    --------
+    Matplotlib Figure
+    """
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+@profiled()
+def figure_to_image(fig, image_format: str = 'png') -> bytes:
+    """
+    Rasterize a Matplotlib figure and release it
+
+    Attributes
+    ----------
+    fig: Matplotlib Figure
+    image_format (str): 'png' or 'svg'
+
+    Retrurns
+    --------
+    bytes: encoded image
+    """
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format=image_format, bbox_inches='tight')
+    finally:
+        # Drops every artist now instead of at the next garbage collection
+        fig.clear()
+    return buffer.getvalue()
+
+
 def plot_data(data_string):
     """
     Common Bar chat Function for plotting data
@@ -109,7 +222,8 @@ def plot_data(data_string):
     Matplotlib Figure
     """
     logging.info("WhatsApp/plot_data()")
-    fig, ax_value = plt.subplots()
+    fig = new_figure()
+    ax_value = fig.subplots()
     # Save the chart so we can loop through the bars below.
     bars = ax_value.bar(
         x=np.arange(data_string.get('x_value')),
@@ -151,31 +265,24 @@ def plot_data(data_string):
     return fig
 
 
-def max_words_used(data_frame: pd.DataFrame):
+@profiled()
+def max_words_used(members: pd.DataFrame):
     """
     Maximum words used in sentence in group chat
 
     Attributes
     ----------
-    Dataframe (pandas DF)
+    Member Dataframe (pandas DF) from member_statistics
 
     Retrurns
     --------
     Matplotlib Figure
     """
     logging.info("WhatsApp/max_words_used()")
-    # Counting number of letters in each message
-    # data_frame['letters'] = data_frame['message'].apply(
-    #   lambda s: len(s))
-    # # Counting number of word's in each message
-    # data_frame['words'] = data_frame['message'].apply(
-    #   lambda s: len(s.split(' ')))
-    # # np.sum(data_frame['words'])
-    max_words = data_frame[['name', 'word_count']].groupby('name').sum()
-    m_w = max_words.sort_values('word_count', ascending=False).head(10)
+    m_w = members['words'].sort_values(ascending=False).head(10)
     return plot_data({
             'x_value': m_w.size,
-            'y_value': m_w.word_count,
+            'y_value': m_w,
             'tick_label': m_w.index,
             'x_label': 'Name of Group Member',
             'y_label': 'Number of Words in Group Chat',
@@ -184,13 +291,14 @@ def max_words_used(data_frame: pd.DataFrame):
         })
 
 
-def most_active_member(data_frame: pd.DataFrame):
+@profiled()
+def most_active_member(members: pd.DataFrame):
     """
     Most active memeber as per number of messages in group
 
     Attributes
     ----------
-    Dataframe (pandas DF)
+    Member Dataframe (pandas DF) from member_statistics
 
     Retrurns
     --------
@@ -198,7 +306,7 @@ def most_active_member(data_frame: pd.DataFrame):
     """
     logging.info("WhatsApp/most_active_member()")
     # Mostly Active Author in the Group
-    mostly_active = data_frame['name'].value_counts()
+    mostly_active = members['text_messages'].sort_values(ascending=False)
     # Top 10 peoples that are mostly active in our Group
     m_a = mostly_active.head(10)
     return plot_data({
@@ -211,20 +319,21 @@ def most_active_member(data_frame: pd.DataFrame):
         })
 
 
-def most_active_day(data_frame: pd.DataFrame):
+@profiled()
+def most_active_day(time_cube: TimeCube):
     """
     Most active day in Group as per messages numbers
 
     Attributes
     ----------
-    Dataframe (pandas DF)
+    TimeCube: precomputed message counts
 
     Retrurns
     --------
     Matplotlib Figure
     """
     logging.info("WhatsApp/most_active_day()")
-    active_day = data_frame['day'].value_counts()
+    active_day = time_cube.per_weekday().sort_values(ascending=False)
     a_d = active_day.head(10)
     return plot_data({
             'x_value': a_d.size,
@@ -236,13 +345,14 @@ def most_active_day(data_frame: pd.DataFrame):
         })
 
 
-def top_media_contributor(data_frame: pd.DataFrame):
+@profiled()
+def top_media_contributor(members: pd.DataFrame):
     """
     Top 10 members who shared media's in group
 
     Attributes
     ----------
-    Dataframe (pandas DF)
+    Member Dataframe (pandas DF) from member_statistics
 
     Retrurns
     --------
@@ -250,12 +360,10 @@ def top_media_contributor(data_frame: pd.DataFrame):
     """
     logging.info("WhatsApp/top_media_contributor()")
     # Top-10 Media Contributor of Group
-    max_media = data_frame[['name', 'media']].groupby('name').sum()
-    m_m = max_media.sort_values(
-        'media', ascending=False).head(10)
+    m_m = members['media'].sort_values(ascending=False).head(10)
     return plot_data({
             'x_value': m_m.size,
-            'y_value': m_m.media,
+            'y_value': m_m,
             'tick_label': m_m.index,
             'x_label': 'Name of Group Member',
             'y_label': 'Number of Media Shared in Group',
@@ -263,13 +371,14 @@ def top_media_contributor(data_frame: pd.DataFrame):
         })
 
 
-def who_shared_links(data_frame: pd.DataFrame):
+@profiled()
+def who_shared_links(links: pd.DataFrame):
     """
     Top 10 members Who shared maximum links in Group
 
     Attributes
     ----------
-    Dataframe (pandas DF)
+    Link Dataframe (pandas DF) from link_table
 
     Retrurns
     --------
@@ -277,11 +386,11 @@ def who_shared_links(data_frame: pd.DataFrame):
     """
     logging.info("WhatsApp/who_shared_links()")
     # Member who has shared max numbers of link in Group
-    max_words = data_frame[['name', 'urlcount']].groupby('name').sum()
-    m_w = max_words.sort_values('urlcount', ascending=False).head(10)
+    m_w = links['name'].value_counts()
+    m_w = m_w[m_w > 0].head(10)
     return plot_data({
             'x_value': m_w.size,
-            'y_value': m_w.urlcount,
+            'y_value': m_w,
             'tick_label': m_w.index,
             'x_label': 'Name of Group Member',
             'y_label': 'Number of Links Shared in Group',
@@ -290,13 +399,14 @@ def who_shared_links(data_frame: pd.DataFrame):
         })
 
 
-def time_when_group_active(data_frame: pd.DataFrame):
+@profiled()
+def time_when_group_active(time_cube: TimeCube):
     """
     Most Messages Analsyis w.r.t to Time
 
     Attributes
     ----------
-    Dataframe (pandas DF)
+    TimeCube: precomputed message counts
 
     Retrurns
     --------
@@ -304,7 +414,8 @@ def time_when_group_active(data_frame: pd.DataFrame):
     """
     logging.info("WhatsApp/time_when_group_active()")
     # Time whenever the group was highly active
-    active_time = data_frame.datetime.dt.time.value_counts().head(10)
+    active_time = time_cube.per_minute().sort_values(
+        ascending=False).head(10)
     return plot_data({
             'x_value': active_time.size,
             'y_value': active_time.values,
@@ -315,13 +426,14 @@ def time_when_group_active(data_frame: pd.DataFrame):
         })
 
 
-def most_suitable_hour(data_frame: pd.DataFrame):
+@profiled()
+def most_suitable_hour(time_cube: TimeCube):
     """
     Most Messages Analsyis w.r.t to Hour
 
     Attributes
     ----------
-    Dataframe (pandas DF)
+    TimeCube: precomputed message counts
 
     Retrurns
     --------
@@ -329,7 +441,8 @@ def most_suitable_hour(data_frame: pd.DataFrame):
     """
     logging.info("WhatsApp/most_suitable_hour()")
     # Time whenever the group was highly active
-    active_hour = data_frame.datetime.dt.hour.value_counts().head(20)
+    active_hour = time_cube.per_hour().sort_values(
+        ascending=False).head(20)
     return plot_data({
             'x_value': active_hour.size,
             'y_value': active_hour.values,
@@ -340,13 +453,14 @@ def most_suitable_hour(data_frame: pd.DataFrame):
         })
 
 
-def most_suitable_day(data_frame: pd.DataFrame):
+@profiled()
+def most_suitable_day(time_cube: TimeCube):
     """
     Most Messages Analsyis w.r.t to Day
 
     Attributes
     ----------
-    Dataframe (pandas DF)
+    TimeCube: precomputed message counts
 
     Retrurns
     --------
@@ -354,7 +468,8 @@ def most_suitable_day(data_frame: pd.DataFrame):
     """
     logging.info("WhatsApp/most_suitable_day()")
     # Time whenever the group was highly active
-    active_day = data_frame.datetime.dt.day.value_counts().head(20)
+    active_day = time_cube.per_day_of_month().sort_values(
+        ascending=False).head(20)
     return plot_data({
             'x_value': active_day.size,
             'y_value':  active_day.values,
@@ -365,28 +480,154 @@ def most_suitable_day(data_frame: pd.DataFrame):
         })
 
 
-def sentiment_analysis(cloud_df: pd.DataFrame):
+@profiled()
+def sentiment_analysis(
+        cloud_df: pd.DataFrame, mode: str = 'textblob', workers: int = None):
     """
     Sentiment analysis score
 
     Attributes
     ----------
     Dataframe (pandas DF)
+    mode (str): 'textblob' or the vectorized 'lexicon' scoring
+    workers (int): process pool size for TextBlob scoring
 
     Retrurns
     --------
     Matplotlib Figure
     """
-    cloud_df['sentiment'] = cloud_df.message.apply(
-        lambda text: TextBlob(text).sentiment.polarity)
-    sentiment = cloud_df[['name', 'sentiment']].groupby('name').mean()
-    s_a = sentiment.sort_values('sentiment', ascending=False).head(10)
+    logging.info("WhatsApp/sentiment_analysis()")
+    scores = score_messages(cloud_df.message, mode=mode, workers=workers)
+    sentiment = scores.groupby(cloud_df['name'], observed=True).mean()
+    s_a = sentiment.sort_values(ascending=False).head(10)
     return plot_data({
             'x_value': s_a.size,
-            'y_value': s_a.sentiment,
+            'y_value': s_a,
             'tick_label': s_a.index,
             'x_label': 'Name of Group Member',
             'y_label': 'Positive Sentiment in Group',
             'title': 'Analysis of members having higher\
                 score in Positive Sentiment'
-        })
\ No newline at end of file
+        })
+
+
+@profiled()
+def generate_word_cloud(
+        frequencies: pd.Series, title: str, languages=None) -> Any:
+    """
+    Function takes token frequencies as input and transform it to
+    WordCloud display
+
+    attributes
+    ----------
+    frequencies (Series): token and bigram counts indexed by token
+    title (str): title Sting
+    languages (tuple): stopword languages, None for all of them
+
+    Return
+    ------
+    Matplotlib figure for wordcloud
+    """
+    logging.info("WhatsApp/generate_word_cloud()")
+    # Frequent phrases as WordCloud's collocations would show them
+    frequencies = collocations(frequencies, stopwords_for(languages))\
+        .nlargest(WORD_CLOUD_WORDS)
+    if frequencies.empty:
+        frequencies = pd.Series({"NOWORD": 1})
+    wordcloud = WordCloud(
+        scale=3,
+        width=500,
+        height=330,
+        max_words=WORD_CLOUD_WORDS,
+        colormap='tab20c',
+        contour_color='#5d0f24',
+        contour_width=3,
+        font_path='Laila-Regular.ttf',
+        background_color="white").generate_from_frequencies(
+            frequencies.to_dict())
+    # Display the generated image:
+    # the matplotlib way:
+    fig = new_figure(figsize=(10, 8))
+    ax_value = fig.subplots()
+    ax_value.imshow(wordcloud, interpolation='bilinear')
+    ax_value.axis("off")
+    ax_value.set_title(title)
+    return fig
+
+
+# Matplotlib charts which render_chart may draw
+MATPLOTLIB_CHARTS = {
+    chart.__name__: chart for chart in [
+        max_words_used, most_active_member, most_active_day,
+        top_media_contributor, who_shared_links, time_when_group_active,
+        most_suitable_hour, most_suitable_day, sentiment_analysis,
+        generate_word_cloud]}
+
+
+def render_chart(chart: str, *args, **kwargs) -> bytes:
+    """
+    Draw a Matplotlib chart and return its PNG image
+
+    Attributes
+    ----------
+    chart (str): name of a chart in MATPLOTLIB_CHARTS
+    args, kwargs: chart arguments
+
+    Retrurns
+    --------
+    bytes: encoded image, the figure is released
+    """
+    return figure_to_image(MATPLOTLIB_CHARTS[chart](*args, **kwargs))
+
+
+@lru_cache(maxsize=None)
+def render_pool(workers: int) -> ProcessPoolExecutor:
+    """Worker processes kept for the life of the server"""
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def render_charts(
+        jobs: Dict[str, Tuple[str, tuple, dict]],
+        workers: int) -> Iterator[Tuple[str, bytes]]:
+    """
+    Render independent charts concurrently
+
+    Attributes
+    ----------
+    jobs (dict): (chart name, args, kwargs) by cache key
+    workers (int): worker processes, at most one per CPU; charts
+        render in the calling thread with 1 or for a single chart
+
+    Retrurns
+    --------
+    iterator: (cache key, image) in completion order
+    """
+    workers = min(workers, os.cpu_count() or 1)
+    if workers <= 1 or len(jobs) <= 1:
+        for key, (chart, args, kwargs) in jobs.items():
+            yield key, render_chart(chart, *args, **kwargs)
+        return
+    pending = dict(jobs)
+    try:
+        yield from _pool_render(pending, workers)
+    except BrokenProcessPool:
+        # A dead worker breaks the cached pool for good, the charts not
+        # rendered yet are sent once more to a new pool
+        logging.getLogger(__name__).warning(
+            "Render pool broken, starting a new one")
+        render_pool.cache_clear()
+        yield from _pool_render(pending, workers)
+
+
+def _pool_render(
+        pending: Dict[str, Tuple[str, tuple, dict]],
+        workers: int) -> Iterator[Tuple[str, bytes]]:
+    """Render jobs across the render pool, removed from pending when done"""
+    futures = {
+        render_pool(workers).submit(render_chart, chart, *args, **kwargs): key
+        for key, (chart, args, kwargs) in pending.items()}
+    for future in as_completed(futures):
+        key = futures[future]
+        image = future.result()
+        del pending[key]
+        yield key, image
@@ -0,0 +1,72 @@
+"""
+On demand chart display served from the image and figure caches
+"""
+from typing import Any, Callable, Dict, Optional
+from processor.common.cache import LRUCache
+from processor.graphs.charts import render_chart, render_charts
+
+
+def show_chart(
+        surface: Any, images: LRUCache, pending: Optional[Dict], key: str,
+        chart: str, *args, **kwargs):
+    """
+    Display a Matplotlib chart as an image, served from the image
+    cache when the same chart of the same chat was drawn before.
+    Otherwise a placeholder is left for render_pending, or the chart is
+    drawn right away when pending is None.
+
+    Attributes
+    ----------
+    surface: page the chart is shown on, streamlit or a container
+    images (LRUCache): rendered images by chart key
+    pending (dict): placeholders and jobs of the charts left to render
+    key (str): chart_key of the chart
+    chart (str): name of a chart in MATPLOTLIB_CHARTS
+    args, kwargs: chart arguments
+    """
+    image = images.get(key)
+    if image is None and pending is None:
+        image = render_chart(chart, *args, **kwargs)
+        images.put(key, image, size=len(image))
+    if image is None:
+        pending[key] = (surface.empty(), (chart, args, kwargs))
+    else:
+        surface.image(image)
+
+
+def render_pending(images: LRUCache, pending: Dict, workers: int):
+    """
+    Render the charts left as placeholders in one go across the
+    render pool and fill the placeholders as the images arrive
+
+    Attributes
+    ----------
+    images (LRUCache): rendered images by chart key
+    pending (dict): placeholders and jobs left by show_chart, emptied
+    workers (int): render pool size
+    """
+    jobs = {key: job for key, (_, job) in pending.items()}
+    for key, image in render_charts(jobs, workers):
+        images.put(key, image, size=len(image))
+        pending[key][0].image(image)
+    pending.clear()
+
+
+def show_figure(
+        surface: Any, figures: LRUCache, key: str, render: Callable[[], Any]):
+    """
+    Display a Plotly chart, built once per chat and served from the
+    figure cache afterwards
+
+    Attributes
+    ----------
+    surface: page the chart is shown on, streamlit or a container
+    figures (LRUCache): Plotly figures by chart key
+    key (str): chart_key of the chart
+    render (callable): builds the figure
+    """
+    fig = figures.get(key)
+    if fig is None:
+        fig = render()
+        figures.put(key, fig, size=len(fig.to_json()))
+    surface.plotly_chart(fig)
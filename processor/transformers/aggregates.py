@@ -0,0 +1,545 @@
+"""Precomputed aggregates answering the dashboard charts"""
+import logging
+from typing import Dict, FrozenSet, Tuple
+import numpy as np
+import pandas as pd
+from processor.common.profiling import profiled
+
+# Minutes in a day, the finest time bucket of the cube
+DAY_MINUTES = 24 * 60
+
+# Word tokens as WordCloud splits them
+TOKEN_PATTERN = r"\w[\w']*"
+
+# Likelihood ratio above which WordCloud shows a bigram as a phrase
+COLLOCATION_THRESHOLD = 30
+
+
+@profiled()
+def token_frequencies(cloud_df: pd.DataFrame) -> pd.Series:
+    """
+    Per member token and bigram counts of the Word Cloud messages
+
+    Tokens follow WordCloud's own processing: its word pattern, a
+    trailing "'s" dropped and pure numbers removed. Bigrams are the
+    pairs of adjacent tokens of a message, stored as "first second".
+    Stopwords are left in so the language selection can change without
+    recounting, collocations picks the phrases once they are known.
+
+    Attributes
+    ----------
+    Dataframe (pandas DF): Word Cloud dataframe
+
+    Retrurns
+    --------
+    Series: counts indexed by (name, token), bigram tokens hold a space
+    """
+    logging.info("WhatsApp/token_frequencies()")
+    tokens = cloud_df['message'].str.findall(TOKEN_PATTERN).explode()\
+        .dropna().str.replace(r"'s$", '', regex=True)
+    tokens = tokens[~tokens.str.isdigit() & (tokens.str.len() > 0)]
+    # Neighbours in the exploded order are neighbours in their message
+    rows = tokens.index.to_numpy()
+    words = tokens.to_numpy()
+    adjacent = rows[1:] == rows[:-1]
+    bigrams = pd.Series(
+        words[:-1][adjacent], dtype=object) + ' ' + \
+        pd.Series(words[1:][adjacent], dtype=object)
+    rows = np.concatenate((rows, rows[1:][adjacent]))
+    words = np.concatenate((words, bigrams.to_numpy()))
+    names = cloud_df['name'].reindex(rows).to_numpy()
+    frequencies = pd.Series(words).groupby([names, words]).size()
+    frequencies.index.names = ['name', 'token']
+    return frequencies
+
+
+def _likelihood(k: np.ndarray, n: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Binomial log likelihood of WordCloud's collocation score"""
+    return np.log(np.maximum(x, 1e-10)) * k + \
+        np.log(np.maximum(1 - x, 1e-10)) * (n - k)
+
+
+def collocations(
+        frequencies: pd.Series, stopwords: FrozenSet[str],
+        threshold: float = COLLOCATION_THRESHOLD) -> pd.Series:
+    """
+    Word Cloud frequencies with the phrases WordCloud would show
+
+    Mirrors WordCloud's collocations: stopwords are dropped, bigrams
+    holding a stopword are dropped, a bigram scoring above threshold
+    is shown as a phrase and its count is taken from both words.
+
+    Attributes
+    ----------
+    frequencies (Series): counts indexed by token, see token_frequencies
+    stopwords (frozenset): words left out
+    threshold (float): minimum collocation score of a phrase
+
+    Retrurns
+    --------
+    Series: positive counts indexed by word or phrase
+    """
+    phrase = frequencies.index.str.contains(' ', regex=False)
+    unigrams = frequencies[~phrase]
+    unigrams = unigrams[~unigrams.index.isin(stopwords)]
+    bigrams = frequencies[phrase]
+    pairs = bigrams.index.str.split(' ', n=1)
+    first, second = pairs.str[0], pairs.str[1]
+    kept = ~first.isin(stopwords) & ~second.isin(stopwords)
+    bigrams, first, second = bigrams[kept], first[kept], second[kept]
+    if bigrams.empty or unigrams.empty:
+        return unigrams
+    total = unigrams.sum()
+    c12 = bigrams.to_numpy(dtype=float)
+    c1 = unigrams.reindex(first).to_numpy(dtype=float)
+    c2 = unigrams.reindex(second).to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = -2 * (
+            _likelihood(c12, c1, c2 / total)
+            + _likelihood(c2 - c12, total - c1, c2 / total)
+            - _likelihood(c12, c1, c12 / c1)
+            - _likelihood(c2 - c12, total - c1, (c2 - c12) / (total - c1)))
+    # A word making up the whole text scores 0, as in WordCloud
+    score[(c1 >= total) | (c2 >= total)] = 0
+    chosen = score > threshold
+    phrases = bigrams[chosen]
+    taken = pd.concat([
+        pd.Series(phrases.to_numpy(), index=first[chosen]),
+        pd.Series(phrases.to_numpy(), index=second[chosen])])
+    unigrams = unigrams.sub(
+        taken.groupby(level=0).sum(), fill_value=0)
+    counts = pd.concat([unigrams, phrases])
+    return counts[counts > 0].astype('int64')
+
+
+def chat_frequencies(frequencies: pd.Series) -> pd.Series:
+    """
+    Chat wide token counts, the sum of the member tables
+
+    Attributes
+    ----------
+    Series: counts indexed by (name, token)
+
+    Retrurns
+    --------
+    Series: counts indexed by token
+    """
+    return frequencies.groupby(level='token').sum()
+
+
+def member_frequencies(frequencies: pd.Series, member: str) -> pd.Series:
+    """
+    Token counts of one member
+
+    Attributes
+    ----------
+    Series: counts indexed by (name, token)
+    member (str): member name
+
+    Retrurns
+    --------
+    Series: counts indexed by token, empty for unknown members
+    """
+    if member not in frequencies.index.get_level_values('name'):
+        return pd.Series(dtype='int64')
+    return frequencies.xs(member, level='name')
+
+
+def _nonzero(counts: pd.Series) -> pd.Series:
+    """Buckets holding messages, empty ones would chart as zero bars"""
+    return counts[counts > 0]
+
+
+class TimeCube():
+    """
+    Message counts bucketed by date, minute of day and member
+
+    The cube is stored as its date x minute and date x member faces,
+    hours and weekdays are sums along their axes. A dense date x hour x
+    member block would grow with members times days for no chart.
+    Times of day are bucketed by minute, seconds of iOS exports are not
+    kept. Hour, minute, weekday and day of month counts leave out the
+    buckets without messages, as value_counts does.
+    """
+    def __init__(
+            self, start: pd.Timestamp, minutes: np.ndarray,
+            members: np.ndarray, member_names: pd.Index, weeks: Dict):
+        """
+        Constructor for TimeCube
+
+        :param start: first date of the date axis
+        :param minutes: counts with shape (days, DAY_MINUTES)
+        :param members: counts with shape (days, len(member_names))
+        :param member_names: member names by member code
+        :param weeks: weekday number to name mapping
+        """
+        self.start = start
+        self.minutes = minutes
+        self.members = members
+        self.member_names = member_names
+        self.weeks = weeks
+        self.dates = pd.date_range(start, periods=minutes.shape[0])
+
+    @classmethod
+    @profiled(name='TimeCube.build')
+    def build(
+            cls, data_frame: pd.DataFrame, weeks: Dict,
+            member_names: pd.Index = None) -> 'TimeCube':
+        """
+        Build the cube with one bincount per face
+
+        :param data_frame: messages with datetime and name columns
+        :param weeks: weekday number to name mapping
+        :param member_names: member axis, the members of data_frame
+            when not given
+
+        :returns:
+            TimeCube: the message counts
+        """
+        logging.info("WhatsApp/TimeCube.build()")
+        if member_names is None:
+            member_names = pd.Index(data_frame['name'].unique())
+        stamps = data_frame['datetime']
+        if stamps.empty:
+            return cls(
+                pd.Timestamp('today').normalize(),
+                np.zeros((0, DAY_MINUTES), dtype=np.int64),
+                np.zeros((0, len(member_names)), dtype=np.int64),
+                member_names, weeks)
+        days = stamps.dt.normalize()
+        start = days.min()
+        day_index = ((days - start) // pd.Timedelta(days=1)).to_numpy()
+        n_days = int(day_index.max()) + 1
+        minute = (stamps.dt.hour * 60 + stamps.dt.minute).to_numpy()
+        minutes = np.bincount(
+            day_index * DAY_MINUTES + minute,
+            minlength=n_days * DAY_MINUTES).reshape(n_days, DAY_MINUTES)
+        codes = member_names.get_indexer(data_frame['name'])
+        members = np.bincount(
+            day_index * len(member_names) + codes,
+            minlength=n_days * len(member_names)
+        ).reshape(n_days, len(member_names))
+        return cls(start, minutes, members, member_names, weeks)
+
+    def merge(self, other: 'TimeCube') -> 'TimeCube':
+        """
+        Cube holding the counts of both cubes
+
+        :param other: cube of further messages, e.g. a re-export tail
+
+        :returns:
+            TimeCube: counts over the union of dates and members
+        """
+        if not len(other.dates):
+            return self
+        if not len(self.dates):
+            return other
+        start = min(self.start, other.start)
+        n_days = (max(self.dates[-1], other.dates[-1]) - start).days + 1
+        member_names = self.member_names.append(
+            other.member_names.difference(self.member_names))
+        minutes = np.zeros((n_days, DAY_MINUTES), dtype=np.int64)
+        members = np.zeros((n_days, len(member_names)), dtype=np.int64)
+        for cube in (self, other):
+            first = (cube.start - start).days
+            days = slice(first, first + len(cube.dates))
+            minutes[days] += cube.minutes
+            columns = member_names.get_indexer(cube.member_names)
+            members[days, columns] += cube.members
+        return TimeCube(start, minutes, members, member_names, self.weeks)
+
+    def per_date(self) -> pd.Series:
+        """
+        Messages per calendar date
+
+        :returns:
+            Series: counts indexed by date
+        """
+        return pd.Series(self.minutes.sum(axis=1), index=self.dates)
+
+    def per_hour(self) -> pd.Series:
+        """
+        Messages per hour of day
+
+        :returns:
+            Series: counts indexed by hour 0-23, hours with messages
+        """
+        hours = self.minutes.reshape(-1, 24, 60).sum(axis=(0, 2))
+        return _nonzero(pd.Series(hours, index=pd.RangeIndex(24)))
+
+    def per_minute(self) -> pd.Series:
+        """
+        Messages per minute of day
+
+        :returns:
+            Series: counts indexed by "HH:MM" time of day, minutes with
+                messages
+        """
+        index = [f'{m // 60:02d}:{m % 60:02d}' for m in range(DAY_MINUTES)]
+        return _nonzero(pd.Series(self.minutes.sum(axis=0), index=index))
+
+    def per_weekday(self) -> pd.Series:
+        """
+        Messages per weekday
+
+        :returns:
+            Series: counts indexed by weekday name, weekdays with messages
+        """
+        weekdays = np.bincount(
+            self.dates.weekday, weights=self.minutes.sum(axis=1),
+            minlength=7).astype(np.int64)
+        return _nonzero(pd.Series(
+            weekdays, index=[self.weeks[day] for day in range(7)]))
+
+    def per_day_of_month(self) -> pd.Series:
+        """
+        Messages per day of month
+
+        :returns:
+            Series: counts indexed by day 1-31, days with messages
+        """
+        month_days = np.bincount(
+            self.dates.day, weights=self.minutes.sum(axis=1),
+            minlength=32).astype(np.int64)
+        return _nonzero(
+            pd.Series(month_days[1:], index=pd.RangeIndex(1, 32)))
+
+    def per_member(self) -> pd.Series:
+        """
+        Messages per member
+
+        :returns:
+            Series: counts indexed by member name
+        """
+        return pd.Series(self.members.sum(axis=0), index=self.member_names)
+
+    def between(self, first: pd.Timestamp, last: pd.Timestamp) -> 'TimeCube':
+        """
+        Cube of the dates from first to last, views of this cube's faces
+
+        :param first: first date included
+        :param last: last date included
+
+        :returns:
+            TimeCube: counts of the date range
+        """
+        low, high = date_bounds(self.start, len(self.dates), first, last)
+        return TimeCube(
+            self.start + pd.Timedelta(days=low), self.minutes[low:high],
+            self.members[low:high], self.member_names, self.weeks)
+
+
+def date_bounds(
+        start: pd.Timestamp, days: int, first: pd.Timestamp,
+        last: pd.Timestamp) -> Tuple[int, int]:
+    """
+    Day axis slice of a date range, clipped to the axis
+
+    Attributes
+    ----------
+    start (Timestamp): first date of the axis
+    days (int): length of the axis
+    first (Timestamp): first date included, None for the axis start
+    last (Timestamp): last date included, None for the axis end
+
+    Retrurns
+    --------
+    tuple: slice bounds, equal when the range misses the axis
+    """
+    low = 0 if first is None else (
+        pd.Timestamp(first).normalize() - start).days
+    high = days if last is None else (
+        pd.Timestamp(last).normalize() - start).days + 1
+    low = min(max(low, 0), days)
+    return low, min(max(high, low), days)
+
+
+def day_span(
+        first: pd.Timestamp,
+        last: pd.Timestamp) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Timestamp bounds of a date range, the days date_bounds slices
+
+    Attributes
+    ----------
+    first (Timestamp): first date included, None for no lower bound
+    last (Timestamp): last date included, None for no upper bound
+
+    Retrurns
+    --------
+    tuple: start included and end excluded, None where unbounded
+    """
+    start = None if first is None else pd.Timestamp(first).normalize()
+    end = None if last is None else \
+        pd.Timestamp(last).normalize() + pd.Timedelta(days=1)
+    return start, end
+
+
+def rows_between(
+        datetimes: pd.Series, first: pd.Timestamp,
+        last: pd.Timestamp) -> pd.Series:
+    """
+    Mask of the timestamps falling on the dates from first to last
+
+    Attributes
+    ----------
+    datetimes (pandas Series): timestamps of the rows
+    first (Timestamp): first date included, None for no lower bound
+    last (Timestamp): last date included, None for no upper bound
+
+    Retrurns
+    --------
+    pandas Series: boolean mask aligned with datetimes
+    """
+    start, end = day_span(first, last)
+    mask = pd.Series(True, index=datetimes.index)
+    if start is not None:
+        mask &= datetimes >= start
+    if end is not None:
+        mask &= datetimes < end
+    return mask
+
+
+class DailyTotals():
+    """
+    Running totals of the member counts over the days of a chat
+
+    Row d of the cumulative array holds the counts of every day before
+    day d, so the counts of any date range are the difference of two
+    rows whatever the range or chat length.
+    """
+    # Summed per member and day, member_statistics columns first
+    COLUMNS = [
+        'messages', 'text_messages', 'emojis', 'links', 'words', 'letters',
+        'media', 'deleted', 'your_deleted']
+
+    def __init__(
+            self, start: pd.Timestamp, cumulative: np.ndarray,
+            member_names: pd.Index):
+        """
+        Constructor for DailyTotals
+
+        :param start: first date of the day axis
+        :param cumulative: counts with shape (days + 1, members, COLUMNS)
+        :param member_names: member names by member code
+        """
+        self.start = start
+        self.cumulative = cumulative
+        self.member_names = member_names
+
+    @classmethod
+    @profiled(name='DailyTotals.build')
+    def build(
+            cls, raw_df: pd.DataFrame, data_frame: pd.DataFrame,
+            cloud_df: pd.DataFrame, member_names: pd.Index) -> 'DailyTotals':
+        """
+        One weighted bincount per column, then a cumulative sum over days
+
+        :param raw_df: raw DataFrame
+        :param data_frame: cleaned DataFrame
+        :param cloud_df: Word Cloud DataFrame
+        :param member_names: member axis, every name of raw_df
+
+        :returns:
+            DailyTotals: the running totals
+        """
+        logging.info("WhatsApp/DailyTotals.build()")
+        days = raw_df['datetime'].dt.normalize()
+        start = days.min() if len(days) else pd.Timestamp('today').normalize()
+        day_index = ((days - start) // pd.Timedelta(days=1)).to_numpy()
+        n_days = int(day_index.max()) + 1 if len(day_index) else 0
+        cells = day_index * len(member_names) + \
+            member_names.get_indexer(raw_df['name'])
+        counts = data_frame[[
+            'emoji_count', 'urlcount', 'word_count', 'letter_count']]\
+            .reindex(raw_df.index).fillna(0).to_numpy().T
+        weights = [
+            raw_df.index.isin(cloud_df.index),
+            raw_df.index.isin(data_frame.index), *counts,
+            raw_df['media'].to_numpy(),
+            (raw_df['message'] == "This message was deleted").to_numpy(),
+            (raw_df['message'] == "You deleted this message").to_numpy()]
+        size = n_days * len(member_names)
+        daily = np.stack([
+            np.bincount(cells, weights=weight, minlength=size)
+            for weight in weights], axis=-1).round().astype(np.int64)
+        cumulative = np.zeros(
+            (n_days + 1, len(member_names), len(cls.COLUMNS)),
+            dtype=np.int64)
+        np.cumsum(
+            daily.reshape(n_days, len(member_names), len(cls.COLUMNS)),
+            axis=0, out=cumulative[1:])
+        return cls(start, cumulative, member_names)
+
+    def nbytes(self) -> int:
+        """Memory held by the running totals"""
+        return self.cumulative.nbytes
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        """Dates of the day axis"""
+        return pd.date_range(
+            self.start, periods=self.cumulative.shape[0] - 1)
+
+    def totals(
+            self, first: pd.Timestamp = None,
+            last: pd.Timestamp = None) -> np.ndarray:
+        """
+        Counts of a date range, two rows of the running totals
+
+        :param first: first date included, None for the chat start
+        :param last: last date included, None for the chat end
+
+        :returns:
+            array: counts with shape (members, COLUMNS)
+        """
+        low, high = date_bounds(
+            self.start, self.cumulative.shape[0] - 1, first, last)
+        return self.cumulative[high] - self.cumulative[low]
+
+    def members_between(
+            self, first: pd.Timestamp = None,
+            last: pd.Timestamp = None) -> pd.DataFrame:
+        """
+        member_statistics of the messages of a date range
+
+        :param first: first date included, None for the chat start
+        :param last: last date included, None for the chat end
+
+        :returns:
+            DataFrame: member_statistics columns, members without
+                messages in the range left out
+        """
+        members = pd.DataFrame(
+            self.totals(first, last), index=self.member_names,
+            columns=self.COLUMNS)
+        members = members[members[['messages', 'text_messages', 'media']]
+                          .sum(axis=1) > 0]
+        members['average_words'] = (
+            members['words'] / members['text_messages'].where(
+                members['text_messages'] > 0)).fillna(0).round(2)
+        return members[[
+            'messages', 'text_messages', 'emojis', 'links', 'words',
+            'letters', 'average_words', 'media']]
+
+    def statistics(
+            self, first: pd.Timestamp = None,
+            last: pd.Timestamp = None) -> Dict:
+        """
+        Chat statistics counts of a date range
+
+        :param first: first date included, None for the chat start
+        :param last: last date included, None for the chat end
+
+        :returns:
+            dict: the ChatStatistics counts and total_members
+        """
+        totals = pd.DataFrame(
+            self.totals(first, last), columns=self.COLUMNS)
+        return {
+            "media_message": int(totals['media'].sum()),
+            "total_deleted_messages": int(totals['deleted'].sum()),
+            "your_deleted_message": int(totals['your_deleted'].sum()),
+            "total_messages": int(totals['text_messages'].sum()),
+            "link_shared": int(totals['links'].sum()),
+            "total_members": int((totals['text_messages'] > 0).sum())}
@@ -1,10 +1,71 @@
 """Exploratory Data Analysis"""
+import io
 import re
+import codecs
+import hashlib
 import logging
-from typing import List, Dict, Any, NamedTuple
+from functools import lru_cache
+from itertools import chain, islice
+from typing import List, Dict, Any, NamedTuple, Iterable, Iterator, Tuple,\
+    BinaryIO, Pattern
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 import emoji
-from pandas.errors import EmptyDataError
+from processor.common.profiling import profiled, result_rows
+from processor.transformers.aggregates import TimeCube, token_frequencies,\
+    chat_frequencies
+
+
+# Number of leading lines inspected to sniff the export format
+SNIFF_LINES = 50
+
+# Any line opening with a date and time starts a new record, including
+# system events ("X added Y") which carry no member name
+TIMESTAMP_PREFIX = re.compile(
+    r'\[?\d{1,4}[/.\-]\d{1,2}[/.\-]\d{1,4}, \d{1,2}:\d{2}')
+
+# Invisible marks WhatsApp puts in front of some lines
+LINE_MARKS = '\ufeff\u200e'
+
+# Timestamp formats of the Samsung, iOS, OppO and Android exports
+DATETIME_FORMATS = [
+    "%Y-%m-%d, %I:%M %p",
+    "%d/%m/%y, %I:%M:%S %p",
+    "%d/%m/%Y, %I:%M %p",
+    "%d/%m/%y, %I:%M %p"]
+
+# Unique timestamps tried against each format before a full parse
+DATETIME_SAMPLE = 100
+
+# Emoji sequence grammar used by emoji_matcher
+EMOJI_KEYCAP = '[#*0-9]\ufe0f?\u20e3'
+EMOJI_FLAG = '[\U0001F1E6-\U0001F1FF]{2}'
+EMOJI_MODIFIERS = \
+    '[\ufe0e\ufe0f]?[\U0001F3FB-\U0001F3FF]?[\U000E0020-\U000E007F]*'
+EMOJI_NON_BASE = '#*0123456789\u200d\u20e3\ufe0e\ufe0f'
+
+# Joins the messages scanned together by split_emojis
+EMOJI_SEPARATOR = '\x00'
+
+# Integer counters and text columns of the message frames
+COUNTER_COLUMNS = [
+    'media', 'urlcount', 'emoji_count', 'letter_count', 'word_count',
+    'message_count']
+TEXT_COLUMNS = ['message', 'url']
+CATEGORY_COLUMNS = ['domain']
+
+# Host of a URL after its scheme and credentials
+URL_HOST = r'^(?:[a-z][a-z0-9+.-]*://)?(?:[^@/?#\s]*@)?([^/:?#\s]+)'
+
+# Leading messages compared to recognise re-exports of a chat
+LEADING_MESSAGES = 20
+
+# Bytes read from an upload at a time by the streaming ingestion
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Messages per DataFrame batch yielded by the streaming ingestion
+BATCH_MESSAGES = 100000
 
 
 def get_members(data_frame: pd.DataFrame) -> pd.DataFrame:
@@ -55,18 +116,201 @@ def statistics(raw_df: pd.DataFrame, data_frame: pd.DataFrame) -> Dict:
     Dict: Calculated features of members
     """
     logging.info("WhatsApp/statistics()")
-    author_list = get_members(data_frame)
-    return {
-        "media_message": len(
-            raw_df[raw_df.message.str.contains("omitted")]),
-        "total_deleted_messages": len(
-            raw_df[raw_df['message'] == "This message was deleted"]),
-        "your_deleted_message": len(
-            raw_df[raw_df['message'] == "You deleted this message"]),
-        "group_name": raw_df.iloc[0:1]['name'][0],
-        "total_messages": data_frame.shape[0],
-        'total_members': len(author_list),
-        'link_shared': data_frame['urlcount'].sum()}
+    return ChatStatistics().update(raw_df, data_frame).result()
+
+
+@profiled()
+def member_statistics(
+        raw_df: pd.DataFrame, data_frame: pd.DataFrame,
+        cloud_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per member aggregation computed in a single groupby at load time,
+    shared by the member drill-down and every member chart
+
+    Attributes
+    ----------
+    Dataframe (pandas DF) : raw Dataframe
+    Dataframe (pandas DF) : cleaned dataframe
+    Dataframe (pandas DF) : Word Cloud dataframe
+
+    Retrurns
+    --------
+    DataFrame (pandas DF): indexed by member with messages (Word Cloud
+        rows), text_messages (cleaned rows), emojis, links, words,
+        letters, average_words and media columns
+    """
+    logging.info("WhatsApp/member_statistics()")
+    rows = pd.DataFrame({
+        'name': raw_df['name'],
+        'messages': raw_df.index.isin(cloud_df.index),
+        'text_messages': raw_df.index.isin(data_frame.index),
+        'media': raw_df['media']}, index=raw_df.index)
+    counts = data_frame[[
+        'emoji_count', 'urlcount', 'word_count', 'letter_count']]
+    rows = rows.join(counts.astype('int64')).fillna({
+        column: 0 for column in counts})
+    members = rows.groupby('name', observed=True).sum().astype('int64')
+    members = members.rename(columns={
+        'emoji_count': 'emojis', 'urlcount': 'links',
+        'word_count': 'words', 'letter_count': 'letters'})
+    members['average_words'] = (
+        members['words'] / members['text_messages'].where(
+            members['text_messages'] > 0)).fillna(0).round(2)
+    return members[[
+        'messages', 'text_messages', 'emojis', 'links', 'words',
+        'letters', 'average_words', 'media']]
+
+
+class ChatStatistics():
+    """
+    Running summary statistics folded over DataFrame batches
+    """
+    COUNTS = [
+        "media_message", "total_deleted_messages", "your_deleted_message",
+        "total_messages", "link_shared"]
+
+    def __init__(self):
+        """
+        Constructor for ChatStatistics
+        """
+        self.group_name = None
+        self.members = set()
+        self.counts = dict.fromkeys(self.COUNTS, 0)
+
+    def update(
+            self, raw_df: pd.DataFrame,
+            data_frame: pd.DataFrame) -> 'ChatStatistics':
+        """
+        Fold one batch into the running statistics
+
+        :param raw_df: raw DataFrame batch
+        :param data_frame: cleaned DataFrame batch of the same messages
+
+        :returns:
+            self: for chaining
+        """
+        if self.group_name is None and not raw_df.empty:
+            self.group_name = raw_df['name'].iloc[0]
+        self.members.update(get_members(data_frame))
+        self.counts["media_message"] += int(
+            raw_df.message.str.contains("omitted").sum())
+        self.counts["total_deleted_messages"] += int(
+            (raw_df['message'] == "This message was deleted").sum())
+        self.counts["your_deleted_message"] += int(
+            (raw_df['message'] == "You deleted this message").sum())
+        self.counts["total_messages"] += data_frame.shape[0]
+        self.counts["link_shared"] += int(data_frame['urlcount'].sum())
+        return self
+
+    def result(self) -> Dict:
+        """
+        Statistics of all batches seen so far
+
+        :returns:
+            dict: same keys as statistics()
+        """
+        return {
+            **self.counts,
+            "group_name": self.group_name,
+            "total_members": len(self.members)}
+
+
+def _char_class(codepoints: Iterable[int], gap: int = 1) -> str:
+    """
+    Regex character class from code points, runs merged into ranges
+
+    Attributes
+    ----------
+    codepoints (iterable): code points to include
+    gap (int): code points closer than this are merged into one range
+
+    Retrurns
+    --------
+    str: regex character class source
+    """
+    ranges = []
+    for point in sorted(set(codepoints)):
+        if ranges and point <= ranges[-1][1] + gap:
+            ranges[-1][1] = point
+        else:
+            ranges.append([point, point])
+    return '[' + ''.join(
+        re.escape(chr(low)) + ('-' + re.escape(chr(high)) if high > low else '')
+        for low, high in ranges) + ']'
+
+
+@lru_cache(maxsize=None)
+def emoji_matcher() -> Pattern:
+    """
+    Precompiled matcher for complete emoji sequences
+
+    Built once per process from the code points known to the emoji
+    package. Keycaps, flags, skin tones, tag sequences and ZWJ joined
+    sequences match as one emoji. Only consecutive code points are
+    merged into ranges, so no symbol between emoji blocks matches.
+
+    Attributes
+    ----------
+    None
+
+    Retrurns
+    --------
+    Pattern: compiled regex with one capturing group per emoji
+    """
+    points = {ord(char) for code in emoji.UNICODE_EMOJI['en'] for char in code}
+    base = points - set(map(ord, EMOJI_NON_BASE))
+    base -= set(range(0x1F3FB, 0x1F400)) | set(range(0xE0000, 0xE0080))
+    base_class = _char_class(point for point in base if point <= 0xFFFF)\
+        [:-1] + _char_class(
+            point for point in base if point > 0xFFFF)[1:]
+    element = base_class + EMOJI_MODIFIERS
+    return re.compile('(' + '|'.join([
+        EMOJI_KEYCAP, EMOJI_FLAG,
+        element + '(?:\u200d' + element + ')*']) + ')')
+
+
+def split_emojis(messages: pd.Series) -> pd.DataFrame:
+    """
+    Separate emojis from message text in a single pass
+
+    The messages are joined by a NUL separator, which no emoji sequence
+    contains, and the matcher splits the joined text in one scan. Emojis
+    are mapped back to their rows by a binary search over the message
+    ends and the emoji free text is split again on the separator.
+
+    Attributes
+    ----------
+    messages (pandas Series): message strings
+
+    Retrurns
+    --------
+    DataFrame (pandas DF): emojis (list of sequences), emoji_count and
+        emoji_free text aligned with the messages index
+    """
+    matcher = emoji_matcher()
+    texts = messages.astype(object)
+    pieces = matcher.split(EMOJI_SEPARATOR.join(texts.to_numpy()))
+    emoji_free = ''.join(pieces[0::2]).split(EMOJI_SEPARATOR)
+    if len(emoji_free) != len(texts):
+        # A message holding the separator itself, strip it row by row
+        emoji_free = [matcher.sub('', message) for message in texts]
+    found = pieces[1::2]
+    # Text pieces alternate with emojis, emoji starts follow from lengths
+    lengths = np.fromiter(map(len, pieces), dtype=np.int64, count=len(pieces))
+    starts = (np.cumsum(lengths) - lengths)[1::2]
+    ends = np.cumsum(texts.str.len().to_numpy() + 1)
+    counts = np.bincount(
+        np.searchsorted(ends, starts, 'right'), minlength=len(texts))
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    emojis = [[] for _ in range(len(texts))]
+    # Python work per message holding emojis, the others keep []
+    for row in np.flatnonzero(counts):
+        emojis[row] = found[bounds[row]:bounds[row + 1]]
+    return pd.DataFrame({
+        'emojis': emojis,
+        'emoji_count': counts,
+        'emoji_free': emoji_free},
+        index=messages.index)
 
 
 def extract_emojis(string: str) -> str:
@@ -81,7 +325,7 @@ def extract_emojis(string: str) -> str:
     --------
     str: Emoji's extracted from message
     """
-    return ''.join(c for c in string if c in emoji.UNICODE_EMOJI['en'])
+    return ''.join(emoji_matcher().findall(string))
 
 
 def give_emoji_free_text(text: str) -> str:
@@ -96,12 +340,124 @@ def give_emoji_free_text(text: str) -> str:
     --------
     str: Emoji's extracted from message
     """
-    allchars = [str for str in text]
-    emoji_list = [c for c in allchars if c in emoji.UNICODE_EMOJI]
-    clean_text = ' '.join([str for str in text.split() if not any(i in str for i in emoji_list)])
-    return clean_text
+    matcher = emoji_matcher()
+    return ' '.join(
+        word for word in text.split() if not matcher.search(word))
+
+
+@profiled()
+def link_table(raw_df: pd.DataFrame, url_pattern: str) -> pd.DataFrame:
+    """
+    Every link of the messages, found in one regex pass
+
+    The messages are joined by newlines and scanned once, match offsets
+    are mapped back to their rows with a binary search over the message
+    ends. Python work is per link, never per message.
+
+    Attributes
+    ----------
+    Dataframe (pandas DF): raw messages with datetime and name columns
+    url_pattern (str): link regex, its first group is the link when it
+        has groups
+
+    Retrurns
+    --------
+    DataFrame (pandas DF): one row per link indexed by raw_df row id,
+        with name, datetime, domain (lower case, without www.) and url
+    """
+    logging.info("WhatsApp/link_table()")
+    pattern = re.compile(url_pattern)
+    group = 1 if pattern.groups else 0
+    messages = raw_df['message'].astype(object)
+    text = '\n'.join(messages.to_numpy())
+    ends = np.cumsum(messages.str.len().to_numpy() + 1)
+    starts, urls = [], []
+    for found in pattern.finditer(text):
+        starts.append(found.start(group))
+        urls.append(found.group(group))
+    positions = np.searchsorted(
+        ends, np.array(starts, dtype=np.int64), side='right')
+    urls = pd.Series(urls, dtype=object)
+    domains = urls.str.extract(URL_HOST, flags=re.IGNORECASE, expand=False)\
+        .str.lower().str.replace(r'^www\d*\.', '', regex=True)\
+        .str.rstrip('.')
+    return pd.DataFrame({
+        'name': raw_df['name'].take(positions).to_numpy(),
+        'datetime': raw_df['datetime'].take(positions).to_numpy(),
+        'domain': domains.to_numpy(),
+        'url': urls.to_numpy()},
+        index=raw_df.index.take(positions))
 
 
+def _join_lines(lines: List[str]) -> str:
+    """Message text of its lines, blank lines closing the record dropped"""
+    while len(lines) > 1 and not lines[-1]:
+        lines.pop()
+    return '\n'.join(lines)
+
+
+def iter_lines(
+        stream: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """
+    Decode a binary upload in fixed-size chunks and yield its lines
+
+    Attributes
+    ----------
+    stream (BinaryIO): file-like object opened in binary mode
+    chunk_size (int): bytes read per chunk
+
+    Retrurns
+    --------
+    Iterator: chat lines without line breaks
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ''
+    while True:
+        block = stream.read(chunk_size)
+        pending += decoder.decode(block, final=not block)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        yield from lines
+        if not block:
+            break
+    if pending:
+        yield pending
+
+
+def parse_datetimes(stamps: pd.Series) -> pd.Series:
+    """
+    Parse export timestamps with a format detected once from a sample
+
+    Messages share minute or second resolution timestamps, so only the
+    unique strings are cleaned and parsed and the result is mapped back
+    to the rows by their factorized codes.
+
+    Attributes
+    ----------
+    stamps (pandas Series): timestamp strings as captured by the regex
+
+    Retrurns
+    --------
+    pandas Series: datetime64 values aligned with the input index
+    """
+    codes, uniques = pd.factorize(stamps)
+    # iOS date enclosures and Samsung "a.m./p.m." markers
+    cleaned = pd.Series(uniques, dtype=object).str.strip('[]')\
+        .str.replace(r'[p].[m].', 'PM', regex=True)\
+        .str.replace(r'[a].[m].', 'AM', regex=True)
+    sample = cleaned.head(DATETIME_SAMPLE)
+    for fmt in DATETIME_FORMATS:
+        try:
+            pd.to_datetime(sample, format=fmt)
+            parsed = pd.to_datetime(cleaned, format=fmt)
+        except ValueError:
+            continue
+        return pd.Series(
+            pd.DatetimeIndex(parsed).take(codes), index=stamps.index)
+    raise ValueError("Unsupported timestamp format in chat export")
+
+
+@profiled()
 def process_data(messages: str) -> pd.DataFrame:
     """
     Converting string messages into DataFrame
@@ -117,43 +473,171 @@ def process_data(messages: str) -> pd.DataFrame:
     logging.info("WhatsApp/process_data()")
     raw_df = pd.DataFrame(
         messages, columns=['datetime', 'name', 'message'])
-    # SAMSUNG Export time format
-    try:
-        raw_df['datetime'] = raw_df['datetime'].str.replace(
-            r'[p].[m].', 'PM', regex=True)
-        raw_df['datetime'] = raw_df['datetime'].str.replace(
-            r'[a].[m].', 'AM', regex=True)
-        raw_df['datetime'] = pd.to_datetime(
-            raw_df['datetime'], format="%Y-%m-%d, %I:%M %p")
-    except Exception as diag:
-        # IOS Export time format
-        print(diag)
-        try:
-            # Drop date enclosures from date column
-            raw_df['datetime'] = raw_df['datetime'].map(
-                lambda x: x.lstrip('[').rstrip(']'))
-            raw_df['datetime'] = pd.to_datetime(
-                raw_df['datetime'], format="%d/%m/%y, %I:%M:%S %p")
-        except Exception as diag:
-            print(diag)
-            # OppO Export time format
-            try:
-                raw_df['datetime'] = pd.to_datetime(
-                    raw_df['datetime'], format="%d/%m/%Y, %I:%M %p")
-            except Exception as diag:
-                print(diag)
-                # Android Export time format
-                try:
-                    raw_df['datetime'] = pd.to_datetime(
-                        raw_df['datetime'], format="%d/%m/%y, %I:%M %p")
-                except EmptyDataError as diag:
-                    raise diag
-
-    raw_df['date'] = pd.to_datetime(raw_df['datetime']).dt.date
-    raw_df['time'] = pd.to_datetime(raw_df['datetime']).dt.time
+    raw_df['datetime'] = parse_datetimes(raw_df['datetime'])
     return raw_df
 
 
+@lru_cache(maxsize=None)
+def text_dtype() -> Any:
+    """
+    Arrow backed string dtype when pandas and pyarrow provide it
+
+    Attributes
+    ----------
+    None
+
+    Retrurns
+    --------
+    dtype: string[pyarrow], object on older pandas
+    """
+    try:
+        return pd.StringDtype("pyarrow")
+    except (TypeError, ImportError, AttributeError):
+        return object
+
+
+def compact_frame(
+        data_frame: pd.DataFrame, names: Any = None) -> pd.DataFrame:
+    """
+    Memory optimized layout of a message frame
+
+    Member names become categorical codes, counters the smallest integer
+    type holding them and message text Arrow backed strings. datetime
+    stays the one int64 backed timestamp column, date, time and day are
+    derived from it on demand.
+
+    Attributes
+    ----------
+    Dataframe (pandas DF): raw or cleaned message frame
+    names (CategoricalDtype): member categories shared between frames,
+        built from the frame when not given
+
+    Retrurns
+    --------
+    DataFrame (pandas DF): the frame with compact dtypes
+    """
+    compact = {'name': data_frame['name'].astype(
+        'category' if names is None else names)}
+    for column in COUNTER_COLUMNS:
+        if column in data_frame:
+            compact[column] = pd.to_numeric(
+                data_frame[column], downcast='unsigned')
+    for column in TEXT_COLUMNS:
+        if column in data_frame:
+            compact[column] = data_frame[column].astype(text_dtype())
+    for column in CATEGORY_COLUMNS:
+        if column in data_frame:
+            compact[column] = data_frame[column].astype('category')
+    return data_frame.assign(**compact)
+
+
+def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate compact frames keeping their categorical columns
+
+    Categories are united with union_categoricals, so the rows are
+    appended as category codes and no row is converted again. Columns
+    whose categories are equal in every frame keep their order.
+
+    Attributes
+    ----------
+    frames (list): frames with equal columns, categorical columns
+        categorical in every frame
+
+    Retrurns
+    --------
+    DataFrame (pandas DF): the rows of all frames in order
+    """
+    columns = frames[0].columns
+    categorical = [
+        column for column in columns
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype) and any(
+            frame[column].dtype != frames[0][column].dtype
+            for frame in frames[1:])]
+    combined = pd.concat([frame.drop(columns=categorical) for frame in frames])
+    # Empty frames add no rows, their categories may be of another dtype
+    filled = [frame for frame in frames if len(frame)] or frames[:1]
+    for column in categorical:
+        combined[column] = union_categoricals(
+            [frame[column] for frame in filled], sort_categories=True)
+    return combined[columns]
+
+
+def leading_digests(
+        raw_df: pd.DataFrame, count: int = LEADING_MESSAGES) -> List[str]:
+    """
+    Fingerprints of the first messages of a chat
+
+    Re-exports of the same chat start with the same messages, so a
+    digest list equal to the start of another marks uploads of one chat.
+
+    Attributes
+    ----------
+    Dataframe (pandas DF): raw Dataframe
+    count (int): number of leading messages compared
+
+    Retrurns
+    --------
+    list: short hex digest per message
+    """
+    return [
+        hashlib.sha1(
+            f'{stamp}\t{name}\t{message}'.encode('utf-8')).hexdigest()[:16]
+        for stamp, name, message in raw_df[
+            ['datetime', 'name', 'message']].head(count).itertuples(
+                index=False)]
+
+
+def _append_rows(
+        old: pd.DataFrame, new: pd.DataFrame, offset: int) -> pd.DataFrame:
+    """Rows of new appended to old, new row ids shifted by offset"""
+    return concat_frames([old, new.set_axis(new.index + offset, axis=0)])
+
+
+def merge_chats(chat: Any, tail: Any) -> Any:
+    """
+    Merge the processed new tail of a re-export into the stored chat
+
+    Aggregates are added rather than recomputed from the message rows
+    and the compact frames are appended as they are, the stored rows
+    are copied but never converted again.
+
+    Attributes
+    ----------
+    chat (ProcessedChat): previously processed chat
+    tail (ProcessedChat): messages after the previous export
+
+    Retrurns
+    --------
+    ProcessedChat: the extended chat
+    """
+    logging.info("WhatsApp/merge_chats()")
+    offset = chat.raw_df.index.max() + 1
+    raw_df, data_frame, cloud_df, day_df, links = (
+        _append_rows(old, new, offset)
+        for old, new in [
+            (chat.raw_df, tail.raw_df),
+            (chat.data_frame, tail.data_frame),
+            (chat.cloud_df, tail.cloud_df),
+            (chat.day_df, tail.day_df),
+            (chat.links, tail.links)])
+    stats = {
+        key: value + tail.stats[key]
+        for key, value in chat.stats.items() if key in ChatStatistics.COUNTS}
+    stats['group_name'] = chat.stats['group_name']
+    stats['total_members'] = len(get_members(data_frame))
+    members = pd.concat([chat.members, tail.members]).groupby(level=0).sum()
+    members['average_words'] = (
+        members['words'] / members['text_messages'].where(
+            members['text_messages'] > 0)).fillna(0).round(2)
+    tokens = pd.concat([chat.tokens, tail.tokens]).groupby(
+        level=['name', 'token']).sum()
+    return ProcessedChat(
+        raw_df, data_frame, stats, cloud_df, day_df, members,
+        chat.time_cube.merge(tail.time_cube), tokens,
+        chat_frequencies(tokens), links)
+
+
 class WhatsAppConfig(NamedTuple):
     """
     class for Whatsapp Configuration
@@ -169,6 +653,33 @@ class WhatsAppConfig(NamedTuple):
     ignore: list 
 
 
+class ProcessedChat(NamedTuple):
+    """
+    class for the outputs of the processing pipeline
+
+    raw_df: parsed messages
+    data_frame: cleaned message DataFrame
+    stats: summary statistics
+    cloud_df: normalized messages for Word Cloud
+    day_df: day analysis DataFrame
+    members: per member summary
+    time_cube: message counts by date, time and member
+    tokens: Word Cloud token counts by member and token
+    chat_tokens: Word Cloud token counts of the whole chat
+    links: shared links with member, timestamp and domain
+    """
+    raw_df: pd.DataFrame
+    data_frame: pd.DataFrame
+    stats: dict
+    cloud_df: pd.DataFrame
+    day_df: pd.DataFrame
+    members: pd.DataFrame
+    time_cube: TimeCube
+    tokens: pd.Series
+    chat_tokens: pd.Series
+    links: pd.DataFrame
+
+
 class WhatsAppProcess():
     """
     Read and Transform whatsapp messages to analytical format
@@ -181,41 +692,250 @@ class WhatsAppProcess():
         """
         self._logger = logging.getLogger(__name__)
         self.app_config = app_config
-        self.emoji_pattern = re.compile("["
-            u"\U0001F600-\U0001F64F"  # emoticons
-            u"\U0001F300-\U0001F5FF"  # symbols & pictographs
-            u"\U0001F680-\U0001F6FF"  # transport & map symbols
-            u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
-            u"\U0001F1F2-\U0001F1F4"  # Macau flag
-            u"\U0001F1E6-\U0001F1FF"  # flags
-            u"\U0001F600-\U0001F64F"
-            u"\U00002702-\U000027B0"
-            u"\U000024C2-\U0001F251"
-            u"\U0001f926-\U0001f937"
-            u"\U0001F1F2"
-            u"\U0001F1F4"
-            u"\U0001F620"
-            u"\u200d"
-            u"\u2640-\u2642"
-            "]+", flags=re.UNICODE)
+        self.emoji_pattern = emoji_matcher()
+        self.patterns = [re.compile(reg) for reg in app_config.regex_list]
+
+    def detect_format(self, lines: List[str]) -> Any:
+        """
+        Sniff the export format from the leading lines of a chat
+
+        :param lines: sample lines from the start of the export
+
+        :returns:
+            pattern: compiled regex matching most sample lines, None if
+                no configured format matches
+        """
+        sample = [line.lstrip(LINE_MARKS) for line in lines]
+        best_pattern, best_hits = None, 0
+        for pattern in self.patterns:
+            hits = sum(1 for line in sample if pattern.match(line))
+            if hits > best_hits:
+                best_pattern, best_hits = pattern, hits
+        return best_pattern
+
+    def parse_lines(
+            self, lines: Iterable[str],
+            pattern: Any) -> Iterator[Tuple[str, str, str]]:
+        """
+        Walk the chat once line by line with a single compiled pattern
+
+        Lines which do not start a record are continuation lines of a
+        multi-line message and are attached to the previous message,
+        blank lines inside a message included.
+
+        :param lines: iterable of chat lines
+        :param pattern: compiled regex returned by detect_format
+
+        :returns:
+            iterator: (datetime, name, message) tuples
+        """
+        current = None
+        for line in lines:
+            line = line.rstrip('\r\n').lstrip(LINE_MARKS)
+            found = pattern.match(line)
+            if found:
+                if current is not None:
+                    yield current[0], current[1], _join_lines(current[2])
+                current = (found.group(1), found.group(2), [found.group(3)])
+            elif TIMESTAMP_PREFIX.match(line):
+                # System event without member, closes the running message
+                if current is not None:
+                    yield current[0], current[1], _join_lines(current[2])
+                current = None
+            elif current is not None:
+                current[2].append(line)
+        if current is not None:
+            yield current[0], current[1], _join_lines(current[2])
 
     def apply_regex(self, data: str) -> List:
         """
         Read the messages data and apply Regex to List
 
+        The export format is sniffed from the first lines and the text
+        is then parsed in one pass with that format only.
+
         :returns:
             list: List of regex applied messages
         """
-        matches = []
-        for reg in self.app_config.regex_list:
-            matches += re.findall(reg, data)
-        return matches
+        lines = io.StringIO(data)
+        sample = list(islice(lines, SNIFF_LINES))
+        pattern = self.detect_format(sample)
+        if pattern is None:
+            self._logger.warning("Unknown chat export format")
+            return []
+        return list(self.parse_lines(chain(sample, lines), pattern))
+
+    def iter_batches(
+            self, stream: BinaryIO, chunk_size: int = CHUNK_SIZE,
+            batch_messages: int = BATCH_MESSAGES) -> Iterator[pd.DataFrame]:
+        """
+        Streaming ingestion of a binary upload
+
+        The upload is read in chunks of chunk_size bytes and parsed in a
+        single pass; only the message still open at a chunk edge is held
+        over, so batches always end on a message boundary.
+
+        :param stream: file-like object opened in binary mode
+        :param chunk_size: bytes read per chunk
+        :param batch_messages: messages per yielded batch
+
+        :returns:
+            iterator: raw DataFrame batches as built by process_data
+        """
+        lines = iter_lines(stream, chunk_size)
+        sample = list(islice(lines, SNIFF_LINES))
+        pattern = self.detect_format(sample)
+        if pattern is None:
+            self._logger.warning("Unknown chat export format")
+            return
+        messages = self.parse_lines(chain(sample, lines), pattern)
+        offset = 0
+        while True:
+            batch = list(islice(messages, batch_messages))
+            if not batch:
+                break
+            raw_df = process_data(batch)
+            raw_df.index += offset
+            offset += len(batch)
+            yield raw_df
 
-    def get_dataframe(self, raw_df: pd.DataFrame) -> pd.DataFrame:
+    def leading_messages(
+            self, stream: BinaryIO,
+            count: int = LEADING_MESSAGES) -> Any:
+        """
+        Parse only the first messages of an upload
+
+        :param stream: file-like object opened in binary mode, rewound
+            to the start afterwards
+        :param count: number of messages parsed
+
+        :returns:
+            raw_df: raw DataFrame of the first messages, None if no
+                message is found
+        """
+        stream.seek(0)
+        raw_df = next(self.iter_batches(stream, batch_messages=count), None)
+        stream.seek(0)
+        return raw_df
+
+    def message_start(self, stream: BinaryIO, end: int) -> Any:
+        """
+        Byte offset of the last member message starting before end
+
+        The upload is read backwards in chunks from end, so only the
+        bytes after the message start are read.
+
+        :param stream: file-like object opened in binary mode
+        :param end: byte offset searched back from, at a line start
+
+        :returns:
+            int: offset of the line opening the message, None if no
+                member message starts before end
+        """
+        stream.seek(0)
+        pattern = self.detect_format(
+            list(islice(iter_lines(stream), SNIFF_LINES)))
+        position, buffer = end, b''
+        while pattern is not None and position > 0:
+            step = min(CHUNK_SIZE, position)
+            position -= step
+            stream.seek(position)
+            buffer = stream.read(step) + buffer
+            # The first line is only known to be whole at the start
+            first = 0 if position == 0 else buffer.find(b'\n') + 1
+            if position and not first:
+                continue
+            lines = buffer[first:].split(b'\n')
+            starts = position + first + np.cumsum(
+                [0] + [len(line) + 1 for line in lines[:-1]])
+            for start, line in zip(starts[::-1], lines[::-1]):
+                text = line.decode('utf-8', errors='replace')\
+                    .rstrip('\r').lstrip(LINE_MARKS)
+                if pattern.match(text):
+                    return int(start)
+        return None
+
+    def tail_offset(
+            self, stream: BinaryIO, size: int,
+            last_message: Tuple[Any, str, str]) -> Any:
+        """
+        Offset the new messages of a re-export can be parsed from
+
+        The message stored last is parsed again from the upload, when
+        continuation lines of it follow the previous export's end they
+        would be lost by a tail parse starting at that end.
+
+        :param stream: re-export opened in binary mode, rewound after
+        :param size: byte size of the previous export, a prefix of it
+        :param last_message: datetime, name and message of the last
+            message of the previous export
+
+        :returns:
+            int: size when the last message is unchanged in the upload,
+                None when the upload has to be processed whole
+        """
+        start = self.message_start(stream, size)
+        first = None
+        if start is not None:
+            stream.seek(start)
+            first = next(self.iter_batches(stream, batch_messages=1), None)
+        stream.seek(0)
+        if first is None:
+            return None
+        found = tuple(first[['datetime', 'name', 'message']].iloc[0])
+        return size if found == tuple(last_message) else None
+
+    @profiled(rows=lambda frames: result_rows(frames[0]))
+    def process_stream(
+            self, stream: BinaryIO, chunk_size: int = CHUNK_SIZE,
+            keep_frames: bool = True) -> Tuple[Any, Any, Dict, Any, Any]:
+        """
+        Fold streamed batches into frames and running statistics
+
+        Every batch is compacted as soon as it is processed, its Word
+        Cloud rows are taken while the emoji free text is at hand and
+        that text is dropped, so no batch is held in the wide layout.
+
+        :param stream: file-like object opened in binary mode
+        :param chunk_size: bytes read per chunk
+        :param keep_frames: concatenate the batches into full frames,
+            with False only the statistics are kept and memory stays
+            at one batch (cli.py --stats-only)
+
+        :returns:
+            tuple: raw DataFrame, cleaned DataFrame, statistics dict,
+                link table of the cleaned messages and Word Cloud
+                DataFrame, frames are None when keep_frames is False or
+                the chat is empty
+        """
+        chat_stats = ChatStatistics()
+        batches = []
+        for raw_df in self.iter_batches(stream, chunk_size):
+            links = link_table(raw_df, self.app_config.url_pattern)
+            data_frame = self.get_dataframe(raw_df, links)
+            chat_stats.update(raw_df, data_frame)
+            if keep_frames:
+                cloud_df = self.cloud_data(raw_df)
+                # Links of media messages are not counted anywhere
+                links = links[links.index.isin(data_frame.index)]
+                batches.append([
+                    compact_frame(frame) for frame in (
+                        raw_df.drop(columns='emoji_free'), data_frame,
+                        links, cloud_df)])
+        if not batches:
+            return None, None, chat_stats.result(), None, None
+        raw_df, data_frame, links, cloud_df = (
+            concat_frames(frames) for frames in zip(*batches))
+        return raw_df, data_frame, chat_stats.result(), links, cloud_df
+
+    @profiled()
+    def get_dataframe(
+            self, raw_df: pd.DataFrame, links: Any = None) -> pd.DataFrame:
         """
         Read the raw dataframe and trasform it to clean dataframe
 
         :param raw_df: Pandas Dataframe as input
+        :param links: link_table of raw_df, extracted when not given
 
         :returns:
             messages_df: Transformed Pandas DataFrame as Output
@@ -224,11 +944,16 @@ class WhatsAppProcess():
         # FORMATION OF NEW DF for Analysis
         raw_df['media'] = raw_df['message'].apply(
             lambda x: re.findall("omitted", x)).str.len()
-        data_frame = raw_df.assign(
-            emojis=raw_df["message"].apply(extract_emojis))
-        data_frame['urlcount'] = data_frame.message.apply(
-            lambda x: re.findall(self.app_config.url_pattern, x)).str.len()
-        data_frame['urlcount'].groupby(by=data_frame['name']).sum()
+        # Emoji work is done once here, cloud_data reuses emoji_free
+        emoji_df = split_emojis(raw_df['message'])
+        raw_df['emoji_free'] = emoji_df['emoji_free']
+        data_frame = raw_df.drop(columns='emoji_free').assign(
+            emojis=emoji_df['emojis'], emoji_count=emoji_df['emoji_count'])
+        if links is None:
+            links = link_table(raw_df, self.app_config.url_pattern)
+        # Links per row counted from the link table, no regex per row
+        data_frame['urlcount'] = np.bincount(
+            raw_df.index.get_indexer(links.index), minlength=len(raw_df))
         media_messages_df = data_frame[
             data_frame['message'].str.contains("omitted")]
         messages_df = data_frame.drop(media_messages_df.index)
@@ -239,6 +964,33 @@ class WhatsAppProcess():
         self._logger.info("Extractig Raw Dataframe")
         return messages_df
 
+    @profiled()
+    def process_chat(
+            self, stream: BinaryIO,
+            chunk_size: int = CHUNK_SIZE) -> Any:
+        """
+        Run the whole processing pipeline on a binary upload
+
+        :param stream: file-like object opened in binary mode
+        :param chunk_size: bytes read per chunk
+
+        :returns:
+            ProcessedChat: pipeline outputs, None if no message is found
+        """
+        raw_df, data_frame, stats, links, cloud_df = self.process_stream(
+            stream, chunk_size)
+        if raw_df is None:
+            return None
+        day_df = self.day_analysis(data_frame)
+        members = member_statistics(raw_df, data_frame, cloud_df)
+        time_cube = TimeCube.build(
+            data_frame, self.app_config.weeks, members.index)
+        tokens = token_frequencies(cloud_df)
+        return ProcessedChat(
+            raw_df, data_frame, stats, cloud_df, day_df, members, time_cube,
+            tokens, chat_frequencies(tokens), links)
+
+    @profiled()
     def day_analysis(self, data_frame: pd.DataFrame) -> pd.DataFrame:
         """
         Exploratory Data Analysis on Dataframe
@@ -254,14 +1006,15 @@ class WhatsAppProcess():
         #     req_df = data_frame[data_frame["name"] == lst[i]]
         #     # req_df will contain messages of only one particular user
         #     # print(f'{lst[i]} ->  {req_df.shape[0]}')
-        data_frame.groupby('name')['message'].count()\
-            .sort_values(ascending=False).index
-        data_frame['day'] = data_frame.datetime.dt.weekday.map(self.app_config.weeks)
+        # Weekday numbers are the category codes, no per row mapping
+        # date and time are left to datetime.dt, no Python object columns
+        data_frame = data_frame.assign(day=pd.Categorical.from_codes(
+            data_frame.datetime.dt.weekday,
+            categories=[self.app_config.weeks[day] for day in range(7)]))
         # Rearranging the columns for better understanding
         data_frame = data_frame[[
             'datetime', 'day', 'name', 'message',
-            'date', 'time', 'emojis', 'urlcount']]
-        data_frame['day'] = data_frame['day'].astype('category')
+            'emojis', 'emoji_count', 'urlcount']]
         # lst = data_frame.day.unique()
         # Day wise Message list
         # for i in range(len(lst)):
@@ -272,6 +1025,7 @@ class WhatsAppProcess():
         #     pass
         return data_frame
 
+    @profiled()
     def cloud_data(self, raw_df: pd.DataFrame) -> pd.DataFrame:
         """
         Word Cloud DataFrame Formation
@@ -284,10 +1038,12 @@ class WhatsAppProcess():
         sep = '|'
         cloud_df = raw_df[(raw_df["message"].str.contains(
             sep.join(self.app_config.ignore)) == False)]
-        modified_df = cloud_df.copy()
-        modified_df.message = cloud_df.loc[:, 'message'].apply(
-            lambda s: s.lower())\
-            .apply(lambda s: self.emoji_pattern.sub(r'', s))\
+        modified_df = cloud_df.drop(columns='emoji_free', errors='ignore')
+        if 'emoji_free' in cloud_df:
+            emoji_free = cloud_df['emoji_free']
+        else:
+            emoji_free = split_emojis(cloud_df['message'])['emoji_free']
+        modified_df.message = emoji_free.str.lower()\
             .str.replace('\n|\t', '', regex=True)\
             .str.replace(' {2,}', ' ', regex=True)\
             .str.strip().replace(r'http\S+', '', regex=True)\
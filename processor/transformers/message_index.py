@@ -0,0 +1,179 @@
+"""
+Sorted message index backing the message browser
+"""
+import logging
+import numpy as np
+import pandas as pd
+from processor.common.profiling import profiled
+
+# Columns shown by the message browser
+PAGE_COLUMNS = ['datetime', 'name', 'message']
+
+
+def page_frame(raw_df: pd.DataFrame, rows: np.ndarray) -> pd.DataFrame:
+    """
+    Browser rows of one page
+
+    Rows are taken before columns, selecting columns first copies them
+    for the whole chat on every page turn.
+
+    Attributes
+    ----------
+    Dataframe (pandas DF): raw Dataframe
+    rows (array): raw_df row positions of the page
+
+    Retrurns
+    --------
+    DataFrame (pandas DF): PAGE_COLUMNS of the page rows
+    """
+    return raw_df.iloc[rows][PAGE_COLUMNS]
+
+
+class MessageIndex():
+    """
+    Row positions of a chat in timestamp order, overall and per member
+
+    Member rows are kept as offsets into the overall order, concatenated
+    member after member with bounds marking where each member starts,
+    so a member's messages are a slice and stay in timestamp order.
+    """
+    def __init__(
+            self, order: np.ndarray, stamps: np.ndarray,
+            member_rows: np.ndarray, member_bounds: np.ndarray,
+            member_names: pd.Index):
+        """
+        Constructor for MessageIndex
+
+        :param order: raw_df row positions sorted by timestamp
+        :param stamps: timestamps of order, sorted datetime64 values
+        :param member_rows: offsets into order grouped by member
+        :param member_bounds: start of each member in member_rows,
+            with the total length appended
+        :param member_names: member names by member code
+        """
+        self.order = order
+        self.stamps = stamps
+        self.member_rows = member_rows
+        self.member_bounds = member_bounds
+        self.member_names = member_names
+
+    @classmethod
+    @profiled(name='MessageIndex.build')
+    def build(
+            cls, raw_df: pd.DataFrame,
+            member_names: pd.Index) -> 'MessageIndex':
+        """
+        Sort the chat once by timestamp and group the offsets by member
+
+        :param raw_df: messages with datetime and name columns
+        :param member_names: member axis, every name of raw_df
+
+        :returns:
+            MessageIndex: the index
+        """
+        logging.info("WhatsApp/MessageIndex.build()")
+        stamps = raw_df['datetime'].to_numpy()
+        # Exports are nearly sorted, a stable sort keeps same minute order
+        order = np.argsort(stamps, kind='stable')
+        codes = member_names.get_indexer(raw_df['name'])[order]
+        member_rows = np.argsort(codes, kind='stable')
+        member_bounds = np.concatenate((
+            [0], np.cumsum(np.bincount(codes, minlength=len(member_names)))))
+        return cls(
+            order, stamps[order], member_rows, member_bounds, member_names)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def nbytes(self) -> int:
+        """Memory held by the index arrays"""
+        return self.order.nbytes + self.stamps.nbytes + \
+            self.member_rows.nbytes + self.member_bounds.nbytes
+
+    def _offsets(self, member: str = None) -> np.ndarray:
+        """Offsets into order of a member, None for every message"""
+        if member is None:
+            return None
+        code = self.member_names.get_loc(member)
+        return self.member_rows[
+            self.member_bounds[code]:self.member_bounds[code + 1]]
+
+    def count(self, member: str = None) -> int:
+        """
+        Messages of a member, of the whole chat when member is None
+
+        :param member: member name
+        """
+        if member is None:
+            return len(self.order)
+        code = self.member_names.get_loc(member)
+        return int(self.member_bounds[code + 1] - self.member_bounds[code])
+
+    def page_count(self, page_size: int, member: str = None) -> int:
+        """
+        Exact number of pages, at least one
+
+        :param page_size: messages per page
+        :param member: member name, None for every message
+        """
+        return max(1, -(-self.count(member) // page_size))
+
+    def page(
+            self, page: int, page_size: int,
+            member: str = None) -> np.ndarray:
+        """
+        raw_df row positions of one page in timestamp order
+
+        Only the page's slice is read, whatever the chat length.
+
+        :param page: zero based page number
+        :param page_size: messages per page
+        :param member: member name, None for every message
+
+        :returns:
+            array: row positions for raw_df.iloc
+        """
+        start, end = page * page_size, (page + 1) * page_size
+        offsets = self._offsets(member)
+        if offsets is None:
+            return self.order[start:end]
+        return self.order[offsets[start:end]]
+
+    def locate(self, moment: pd.Timestamp, member: str = None) -> int:
+        """
+        Position of the first message at or after a moment
+
+        A binary search on the sorted stamps, then for a member a
+        binary search of that position among the member's offsets.
+
+        :param moment: timestamp to jump to
+        :param member: member name, None for every message
+
+        :returns:
+            int: position among the member's messages, their count when
+                every message is earlier
+        """
+        position = int(np.searchsorted(
+            self.stamps, np.datetime64(pd.Timestamp(moment)), side='left'))
+        offsets = self._offsets(member)
+        if offsets is None:
+            return position
+        return int(np.searchsorted(offsets, position, side='left'))
+
+    def locate_page(
+            self, moment: pd.Timestamp, page_size: int,
+            member: str = None) -> int:
+        """
+        Page holding the first message at or after a moment
+
+        :param moment: timestamp to jump to
+        :param page_size: messages per page
+        :param member: member name, None for every message
+
+        :returns:
+            int: zero based page number, the last page when every
+                message is earlier
+        """
+        return min(
+            self.locate(moment, member) // page_size,
+            self.page_count(page_size, member) - 1)
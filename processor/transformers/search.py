@@ -0,0 +1,248 @@
+"""
+Inverted index answering full-text searches over a chat
+"""
+import re
+import logging
+from typing import Iterable, List, Tuple
+import numpy as np
+import pandas as pd
+from processor.common.profiling import profiled
+from processor.transformers.aggregates import TOKEN_PATTERN
+
+# Quoted phrases, prefixes ending with * and plain keywords of a query
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+# Upper bound of every code point, closes the term range of a prefix
+PREFIX_END = '\U0010ffff'
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Terms of a query written the way messages are indexed
+
+    Attributes
+    ----------
+    text (str): query text
+
+    Retrurns
+    --------
+    list: lower case word tokens
+    """
+    return re.findall(TOKEN_PATTERN, text.lower())
+
+
+def parse_query(query: str) -> List[Tuple[str, List[str]]]:
+    """
+    Split a query into clauses which must all match
+
+    "exact phrase" matches consecutive words, word* matches every term
+    starting with word and any other word must appear in the message.
+
+    Attributes
+    ----------
+    query (str): search box text
+
+    Retrurns
+    --------
+    list: ('phrase' | 'prefix' | 'keyword', terms) clauses
+    """
+    clauses = []
+    for phrase, word in QUERY_PATTERN.findall(query):
+        if phrase:
+            terms = tokenize(phrase)
+            if terms:
+                clauses.append(
+                    ('phrase' if len(terms) > 1 else 'keyword', terms))
+        elif word.endswith('*') and tokenize(word):
+            clauses.append(('prefix', tokenize(word)[:1]))
+        else:
+            clauses.extend(('keyword', [term]) for term in tokenize(word))
+    return clauses
+
+
+class SearchIndex():
+    """
+    Posting arrays of the Word Cloud text, one slice per term
+
+    Postings are sorted by term, row and word position, so the postings
+    of a term are a slice and the terms of a prefix a range of slices.
+    """
+    def __init__(
+            self, terms: np.ndarray, bounds: np.ndarray, rows: np.ndarray,
+            positions: np.ndarray, row_members: np.ndarray,
+            row_stamps: np.ndarray, member_names: pd.Index):
+        """
+        Constructor for SearchIndex
+
+        :param terms: sorted distinct terms
+        :param bounds: start of each term's postings, with the total
+            number of postings appended
+        :param rows: raw_df row position of every posting
+        :param positions: word position of every posting in its message
+        :param row_members: member code of every raw_df row
+        :param row_stamps: timestamp of every raw_df row
+        :param member_names: member names by member code
+        """
+        self.terms = terms
+        self.bounds = bounds
+        self.rows = rows
+        self.positions = positions
+        self.row_members = row_members
+        self.row_stamps = row_stamps
+        self.member_names = member_names
+
+    @classmethod
+    @profiled(name='SearchIndex.build')
+    def build(
+            cls, raw_df: pd.DataFrame, cloud_df: pd.DataFrame,
+            member_names: pd.Index) -> 'SearchIndex':
+        """
+        Tokenize the normalized messages once and sort the postings
+
+        :param raw_df: messages with datetime and name columns
+        :param cloud_df: cloud_data output, a row subset of raw_df
+        :param member_names: member axis, every name of raw_df
+
+        :returns:
+            SearchIndex: the index
+        """
+        logging.info("WhatsApp/SearchIndex.build()")
+        words = cloud_df['message'].str.findall(TOKEN_PATTERN)
+        lengths = words.str.len().to_numpy()
+        flat = [word for message in words for word in message]
+        rows = np.repeat(
+            raw_df.index.get_indexer(cloud_df.index).astype(np.int32),
+            lengths)
+        starts = np.cumsum(lengths) - lengths
+        positions = (
+            np.arange(len(flat)) - np.repeat(starts, lengths)
+        ).astype(np.int32)
+        codes, terms = pd.factorize(np.array(flat, dtype=object), sort=True)
+        # Rows and positions already ascend, a stable sort keeps them so
+        order = np.argsort(codes, kind='stable')
+        bounds = np.concatenate((
+            [0], np.cumsum(np.bincount(codes, minlength=len(terms)))))
+        return cls(
+            np.asarray(terms, dtype=object), bounds, rows[order],
+            positions[order],
+            member_names.get_indexer(raw_df['name']).astype(np.int32),
+            raw_df['datetime'].to_numpy(), member_names)
+
+    def nbytes(self) -> int:
+        """Memory held by the index, terms approximated"""
+        return sum(len(term) + 50 for term in self.terms) + \
+            self.bounds.nbytes + self.rows.nbytes + self.positions.nbytes \
+            + self.row_members.nbytes + self.row_stamps.nbytes
+
+    def _term_range(self, first: str, last: str) -> Tuple[int, int]:
+        """Posting range of the terms between first and last"""
+        low = np.searchsorted(self.terms, first, side='left')
+        high = np.searchsorted(self.terms, last, side='right')
+        return int(self.bounds[low]), int(self.bounds[high])
+
+    def keyword(self, term: str) -> np.ndarray:
+        """
+        Rows containing a term
+
+        :param term: normalized term
+
+        :returns:
+            array: sorted distinct raw_df row positions
+        """
+        low, high = self._term_range(term, term)
+        return np.unique(self.rows[low:high])
+
+    def prefix(self, prefix: str) -> np.ndarray:
+        """
+        Rows containing a term starting with prefix
+
+        :param prefix: normalized term prefix
+
+        :returns:
+            array: sorted distinct raw_df row positions
+        """
+        low, high = self._term_range(prefix, prefix + PREFIX_END)
+        return np.unique(self.rows[low:high])
+
+    def phrase(self, terms: List[str]) -> np.ndarray:
+        """
+        Rows containing the terms as consecutive words
+
+        Every posting is encoded as row and phrase start position in one
+        integer, matches are the codes shared by all terms.
+
+        :param terms: normalized terms in phrase order
+
+        :returns:
+            array: sorted distinct raw_df row positions
+        """
+        width = np.int64(self.positions.max(initial=0)) + 1
+        matches = None
+        for shift, term in enumerate(terms):
+            low, high = self._term_range(term, term)
+            starts = self.positions[low:high].astype(np.int64) - shift
+            # A word before the shift-th position cannot continue a phrase
+            fits = starts >= 0
+            keys = self.rows[low:high][fits].astype(np.int64) * width + \
+                starts[fits]
+            matches = keys if matches is None else np.intersect1d(
+                matches, keys, assume_unique=False)
+            if not len(matches):
+                break
+        return np.unique(matches // width)
+
+    @profiled(name='SearchIndex.search')
+    def search(
+            self, query: str, members: Iterable[str] = None,
+            start: pd.Timestamp = None,
+            end: pd.Timestamp = None) -> np.ndarray:
+        """
+        Rows matching every clause of a query
+
+        :param query: search text, see parse_query
+        :param members: member names the results are restricted to
+        :param start: earliest timestamp of the results
+        :param end: timestamp the results are earlier than
+
+        :returns:
+            array: raw_df row positions in timestamp order
+        """
+        rows = None
+        for kind, terms in parse_query(query):
+            if kind == 'phrase':
+                found = self.phrase(terms)
+            elif kind == 'prefix':
+                found = self.prefix(terms[0])
+            else:
+                found = self.keyword(terms[0])
+            rows = found if rows is None else np.intersect1d(
+                rows, found, assume_unique=True)
+        if rows is None:
+            return np.zeros(0, dtype=np.int32)
+        if members:
+            codes = self.member_names.get_indexer(list(members))
+            rows = rows[np.isin(self.row_members[rows], codes)]
+        stamps = self.row_stamps[rows]
+        if start is not None:
+            keep = stamps >= np.datetime64(pd.Timestamp(start))
+            rows, stamps = rows[keep], stamps[keep]
+        if end is not None:
+            keep = stamps < np.datetime64(pd.Timestamp(end))
+            rows, stamps = rows[keep], stamps[keep]
+        return rows[np.argsort(stamps, kind='stable')]
+
+    def member_counts(self, rows: np.ndarray) -> pd.Series:
+        """
+        Matches per member, most matches first
+
+        :param rows: search results
+
+        :returns:
+            Series: match counts indexed by member name
+        """
+        counts = pd.Series(
+            np.bincount(
+                self.row_members[rows], minlength=len(self.member_names)),
+            index=self.member_names, name='matches')
+        return counts[counts > 0].sort_values(
+            ascending=False, kind='mergesort')
@@ -0,0 +1,171 @@
+"""Sentiment scoring of chat messages"""
+import hashlib
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from textblob import TextBlob
+from textblob.en import sentiment as pattern_sentiment
+from processor.common.profiling import profiled
+
+# Messages scored per worker task
+BATCH_SIZE = 5000
+
+# Scores kept by the process wide cache before it is reset
+CACHE_ENTRIES = 2000000
+
+# Words flipping the polarity of the next word in lexicon mode, as
+# TextBlob's pattern analyzer does
+NEGATIONS = ["not", "never", "no", "n't"]
+
+# Lexicon words, the "n't" of contractions split off as its own token
+LEXICON_TOKEN = r"[a-z]+(?=n't)|n't|[a-z]+(?:'[a-z]+)?"
+
+# Score cache keyed by (mode, message digest), shared by reruns and
+# sessions, guarded by _SCORES_LOCK
+_SCORES: Dict = {}
+_SCORES_LOCK = threading.Lock()
+
+
+def _digest(text: str) -> bytes:
+    """Compact hash of a message text used as cache key"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+
+
+def _textblob_batch(texts: List[str]) -> List[float]:
+    """
+    TextBlob polarity of a batch of texts, run in pool workers
+
+    Attributes
+    ----------
+    texts (list): message strings
+
+    Retrurns
+    --------
+    list: polarity per text
+    """
+    return [TextBlob(text).sentiment.polarity for text in texts]
+
+
+@lru_cache(maxsize=None)
+def polarity_lexicon() -> pd.Series:
+    """
+    Word polarity lexicon of TextBlob's pattern analyzer
+
+    Attributes
+    ----------
+    None
+
+    Retrurns
+    --------
+    Series: polarity indexed by word
+    """
+    return pd.Series({
+        word: tags[None][0] for word, tags in pattern_sentiment.items()
+        if None in tags})
+
+
+def lexicon_scores(texts: pd.Series) -> pd.Series:
+    """
+    Vectorized lexicon polarity for very large chats
+
+    Mean polarity of the lexicon words of each message, negated words
+    weighted by -0.5. Close to TextBlob without its per message parsing.
+    Contractions are split, so "isn't good" negates good like "is not".
+
+    Attributes
+    ----------
+    texts (pandas Series): message strings
+
+    Retrurns
+    --------
+    Series: polarity aligned with the texts index
+    """
+    tokens = texts.str.lower().str.findall(LEXICON_TOKEN).explode().dropna()
+    if tokens.empty:
+        return pd.Series(0.0, index=texts.index)
+    polarity = tokens.map(polarity_lexicon()).to_numpy(dtype=float, copy=True)
+    rows = tokens.index.to_numpy()
+    words = tokens.to_numpy()
+    negated = np.zeros(len(words), dtype=bool)
+    negated[1:] = (rows[1:] == rows[:-1]) & np.isin(words[:-1], NEGATIONS)
+    polarity[negated] *= -0.5
+    scores = pd.Series(polarity, index=tokens.index).groupby(level=0).mean()
+    return scores.reindex(texts.index).fillna(0.0)
+
+
+@lru_cache(maxsize=None)
+def scoring_pool(workers: int) -> ProcessPoolExecutor:
+    """Worker processes kept for the life of the server"""
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def _pool_scores(batches: List[List[str]], workers: int) -> List[float]:
+    """
+    TextBlob polarity of batches across the scoring pool
+
+    A pool whose worker died is replaced and the batches are sent once
+    more to the new pool.
+    """
+    try:
+        results = list(scoring_pool(workers).map(_textblob_batch, batches))
+    except BrokenProcessPool:
+        logging.getLogger(__name__).warning(
+            "Scoring pool broken, starting a new one")
+        scoring_pool.cache_clear()
+        results = list(scoring_pool(workers).map(_textblob_batch, batches))
+    return [score for batch in results for score in batch]
+
+
+@profiled()
+def score_messages(
+        texts: pd.Series, mode: str = 'textblob',
+        workers: Optional[int] = None,
+        batch_size: int = BATCH_SIZE) -> pd.Series:
+    """
+    Polarity of messages, scored once per distinct text
+
+    Distinct texts are looked up in a process wide cache by digest, the
+    missing ones are scored in batches across a long-lived process pool.
+
+    Attributes
+    ----------
+    texts (pandas Series): message strings
+    mode (str): 'textblob' or the vectorized 'lexicon'
+    workers (int): pool size, scoring stays in process with 1 or None
+    batch_size (int): texts per pool task
+
+    Retrurns
+    --------
+    Series: polarity aligned with the texts index
+    """
+    logging.info("WhatsApp/score_messages()")
+    codes, uniques = pd.factorize(texts)
+    keys = [(mode, _digest(text)) for text in uniques]
+    with _SCORES_LOCK:
+        scores = np.array([_SCORES.get(key, np.nan) for key in keys])
+    missing = np.flatnonzero(np.isnan(scores))
+    if len(missing):
+        todo = [uniques[i] for i in missing]
+        if mode == 'lexicon':
+            found = lexicon_scores(pd.Series(todo)).to_numpy()
+        else:
+            batches = [
+                todo[i:i + batch_size]
+                for i in range(0, len(todo), batch_size)]
+            if workers and workers > 1 and len(batches) > 1:
+                found = _pool_scores(batches, workers)
+            else:
+                found = [
+                    score for batch in batches
+                    for score in _textblob_batch(batch)]
+        scores[missing] = found
+        with _SCORES_LOCK:
+            if len(_SCORES) + len(missing) > CACHE_ENTRIES:
+                _SCORES.clear()
+            _SCORES.update(zip((keys[i] for i in missing), found))
+    return pd.Series(scores[codes], index=texts.index)
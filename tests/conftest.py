@@ -0,0 +1,44 @@
+"""
+Shared fixtures of the WhatsApp Chat Analyzer tests
+"""
+import os
+import sys
+import io
+import yaml
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from processor.transformers.chat_eda import WhatsAppProcess,\
+    WhatsAppConfig  # noqa: E402
+from processor.common.synthetic import SyntheticConfig,\
+    write_chat  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def config():
+    """Application configuration shipped with the app"""
+    with open(os.path.join(ROOT, 'configs', 'app_configuration.yml'),
+              encoding='utf-8') as handle:
+        return yaml.safe_load(handle)
+
+
+@pytest.fixture(scope='session')
+def whatsapp(config):
+    """Processor configured like the app"""
+    return WhatsAppProcess(WhatsAppConfig(**config['whatsapp']))
+
+
+@pytest.fixture(scope='session')
+def synthetic_chat():
+    """Bytes of a small synthetic android export with links and emojis"""
+    buffer = io.BytesIO()
+    write_chat(buffer, SyntheticConfig(lines=3000, url_rate=0.2))
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope='session')
+def processed_chat(whatsapp, synthetic_chat):
+    """ProcessedChat of synthetic_chat"""
+    return whatsapp.process_chat(io.BytesIO(synthetic_chat))
@@ -0,0 +1,58 @@
+"""Content addressed, memory bounded caches shared across reruns"""
+import io
+import pandas as pd
+from processor.common.cache import (
+    LRUCache, content_hash, prefix_hash, estimate_size, get_cache)
+from processor.transformers.chat_eda import WhatsAppConfig
+
+
+def test_content_hash_by_content_and_config(config):
+    source = WhatsAppConfig(**config['whatsapp'])
+    stream = io.BytesIO(b'chat export')
+    key = content_hash(stream, source)
+    assert stream.tell() == 0
+    assert key == content_hash(io.BytesIO(b'chat export'), source)
+    assert key != content_hash(io.BytesIO(b'chat export!'), source)
+    assert key != content_hash(io.BytesIO(b'chat export'), source, 'x')
+
+
+def test_prefix_hash_equals_content_hash_of_the_prefix(monkeypatch):
+    monkeypatch.setattr('processor.common.cache.HASH_CHUNK_SIZE', 3)
+    data = b'older export and newer lines'
+    stream = io.BytesIO(data)
+    assert prefix_hash(stream, 12) == content_hash(io.BytesIO(data[:12]))
+    assert prefix_hash(stream, 100) == content_hash(io.BytesIO(data))
+    assert stream.tell() == 0
+
+
+def test_lru_eviction_by_size():
+    cache = LRUCache(100)
+    cache.put('a', 'A', size=40)
+    cache.put('b', 'B', size=40)
+    assert cache.get('a') == 'A'
+    cache.put('c', 'C', size=40)
+    # b was least recently used
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    assert cache.total_bytes == 80
+    cache.put('a', 'AA', size=10)
+    assert cache.total_bytes == 50 and cache.get('a') == 'AA'
+    assert cache.get('missing', 0) == 0
+
+
+def test_oversized_entry_kept_alone():
+    cache = LRUCache(10)
+    cache.put('a', 'A', size=5)
+    cache.put('big', 'B', size=50)
+    assert len(cache) == 1 and cache.get('big') == 'B'
+
+
+def test_estimate_size_of_frames():
+    frame = pd.DataFrame({'x': range(1000)})
+    assert estimate_size(frame) >= 8000
+    assert estimate_size({'frame': frame}) > estimate_size(frame)
+
+
+def test_named_caches_live_in_the_module():
+    cache = get_cache('test_named', 1)
+    assert get_cache('test_named', 50) is cache
+    assert cache.max_bytes == 2 ** 20
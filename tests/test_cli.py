@@ -0,0 +1,74 @@
+"""
+Headless batch processing of export folders
+"""
+import os
+import json
+import yaml
+import cli
+from processor.transformers.chat_eda import WhatsAppProcess, WhatsAppConfig
+from processor.common.synthetic import SyntheticConfig, write_chat
+from conftest import ROOT
+
+CONFIG = os.path.join(ROOT, 'configs', 'app_configuration.yml')
+
+
+def _export(path, seed):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as stream:
+        write_chat(stream, SyntheticConfig(
+            export_format='ios', lines=300, seed=seed))
+
+
+def test_find_chats_names_by_relative_path(tmp_path):
+    _export(str(tmp_path / 'exports' / 'Road' / '_chat.txt'), 0)
+    _export(str(tmp_path / 'exports' / 'Citadel' / '_chat.txt'), 1)
+    chats = cli.find_chats([str(tmp_path / 'exports')])
+    assert [name for _, name in chats] == [
+        os.path.join('Citadel', '_chat'), os.path.join('Road', '_chat')]
+
+
+def test_same_file_names_get_own_outputs(tmp_path):
+    _export(str(tmp_path / 'exports' / 'Road' / '_chat.txt'), 0)
+    _export(str(tmp_path / 'exports' / 'Citadel' / '_chat.txt'), 1)
+    output = tmp_path / 'output'
+    assert cli.main([
+        str(tmp_path / 'exports'), '-o', str(output), '-c', CONFIG,
+        '-w', '2']) == 0
+    summaries = [
+        json.loads((output / folder / '_chat' / 'summary.json').read_text(
+            encoding='utf-8'))
+        for folder in ('Road', 'Citadel')]
+    assert summaries[0]['file'] != summaries[1]['file']
+    assert summaries[0]['stats']['total_messages'] > 0
+
+
+def test_colliding_output_names_fail(tmp_path):
+    first = str(tmp_path / 'a' / '_chat.txt')
+    second = str(tmp_path / 'b' / '_chat.txt')
+    _export(first, 0)
+    _export(second, 1)
+    output = tmp_path / 'output'
+    assert cli.main([
+        first, second, '-o', str(output), '-c', CONFIG, '-w', '1']) == 1
+    assert not (output / '_chat').exists()
+
+
+def test_stats_only_streams_the_statistics(tmp_path):
+    path = str(tmp_path / 'Road' / '_chat.txt')
+    _export(path, 0)
+    output = tmp_path / 'output'
+    assert cli.main([
+        path, '-o', str(output), '-c', CONFIG, '-w', '1', '-f', 'parquet',
+        '--stats-only']) == 0
+    summary = json.loads(
+        (output / '_chat' / 'summary.json').read_text(encoding='utf-8'))
+    assert sorted(summary) == ['file', 'stats']
+    assert not (output / '_chat' / 'members.parquet').exists()
+    with open(CONFIG) as config_file:
+        config = yaml.safe_load(config_file)
+    with open(path, 'rb') as stream:
+        chat = WhatsAppProcess(
+            WhatsAppConfig(**config['whatsapp'])).process_chat(stream)
+    assert summary['stats'] == {
+        key: value.item() if hasattr(value, 'item') else value
+        for key, value in chat.stats.items()}
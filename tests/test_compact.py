@@ -0,0 +1,52 @@
+"""
+Compact dtype layout of the message frames
+"""
+import io
+import pandas as pd
+from processor.transformers.chat_eda import compact_frame, concat_frames,\
+    text_dtype
+
+
+def test_processed_frames_are_compact(processed_chat):
+    raw_df, data_frame = processed_chat.raw_df, processed_chat.data_frame
+    assert 'emoji_free' not in raw_df
+    assert isinstance(raw_df['name'].dtype, pd.CategoricalDtype)
+    assert data_frame['name'].dtype == raw_df['name'].dtype
+    assert raw_df['message'].dtype == text_dtype()
+    assert str(raw_df['datetime'].dtype).startswith('datetime64')
+    for column in ('urlcount', 'emoji_count', 'word_count', 'message_count'):
+        assert data_frame[column].dtype.kind == 'u'
+        assert data_frame[column].dtype.itemsize <= 4
+    assert list(raw_df['name'].cat.categories) == sorted(
+        raw_df['name'].astype(str).unique())
+
+
+def test_cloud_rows_of_batches_equal_whole_chat(whatsapp, synthetic_chat):
+    # Small batches, the Word Cloud rows are built batch by batch
+    batches = list(whatsapp.iter_batches(
+        io.BytesIO(synthetic_chat), batch_messages=300))
+    whole = pd.concat(batches)
+    whole_df = whatsapp.get_dataframe(whole)
+    expected = whatsapp.cloud_data(whole)
+    clouds = []
+    for raw_df in batches:
+        whatsapp.get_dataframe(raw_df)
+        clouds.append(compact_frame(whatsapp.cloud_data(raw_df)))
+    cloud_df = concat_frames(clouds)
+    assert list(cloud_df.index) == list(expected.index)
+    assert list(cloud_df['message']) == list(expected['message'])
+    assert len(whole_df) > 0
+
+
+def test_concat_frames_unites_categories():
+    first = compact_frame(pd.DataFrame({
+        'name': ['Nux', 'Max'], 'message': ['a', 'b'], 'media': [0, 1]}))
+    second = compact_frame(pd.DataFrame({
+        'name': ['Furiosa'], 'message': ['c'], 'media': [300]},
+        index=[2]))
+    combined = concat_frames([first, second])
+    assert list(combined.columns) == ['name', 'message', 'media']
+    assert list(combined['name'].cat.categories) == ['Furiosa', 'Max', 'Nux']
+    assert list(combined['name'].astype(str)) == ['Nux', 'Max', 'Furiosa']
+    assert list(combined['media']) == [0, 1, 300]
+    assert list(combined.index) == [0, 1, 2]
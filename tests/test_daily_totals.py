@@ -0,0 +1,69 @@
+"""Date range dashboards from running daily totals"""
+import pandas as pd
+import pytest
+from processor.transformers.aggregates import DailyTotals, date_bounds
+from processor.transformers.chat_eda import member_statistics
+
+
+@pytest.fixture(scope='module')
+def totals(processed_chat):
+    chat = processed_chat
+    return DailyTotals.build(
+        chat.raw_df, chat.data_frame, chat.cloud_df, chat.members.index)
+
+
+def _rows_between(frame, first, last):
+    days = frame['datetime'].dt.normalize()
+    return frame[(days >= first) & (days <= last)]
+
+
+def test_date_bounds_clipped():
+    start = pd.Timestamp('2021-01-10')
+    assert date_bounds(start, 5, None, None) == (0, 5)
+    assert date_bounds(
+        start, 5, pd.Timestamp('2021-01-11 18:00'),
+        pd.Timestamp('2021-01-12')) == (1, 3)
+    assert date_bounds(
+        start, 5, pd.Timestamp('2021-01-01'),
+        pd.Timestamp('2021-02-01')) == (0, 5)
+    low, high = date_bounds(
+        start, 5, pd.Timestamp('2021-02-01'), pd.Timestamp('2021-03-01'))
+    assert low == high
+
+
+def test_whole_chat_equals_member_statistics(processed_chat, totals):
+    chat = processed_chat
+    expected = member_statistics(chat.raw_df, chat.data_frame, chat.cloud_df)
+    members = totals.members_between()
+    pd.testing.assert_frame_equal(
+        members.loc[expected.index], expected, check_dtype=False,
+        check_index_type=False)
+
+
+def test_range_matches_the_filtered_rows(processed_chat, totals):
+    chat = processed_chat
+    dates = totals.dates
+    first, last = dates[len(dates) // 3], dates[2 * len(dates) // 3]
+    raw_df = _rows_between(chat.raw_df, first, last)
+    expected = member_statistics(
+        raw_df, _rows_between(chat.data_frame, first, last),
+        _rows_between(chat.cloud_df, first, last))
+    expected = expected[expected[['messages', 'text_messages', 'media']]
+                        .sum(axis=1) > 0]
+    members = totals.members_between(first, last)
+    assert not members.empty
+    pd.testing.assert_frame_equal(
+        members.sort_index(), expected.sort_index(), check_dtype=False,
+        check_index_type=False, check_categorical=False)
+    stats = totals.statistics(first, last)
+    assert stats['media_message'] == int(raw_df['media'].sum())
+    assert stats['total_messages'] == int(expected['text_messages'].sum())
+    assert stats['link_shared'] == int(expected['links'].sum())
+
+
+def test_range_outside_the_chat(totals):
+    stats = totals.statistics(
+        pd.Timestamp('1990-01-01'), pd.Timestamp('1990-12-31'))
+    assert set(stats.values()) == {0}
+    assert totals.members_between(
+        pd.Timestamp('1990-01-01'), pd.Timestamp('1990-12-31')).empty
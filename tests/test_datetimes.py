@@ -0,0 +1,41 @@
+"""
+Timestamp parsing with a detected format over the unique strings
+"""
+import pandas as pd
+import pytest
+from processor.transformers.chat_eda import parse_datetimes, process_data
+
+
+@pytest.mark.parametrize('stamps, expected', [
+    (['[20/01/21, 7:52:59 PM]', '[20/01/21, 7:52:59 PM]'],
+     ['2021-01-20 19:52:59'] * 2),
+    (['2021-01-20, 7:52 p.m.', '2021-01-21, 9:05 a.m.'],
+     ['2021-01-20 19:52', '2021-01-21 09:05']),
+    (['20/01/2021, 7:52 PM', '21/01/2021, 12:05 AM'],
+     ['2021-01-20 19:52', '2021-01-21 00:05']),
+    (['20/01/21, 7:52 pm', '21/01/21, 12:05 pm'],
+     ['2021-01-20 19:52', '2021-01-21 12:05'])])
+def test_formats(stamps, expected):
+    parsed = parse_datetimes(pd.Series(stamps))
+    assert parsed.tolist() == pd.to_datetime(expected).tolist()
+
+
+def test_index_kept_and_duplicates_mapped_back():
+    stamps = pd.Series(
+        ['[21/01/21, 8:52:16 PM]', '[20/01/21, 7:52:59 PM]',
+         '[21/01/21, 8:52:16 PM]'], index=[7, 3, 5])
+    parsed = parse_datetimes(stamps)
+    assert parsed.index.tolist() == [7, 3, 5]
+    assert parsed[7] == parsed[5] == pd.Timestamp('2021-01-21 20:52:16')
+
+
+def test_unsupported_format():
+    with pytest.raises(ValueError):
+        parse_datetimes(pd.Series(['Jan 20 2021 19:52']))
+
+
+def test_process_data():
+    raw_df = process_data([('[20/01/21, 7:52:59 PM]', 'Max', 'hi')])
+    assert raw_df.columns.tolist() == ['datetime', 'name', 'message']
+    assert raw_df['datetime'].tolist() == [
+        pd.Timestamp('2021-01-20 19:52:59')]
@@ -0,0 +1,56 @@
+"""
+Shared emoji matcher and the single pass emoji split
+"""
+import emoji
+import pandas as pd
+from processor.transformers.chat_eda import emoji_matcher, split_emojis,\
+    extract_emojis, give_emoji_free_text
+
+
+def test_sequences_match_as_one_emoji():
+    family = '\U0001F468‍\U0001F469‍\U0001F467'
+    thumbs = '\U0001F44D\U0001F3FD'
+    flag = '\U0001F1EE\U0001F1F3'
+    keycap = '1️⃣'
+    text = f'hi {family} {thumbs}{flag} {keycap}!'
+    assert emoji_matcher().findall(text) == [family, thumbs, flag, keycap]
+
+
+def test_no_symbol_between_emoji_blocks_matches():
+    known = {ord(char) for code in emoji.UNICODE_EMOJI['en']
+             for char in code}
+    matcher = emoji_matcher()
+    strays = [
+        point for point in range(0x10000, 0x20000)
+        if point not in known and matcher.fullmatch(chr(point))]
+    assert strays == []
+
+
+def test_plain_text_has_no_emojis():
+    assert extract_emojis('version 2.0, 10 * 3 # done') == ''
+    assert give_emoji_free_text('fire \U0001F525 road') == 'fire road'
+
+
+def test_split_emojis_rows():
+    messages = pd.Series(
+        ['Witness me!\U0001F525\U0001F525', '', 'no emoji',
+         '☝\U0001F3FB up'], index=[4, 5, 6, 7])
+    split = split_emojis(messages)
+    assert list(split.index) == [4, 5, 6, 7]
+    assert split['emojis'].tolist() == [
+        ['\U0001F525', '\U0001F525'], [], [], ['☝\U0001F3FB']]
+    assert split['emoji_count'].tolist() == [2, 0, 0, 1]
+    assert split['emoji_free'].tolist() == [
+        'Witness me!', '', 'no emoji', ' up']
+
+
+def test_split_emojis_with_separator_in_message():
+    messages = pd.Series(['a\x00\U0001F603b', '\U0001F603'])
+    split = split_emojis(messages)
+    assert split['emoji_free'].tolist() == ['a\x00b', '']
+    assert split['emoji_count'].tolist() == [1, 1]
+
+
+def test_split_emojis_empty():
+    split = split_emojis(pd.Series([], dtype=object))
+    assert split.empty
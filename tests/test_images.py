@@ -0,0 +1,34 @@
+"""Rasterized chart images and their cache keys"""
+from processor.common.cache import LRUCache, chart_key
+from processor.graphs.charts import (
+    new_figure, figure_to_image, render_chart, MATPLOTLIB_CHARTS)
+
+
+def test_chart_key_per_chat_chart_and_parameters():
+    key = chart_key('chat', 'generate_word_cloud', 'Ann', ('english',))
+    assert key == chart_key('chat', 'generate_word_cloud', 'Ann', ('english',))
+    assert len({
+        key,
+        chart_key('other', 'generate_word_cloud', 'Ann', ('english',)),
+        chart_key('chat', 'max_words_used', 'Ann', ('english',)),
+        chart_key('chat', 'generate_word_cloud', 'Bob', ('english',)),
+        chart_key('chat', 'generate_word_cloud', 'Ann', ('french',))}) == 5
+
+
+def test_figure_to_image_releases_the_figure():
+    fig = new_figure(figsize=(2, 2))
+    fig.subplots().plot([1, 2, 3])
+    image = figure_to_image(fig)
+    assert image.startswith(b'\x89PNG')
+    assert not fig.axes
+    assert figure_to_image(new_figure(), 'svg').lstrip().startswith(b'<?xml')
+
+
+def test_rendered_images_cached_by_size(processed_chat):
+    assert 'generate_word_cloud' in MATPLOTLIB_CHARTS
+    images = LRUCache(2 ** 20)
+    key = chart_key('chat', 'most_active_day')
+    image = render_chart('most_active_day', processed_chat.time_cube)
+    images.put(key, image, size=len(image))
+    assert images.get(key) is image
+    assert images.total_bytes == len(image)
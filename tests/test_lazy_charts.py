@@ -0,0 +1,99 @@
+"""On demand chart display served from the image and figure caches"""
+import pytest
+from processor.common.cache import LRUCache
+from processor.graphs import display
+
+
+class Surface:
+    """Records what a page or placeholder was asked to show"""
+
+    def __init__(self):
+        self.shown = []
+        self.placeholders = []
+
+    def empty(self):
+        placeholder = Surface()
+        self.placeholders.append(placeholder)
+        return placeholder
+
+    def image(self, image):
+        self.shown.append(image)
+
+    def plotly_chart(self, fig):
+        self.shown.append(fig)
+
+
+class Figure:
+    def __init__(self, name):
+        self.name = name
+
+    def to_json(self):
+        return self.name
+
+
+@pytest.fixture
+def drawn(monkeypatch):
+    calls = []
+
+    def render_chart(chart, *args, **kwargs):
+        calls.append(chart)
+        return b'\x89PNG' + chart.encode()
+
+    def render_charts(jobs, workers):
+        for key, (chart, args, kwargs) in jobs.items():
+            yield key, render_chart(chart, *args, **kwargs)
+    monkeypatch.setattr(display, 'render_chart', render_chart)
+    monkeypatch.setattr(display, 'render_charts', render_charts)
+    return calls
+
+
+def test_cached_chart_is_not_drawn(drawn):
+    page, images, pending = Surface(), LRUCache(2 ** 20), {}
+    images.put('key', b'\x89PNG cached')
+    display.show_chart(page, images, pending, 'key', 'most_active_day')
+    assert drawn == [] and pending == {}
+    assert page.shown == [b'\x89PNG cached']
+
+
+def test_charts_render_only_when_requested(drawn):
+    page, images, pending = Surface(), LRUCache(2 ** 20), {}
+    display.show_chart(
+        page, images, pending, 'day', 'most_active_day', 'cube')
+    display.show_chart(page, images, pending, 'member', 'most_active_member')
+    assert drawn == [] and page.shown == []
+    assert pending['day'][1] == ('most_active_day', ('cube',), {})
+
+    display.render_pending(images, pending, 1)
+    assert drawn == ['most_active_day', 'most_active_member']
+    assert pending == {}
+    assert [placeholder.shown for placeholder in page.placeholders] == [
+        [b'\x89PNGmost_active_day'], [b'\x89PNGmost_active_member']]
+
+    # A rerun is served from the image cache
+    rerun = Surface()
+    display.show_chart(rerun, images, pending, 'day', 'most_active_day')
+    display.render_pending(images, pending, 1)
+    assert drawn == ['most_active_day', 'most_active_member']
+    assert rerun.shown == [b'\x89PNGmost_active_day']
+    assert rerun.placeholders == []
+
+
+def test_chart_drawn_inline_without_pending(drawn):
+    page, images = Surface(), LRUCache(2 ** 20)
+    display.show_chart(page, images, None, 'key', 'most_active_day')
+    display.show_chart(page, images, None, 'key', 'most_active_day')
+    assert drawn == ['most_active_day']
+    assert images.get('key') == b'\x89PNGmost_active_day'
+    assert page.shown == [b'\x89PNGmost_active_day'] * 2
+
+
+def test_figure_built_once():
+    page, figures, built = Surface(), LRUCache(2 ** 20), []
+
+    def render():
+        built.append('emojis')
+        return Figure('emojis')
+    display.show_figure(page, figures, 'key', render)
+    display.show_figure(page, figures, 'key', render)
+    assert built == ['emojis']
+    assert [fig.name for fig in page.shown] == ['emojis', 'emojis']
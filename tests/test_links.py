@@ -0,0 +1,57 @@
+"""Link table of the messages and the date range mask shared with it"""
+import pandas as pd
+from processor.transformers.chat_eda import link_table
+from processor.transformers.aggregates import (
+    DailyTotals, day_span, rows_between)
+
+
+def test_link_table_rows_and_domains(config):
+    raw_df = pd.DataFrame({
+        'name': ['Ann', 'Bob', 'Ann'],
+        'datetime': pd.to_datetime(
+            ['2021-01-01 10:00', '2021-01-02 11:00', '2021-01-03 12:00']),
+        'message': [
+            'see https://www.Example.org/a and http://docs.python.org/3',
+            'no links',
+            'multi\nline https://WWW2.news.example.com./x']},
+        index=[10, 11, 12])
+    links = link_table(raw_df, config['whatsapp']['url_pattern'])
+    assert links.index.tolist() == [10, 10, 12]
+    assert links['name'].tolist() == ['Ann', 'Ann', 'Ann']
+    assert links['domain'].tolist() == [
+        'example.org', 'docs.python.org', 'news.example.com']
+    assert links['datetime'].tolist() == [
+        raw_df.loc[10, 'datetime']] * 2 + [raw_df.loc[12, 'datetime']]
+
+
+def test_link_table_without_links(config):
+    raw_df = pd.DataFrame({
+        'name': ['Ann'], 'datetime': [pd.Timestamp('2021-01-01')],
+        'message': ['hello']})
+    links = link_table(raw_df, config['whatsapp']['url_pattern'])
+    assert links.empty
+    assert list(links.columns) == ['name', 'datetime', 'domain', 'url']
+
+
+def test_processed_links_match_statistics(processed_chat):
+    links = processed_chat.links
+    assert len(links) == processed_chat.stats['link_shared']
+    assert links.index.isin(processed_chat.raw_df.index).all()
+
+
+def test_day_span_inclusive_dates():
+    assert day_span(
+        pd.Timestamp('2021-01-02 13:00'), pd.Timestamp('2021-01-04')) == (
+        pd.Timestamp('2021-01-02'), pd.Timestamp('2021-01-05'))
+    assert day_span(None, None) == (None, None)
+
+
+def test_rows_between_matches_daily_totals(processed_chat):
+    chat = processed_chat
+    totals = DailyTotals.build(
+        chat.raw_df, chat.data_frame, chat.cloud_df, chat.members.index)
+    dates = totals.dates
+    first, last = dates[len(dates) // 4], dates[len(dates) // 2]
+    links = chat.links[rows_between(chat.links['datetime'], first, last)]
+    assert len(links) == totals.statistics(first, last)['link_shared']
+    assert rows_between(chat.links['datetime'], None, None).all()
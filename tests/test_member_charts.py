@@ -0,0 +1,30 @@
+"""Member charts drawn from the single member aggregation"""
+import pytest
+from processor.graphs import charts
+
+
+def _bars(fig):
+    axes = fig.axes[0]
+    labels = [label.get_text() for label in axes.get_xticklabels()]
+    heights = [patch.get_height() for patch in axes.patches]
+    return dict(zip(labels, heights))
+
+
+@pytest.mark.parametrize('chart, column', [
+    (charts.max_words_used, 'words'),
+    (charts.most_active_member, 'text_messages'),
+    (charts.top_media_contributor, 'media')])
+def test_bar_charts_show_the_top_members(processed_chat, chart, column):
+    members = processed_chat.members
+    top = members[column].sort_values(ascending=False).head(10)
+    assert _bars(chart(members)) == {
+        str(name): count for name, count in top.items()}
+
+
+def test_message_cluster_one_point_per_member(processed_chat):
+    members = processed_chat.members
+    fig = charts.message_cluster(members)
+    names = {trace.name for trace in fig.data}
+    assert names == {str(name) for name in members.index}
+    points = sum(len(trace.x) for trace in fig.data)
+    assert points == len(members)
@@ -0,0 +1,46 @@
+"""Per member statistics computed once at load time"""
+import pandas as pd
+from processor.transformers.chat_eda import member_statistics
+
+
+def test_member_statistics_match_per_member_counts(processed_chat):
+    chat = processed_chat
+    members = member_statistics(chat.raw_df, chat.data_frame, chat.cloud_df)
+    assert members.columns.tolist() == [
+        'messages', 'text_messages', 'emojis', 'links', 'words',
+        'letters', 'average_words', 'media']
+    assert set(members.index) == set(chat.raw_df['name'])
+    for name in members.index[:5]:
+        raw = chat.raw_df[chat.raw_df['name'] == name]
+        text = chat.data_frame[chat.data_frame['name'] == name]
+        row = members.loc[name]
+        assert row['messages'] == (chat.cloud_df['name'] == name).sum()
+        assert row['text_messages'] == len(text)
+        assert row['emojis'] == text['emoji_count'].sum()
+        assert row['links'] == text['urlcount'].sum()
+        assert row['words'] == text['word_count'].sum()
+        assert row['letters'] == text['letter_count'].sum()
+        assert row['media'] == raw['media'].sum()
+        if len(text):
+            assert row['average_words'] == round(
+                text['word_count'].sum() / len(text), 2)
+
+
+def test_processed_chat_members(processed_chat):
+    chat = processed_chat
+    expected = member_statistics(
+        chat.raw_df, chat.data_frame, chat.cloud_df)
+    pd.testing.assert_frame_equal(
+        chat.members, expected, check_index_type=False)
+
+
+def test_member_without_text_messages():
+    raw_df = pd.DataFrame({
+        'name': ['Ann', 'Bob'], 'message': ['hello there', '<Media>'],
+        'media': [False, True]})
+    data_frame = pd.DataFrame({
+        'name': ['Ann'], 'emoji_count': [0], 'urlcount': [0],
+        'word_count': [2], 'letter_count': [11]}, index=[0])
+    members = member_statistics(raw_df, data_frame, data_frame)
+    assert members.loc['Bob'].tolist() == [0, 0, 0, 0, 0, 0, 0.0, 1]
+    assert members.loc['Ann', 'average_words'] == 2.0
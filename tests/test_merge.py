@@ -0,0 +1,84 @@
+"""
+Incremental re-import: tail parsing and merging into the stored chat
+"""
+import io
+import pandas as pd
+import pytest
+from processor.transformers import chat_eda
+from processor.transformers.chat_eda import merge_chats
+
+OLD = (
+    "[20/01/21, 7:52:59 PM] Max: I live, I die\n"
+    "[21/01/21, 8:52:16 PM] Nux: I live again! https://example.org/v\n"
+    "[22/01/21, 9:00:00 AM] Furiosa: Remember me?\n")
+NEW = (
+    "[23/01/21, 3:32:59 PM] Nux: Witness me! 🔥\n"
+    "[24/01/21, 4:43:48 PM] Max: Where must we go\n"
+    "we who wander this wasteland\n")
+
+
+def _last_message(chat):
+    return chat.raw_df[['datetime', 'name', 'message']].iloc[-1]
+
+
+def _plain(frame):
+    return frame.astype(str).reset_index(drop=True)
+
+
+def test_merge_equals_processing_the_whole_export(whatsapp, synthetic_chat):
+    lines = synthetic_chat.split(b'\n')
+    # The cut must fall on a message start for a byte prefix export
+    cut = next(
+        number for number in range(len(lines) // 2, len(lines))
+        if lines[number][:1].isdigit())
+    old = b'\n'.join(lines[:cut]) + b'\n'
+    stored = whatsapp.process_chat(io.BytesIO(old))
+    upload = io.BytesIO(synthetic_chat)
+    assert whatsapp.tail_offset(
+        upload, len(old), _last_message(stored)) == len(old)
+    upload.seek(len(old))
+    merged = merge_chats(stored, whatsapp.process_chat(upload))
+    whole = whatsapp.process_chat(io.BytesIO(synthetic_chat))
+    for field in ('raw_df', 'data_frame', 'cloud_df', 'day_df', 'links'):
+        pd.testing.assert_frame_equal(
+            _plain(getattr(merged, field)), _plain(getattr(whole, field)))
+        assert list(getattr(merged, field).index) == list(
+            getattr(whole, field).index)
+    assert merged.stats == whole.stats
+    assert merged.members.to_dict('index') == whole.members.to_dict('index')
+    assert merged.time_cube.per_date().equals(whole.time_cube.per_date())
+    assert merged.chat_tokens.sort_index().equals(
+        whole.chat_tokens.sort_index())
+
+
+def test_merge_keeps_compact_dtypes(whatsapp):
+    stored = whatsapp.process_chat(io.BytesIO(OLD.encode()))
+    tail = whatsapp.process_chat(io.BytesIO(NEW.encode()))
+    merged = merge_chats(stored, tail)
+    assert merged.raw_df['message'].dtype == stored.raw_df['message'].dtype
+    assert list(merged.raw_df['name'].cat.categories) == [
+        'Furiosa', 'Max', 'Nux']
+    # Weekdays keep their calendar order
+    assert list(merged.day_df['day'].cat.categories) == list(
+        stored.day_df['day'].cat.categories)
+    assert list(merged.raw_df.index) == [0, 1, 2, 3, 4]
+    assert merged.raw_df['message'].iloc[-1] == \
+        'Where must we go\nwe who wander this wasteland'
+
+
+def test_continued_last_message_needs_full_parse(whatsapp):
+    stored = whatsapp.process_chat(io.BytesIO(OLD.encode()))
+    upload = io.BytesIO((OLD + "Am I awaited in Valhalla?\n" + NEW).encode())
+    assert whatsapp.tail_offset(
+        upload, len(OLD.encode()), _last_message(stored)) is None
+    assert upload.tell() == 0
+
+
+@pytest.mark.parametrize('chunk_size', [5, 64, 4096])
+def test_message_start_reads_backwards(whatsapp, monkeypatch, chunk_size):
+    monkeypatch.setattr(chat_eda, 'CHUNK_SIZE', chunk_size)
+    data = (OLD + "continued line\n\n" + NEW).encode()
+    end = len((OLD + "continued line\n\n").encode())
+    start = whatsapp.message_start(io.BytesIO(data), end)
+    assert data[start:].startswith(b'[22/01/21, 9:00:00 AM] Furiosa')
+    assert whatsapp.message_start(io.BytesIO(data), 0) is None
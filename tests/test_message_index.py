@@ -0,0 +1,80 @@
+"""Sorted message index backing the message browser"""
+import numpy as np
+import pandas as pd
+import pytest
+from processor.transformers.message_index import MessageIndex, page_frame
+
+RAW_DF = pd.DataFrame({
+    'datetime': pd.to_datetime([
+        '2021-01-03', '2021-01-01', '2021-01-02', '2021-01-01',
+        '2021-01-05', '2021-01-04']),
+    'name': ['Ann', 'Bob', 'Ann', 'Ann', 'Bob', 'Ann'],
+    'message': ['c', 'a1', 'b', 'a2', 'e', 'd']})
+NAMES = pd.Index(['Ann', 'Bob', 'Eve'])
+
+
+@pytest.fixture
+def index():
+    return MessageIndex.build(RAW_DF, NAMES)
+
+
+def _messages(rows):
+    return RAW_DF['message'].iloc[rows].tolist()
+
+
+def test_pages_in_timestamp_order(index):
+    assert len(index) == 6
+    # Same timestamps keep their export order
+    assert _messages(index.page(0, 4)) == ['a1', 'a2', 'b', 'c']
+    assert _messages(index.page(1, 4)) == ['d', 'e']
+    assert _messages(index.page(2, 4)) == []
+    assert index.page_count(4) == 2
+
+
+def test_member_pages(index):
+    assert index.count('Ann') == 4 and index.count('Eve') == 0
+    assert _messages(index.page(0, 3, 'Ann')) == ['a2', 'b', 'c']
+    assert _messages(index.page(1, 3, 'Ann')) == ['d']
+    assert _messages(index.page(0, 3, 'Bob')) == ['a1', 'e']
+    assert index.page_count(3, 'Eve') == 1
+    assert _messages(index.page(0, 3, 'Eve')) == []
+
+
+def test_locate(index):
+    assert index.locate(pd.Timestamp('2021-01-02')) == 2
+    assert index.locate(pd.Timestamp('2021-01-02'), 'Bob') == 1
+    assert index.locate(pd.Timestamp('2021-01-02 12:00'), 'Ann') == 2
+    assert index.locate(pd.Timestamp('2022-01-01')) == 6
+    assert index.locate_page(pd.Timestamp('2022-01-01'), 4) == 1
+    assert index.locate_page(pd.Timestamp('2021-01-04'), 2, 'Ann') == 1
+
+
+def test_matches_sorted_chat(processed_chat):
+    raw_df = processed_chat.raw_df
+    index = MessageIndex.build(raw_df, processed_chat.members.index)
+    expected = raw_df.sort_values('datetime', kind='stable')
+    assert np.array_equal(
+        raw_df.index.take(index.page(0, len(raw_df))), expected.index)
+    member = processed_chat.members.index[0]
+    rows = index.page(0, len(raw_df), member)
+    assert raw_df.index.take(rows).tolist() == expected.index[
+        expected['name'] == member].tolist()
+
+
+def test_page_frame_reads_only_the_page(processed_chat, monkeypatch):
+    raw_df = processed_chat.raw_df
+    index = MessageIndex.build(raw_df, processed_chat.members.index)
+    rows = index.page(3, 10)
+    selected = []
+    getitem = pd.DataFrame.__getitem__
+
+    def recording(frame, key):
+        if isinstance(key, list):
+            selected.append(len(frame))
+        return getitem(frame, key)
+    monkeypatch.setattr(pd.DataFrame, '__getitem__', recording)
+    page = page_frame(raw_df, rows)
+    monkeypatch.undo()
+    assert selected and max(selected) == 10
+    assert page.columns.tolist() == ['datetime', 'name', 'message']
+    assert page.index.tolist() == raw_df.index.take(rows).tolist()
@@ -0,0 +1,57 @@
+"""
+One pass parsing of the supported export formats
+"""
+import pytest
+from processor.common.synthetic import EXPORT_FORMATS, SyntheticConfig,\
+    iter_chat_lines
+
+
+@pytest.mark.parametrize('export_format', sorted(EXPORT_FORMATS))
+def test_detect_format_of_every_export(whatsapp, export_format):
+    lines = list(iter_chat_lines(
+        SyntheticConfig(export_format=export_format, lines=60)))
+    pattern = whatsapp.detect_format(lines)
+    assert pattern is not None
+    assert pattern.match(lines[1])
+
+
+def test_detect_format_unknown(whatsapp):
+    assert whatsapp.detect_format(['hello', 'world']) is None
+
+
+def test_apply_regex_joins_continuation_lines(whatsapp):
+    data = (
+        "[20/01/21, 7:52:59 PM] Max: first line\n"
+        "second line\n"
+        "[21/01/21, 8:52:16 PM] Nux: witness me\n")
+    assert whatsapp.apply_regex(data) == [
+        ('[20/01/21, 7:52:59 PM]', 'Max', 'first line\nsecond line'),
+        ('[21/01/21, 8:52:16 PM]', 'Nux', 'witness me')]
+
+
+def test_apply_regex_keeps_blank_continuation_lines(whatsapp):
+    data = (
+        "[20/01/21, 7:52:59 PM] Max: first line\n"
+        "\n"
+        "third line\n"
+        "\n"
+        "[21/01/21, 8:52:16 PM] Nux: witness me\n"
+        "\n")
+    messages = whatsapp.apply_regex(data)
+    assert [message[2] for message in messages] == [
+        'first line\n\nthird line', 'witness me']
+
+
+def test_system_event_closes_message(whatsapp):
+    data = (
+        "20/01/21, 7:52 PM - Max: hello\n"
+        "20/01/21, 7:53 PM - Nux joined using this group's invite link\n"
+        "stray line\n"
+        "20/01/21, 7:54 PM - Nux: hi\n")
+    messages = whatsapp.apply_regex(data)
+    assert [message[1:] for message in messages] == [
+        ('Max', 'hello'), ('Nux', 'hi')]
+
+
+def test_apply_regex_unknown_format(whatsapp):
+    assert whatsapp.apply_regex("no chat here\n") == []
@@ -0,0 +1,86 @@
+"""Stage records and process wide allocation tracing of the profilers"""
+import threading
+import tracemalloc
+import pytest
+from processor.common import profiling
+
+
+@pytest.fixture(autouse=True)
+def stopped():
+    yield
+    profiling.stop()
+    assert profiling._TRACING['profilers'] == 0
+
+
+def test_stages_off_without_profiler():
+    with profiling.stage('idle') as probe:
+        probe.rows = 3
+    assert profiling.active() is None
+
+
+def test_nested_stages_and_rows():
+    profiler = profiling.start()
+
+    @profiling.profiled('listing')
+    def listing():
+        return [1, 2, 3]
+
+    with profiling.stage('outer'):
+        listing()
+    frame = profiler.frame()
+    assert frame['stage'].tolist() == ['outer', '  listing']
+    assert frame['rows'].tolist()[1] == 3
+    assert profiling.stop() is profiler
+
+
+def test_nested_peak_includes_child():
+    profiler = profiling.start(memory=True)
+    with profiling.stage('outer'):
+        with profiling.stage('inner'):
+            block = bytearray(8 * 2 ** 20)
+            del block
+    profiling.stop()
+    peaks = profiler.frame().set_index('stage')['peak_megabytes']
+    assert peaks['  inner'] > 7.5
+    assert peaks['outer'] >= peaks['  inner']
+    assert not tracemalloc.is_tracing()
+
+
+def test_tracing_shared_between_threads():
+    """One session stopping keeps tracing and the peak of the other"""
+    main = profiling.start(memory=True)
+    started, stopped = threading.Event(), threading.Event()
+
+    def other_session():
+        profiling.start(memory=True)
+        with profiling.stage('other'):
+            started.set()
+            stopped.wait()
+        profiling.stop()
+
+    with profiling.stage('outer'):
+        block = bytearray(8 * 2 ** 20)
+        del block
+        thread = threading.Thread(target=other_session)
+        thread.start()
+        started.wait()
+        # The other session's stage must not reset this stage's peak
+        with profiling.stage('inner'):
+            pass
+        stopped.set()
+        thread.join()
+        assert tracemalloc.is_tracing()
+    profiling.stop()
+    peaks = main.frame().set_index('stage')['peak_megabytes']
+    assert peaks['outer'] > 7.5
+    assert not tracemalloc.is_tracing()
+
+
+def test_external_tracing_left_running():
+    tracemalloc.start()
+    try:
+        profiling.start(memory=True)
+        profiling.stop()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
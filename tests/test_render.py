@@ -0,0 +1,53 @@
+"""Concurrent chart rendering and recovery from a broken render pool"""
+import os
+import pytest
+from processor.graphs import charts
+
+PNG = b'\x89PNG'
+
+
+def blank_chart(path=None):
+    """Blank figure, the worker dies the first time path is missing"""
+    if path is not None and not os.path.exists(path):
+        open(path, 'w').close()
+        os._exit(1)
+    fig = charts.new_figure(figsize=(1, 1))
+    fig.subplots()
+    return fig
+
+
+@pytest.fixture
+def pooled(monkeypatch):
+    # Workers are forked and look the chart up by name
+    monkeypatch.setitem(charts.MATPLOTLIB_CHARTS, 'blank', blank_chart)
+    monkeypatch.setattr(charts.os, 'cpu_count', lambda: 2)
+    charts.render_pool.cache_clear()
+    yield
+    charts.render_pool(2).shutdown()
+    charts.render_pool.cache_clear()
+
+
+def test_inline_rendering(processed_chat):
+    images = dict(charts.render_charts(
+        {'a': ('most_active_day', (processed_chat.time_cube,), {})}, 4))
+    assert images['a'].startswith(PNG)
+
+
+def test_pool_rendering(pooled):
+    jobs = {key: ('blank', (), {}) for key in 'abc'}
+    images = dict(charts.render_charts(jobs, 2))
+    assert sorted(images) == ['a', 'b', 'c']
+    assert all(image.startswith(PNG) for image in images.values())
+
+
+def test_broken_pool_replaced(pooled, tmp_path):
+    flag = str(tmp_path / 'died')
+    jobs = {'a': ('blank', (flag,), {}), 'b': ('blank', (), {})}
+    images = dict(charts.render_charts(jobs, 2))
+    assert os.path.exists(flag)
+    assert sorted(images) == ['a', 'b']
+    # Later renders use the new pool
+    images = dict(charts.render_charts(
+        {key: ('blank', (), {}) for key in 'cd'}, 2))
+    assert sorted(images) == ['c', 'd']
+
@@ -0,0 +1,64 @@
+"""Full-text inverted index over the Word Cloud text"""
+import pandas as pd
+import pytest
+from processor.transformers.search import SearchIndex, parse_query
+
+RAW_DF = pd.DataFrame({
+    'datetime': pd.to_datetime([
+        '2021-01-04', '2021-01-01', '2021-01-02', '2021-01-03']),
+    'name': ['Ann', 'Bob', 'Ann', 'Bob'],
+    'message': [
+        'Witness me on the fury road', '<Media omitted>',
+        'The road to Valhalla', 'fury and road warriors']},
+    index=[10, 11, 12, 13])
+NAMES = pd.Index(['Ann', 'Bob'])
+
+
+@pytest.fixture
+def index():
+    cloud_df = RAW_DF.drop(11).assign(
+        message=lambda frame: frame['message'].str.lower())
+    return SearchIndex.build(RAW_DF, cloud_df, NAMES)
+
+
+def test_parse_query():
+    assert parse_query('Fury "the ROAD" war* "me"') == [
+        ('keyword', ['fury']), ('phrase', ['the', 'road']),
+        ('prefix', ['war']), ('keyword', ['me'])]
+    assert parse_query('  ""  ') == []
+
+
+def test_keyword_prefix_and_phrase(index):
+    assert index.keyword('road').tolist() == [0, 2, 3]
+    assert index.keyword('media').tolist() == []
+    assert index.prefix('war').tolist() == [3]
+    assert index.prefix('valh').tolist() == [2]
+    assert index.phrase(['fury', 'road']).tolist() == [0]
+    assert index.phrase(['road', 'fury']).tolist() == []
+
+
+def test_search_results_in_timestamp_order(index):
+    assert index.search('road').tolist() == [2, 3, 0]
+    assert index.search('road fury').tolist() == [3, 0]
+    assert index.search('"the road"').tolist() == [2]
+    assert index.search('"the fury road"').tolist() == [0]
+    assert index.search('').tolist() == []
+
+
+def test_search_filters(index):
+    assert index.search('road', members=['Ann']).tolist() == [2, 0]
+    assert index.search(
+        'road', start=pd.Timestamp('2021-01-03'),
+        end=pd.Timestamp('2021-01-04')).tolist() == [3]
+    assert index.member_counts(index.search('road')).to_dict() == {
+        'Ann': 2, 'Bob': 1}
+
+
+def test_matches_a_scan_of_the_chat(processed_chat):
+    chat = processed_chat
+    index = SearchIndex.build(chat.raw_df, chat.cloud_df, chat.members.index)
+    term = chat.chat_tokens.sort_values().index[-1].lower()
+    found = set(chat.raw_df.index.take(index.search(term)))
+    words = chat.cloud_df['message'].str.lower().str.findall(r"\w[\w']*")
+    expected = {row for row, tokens in words.items() if term in tokens}
+    assert found == expected
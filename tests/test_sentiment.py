@@ -0,0 +1,53 @@
+"""
+Lexicon scoring, negation and the shared score cache
+"""
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import pytest
+from processor.transformers import sentiment
+from processor.transformers.sentiment import lexicon_scores, score_messages
+
+
+def test_contracted_negation_flips_polarity():
+    scores = lexicon_scores(pd.Series([
+        "this isn't good", "this is not good", "this is good",
+        "I don't know"]))
+    assert scores[0] == pytest.approx(scores[1])
+    assert scores[0] < 0 < scores[2]
+    assert scores[3] == 0
+
+
+def test_texts_without_lexicon_words_score_zero():
+    scores = lexicon_scores(
+        pd.Series(['', '12345', 'guzzoline'], index=[3, 5, 7]))
+    assert scores.to_dict() == {3: 0.0, 5: 0.0, 7: 0.0}
+
+
+def test_scores_are_cached_by_text():
+    texts = pd.Series(['what a lovely day', 'awful road', 'what a lovely day'])
+    first = score_messages(texts, mode='lexicon')
+    assert first[0] == first[2]
+    key = ('lexicon', sentiment._digest('awful road'))
+    assert sentiment._SCORES[key] == first[1]
+    assert score_messages(texts, mode='lexicon').equals(first)
+
+
+def test_concurrent_sessions_share_the_cache():
+    texts = pd.Series([f'good day number {i}' for i in range(500)])
+    expected = lexicon_scores(texts)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(
+            lambda _: score_messages(texts, mode='lexicon'), range(8)))
+    for result in results:
+        assert result.equals(expected)
+
+
+def test_pool_scores_equal_inline_scores():
+    texts = pd.Series([f'a really nice message {i}' for i in range(40)] +
+                      ['not bad at all', 'terrible'])
+    inline = sentiment._textblob_batch(list(texts))
+    pooled = sentiment._pool_scores(
+        [list(texts[:20]), list(texts[20:])], workers=2)
+    assert pooled == pytest.approx(inline)
+    # The pool outlives the call and is reused
+    assert sentiment.scoring_pool(2) is sentiment.scoring_pool(2)
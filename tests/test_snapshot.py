@@ -0,0 +1,93 @@
+"""
+Columnar snapshots of processed chats
+"""
+import io
+import os
+import json
+import threading
+import numpy as np
+import pandas as pd
+from processor.common.snapshot import SnapshotStore, describe_upload
+from processor.transformers.aggregates import TimeCube
+
+
+def _plain(frame):
+    """Frame as text, list cells read back as arrays compare as lists"""
+    return frame.apply(lambda column: column.map(
+        lambda cell: str(list(cell)) if isinstance(
+            cell, (list, np.ndarray)) else str(cell)))
+
+
+def _assert_same_chat(loaded, chat):
+    for field, value in zip(chat._fields, chat):
+        restored = getattr(loaded, field)
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(_plain(restored), _plain(value))
+        elif isinstance(value, pd.Series):
+            pd.testing.assert_series_equal(restored, value, check_dtype=False)
+        elif isinstance(value, TimeCube):
+            assert restored.per_date().equals(value.per_date())
+            assert (restored.members == value.members).all()
+        else:
+            assert restored == value
+
+
+def test_round_trip(tmp_path, whatsapp, synthetic_chat, processed_chat):
+    store = SnapshotStore(str(tmp_path), 100)
+    upload = describe_upload(whatsapp, io.BytesIO(synthetic_chat))
+    store.save('chat', processed_chat, upload)
+    _assert_same_chat(store.load('chat'), processed_chat)
+    assert store.upload_size('chat') == len(synthetic_chat)
+    assert store.load('missing') is None
+
+
+def test_snapshot_of_older_layout_is_dropped(tmp_path, processed_chat):
+    store = SnapshotStore(str(tmp_path), 100)
+    store.save('chat', processed_chat)
+    meta_path = os.path.join(str(tmp_path), 'chat', 'meta.json')
+    with open(meta_path, encoding='utf-8') as handle:
+        meta = json.load(handle)
+    del meta['fields']['links']
+    with open(meta_path, 'w', encoding='utf-8') as handle:
+        json.dump(meta, handle)
+    assert store.load('chat') is None
+    assert not os.path.exists(os.path.join(str(tmp_path), 'chat'))
+
+
+def test_snapshot_of_older_version_is_dropped(tmp_path, processed_chat):
+    store = SnapshotStore(str(tmp_path), 100)
+    store.save('chat', processed_chat)
+    meta_path = os.path.join(str(tmp_path), 'chat', 'meta.json')
+    with open(meta_path, encoding='utf-8') as handle:
+        meta = json.load(handle)
+    del meta['version']
+    with open(meta_path, 'w', encoding='utf-8') as handle:
+        json.dump(meta, handle)
+    assert store.load('chat') is None
+
+
+def test_stores_of_one_folder_share_a_lock(tmp_path):
+    first = SnapshotStore(str(tmp_path), 100)
+    second = SnapshotStore(os.path.join(str(tmp_path), '.'), 100)
+    assert first._lock is second._lock
+
+
+def test_eviction_never_breaks_a_load(tmp_path, processed_chat):
+    # Budget below two snapshots, every save evicts the older ones
+    store = SnapshotStore(str(tmp_path), 0.001)
+    store.save('reader', processed_chat)
+    failures = []
+
+    def read():
+        for _ in range(20):
+            loaded = SnapshotStore(str(tmp_path), 0.001).load('reader')
+            if loaded is not None and len(loaded.raw_df) != \
+                    len(processed_chat.raw_df):
+                failures.append(loaded)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for number in range(10):
+        store.save(f'writer{number}', processed_chat)
+    reader.join()
+    assert failures == []
@@ -0,0 +1,38 @@
+"""Stopword index read once per process and language detection"""
+import pytest
+from processor.common.stopwords import (
+    stopword_index, stopwords_for, detect_languages)
+from conftest import ROOT
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    # The stopword folder is relative to the app directory
+    monkeypatch.chdir(ROOT)
+
+
+def test_index_read_once_and_immutable():
+    index = stopword_index()
+    assert index is stopword_index()
+    assert {'english', 'french', 'german', 'spanish'} <= set(index)
+    assert isinstance(index['french'], frozenset)
+    with pytest.raises(TypeError):
+        index['klingon'] = frozenset()
+
+
+def test_stopwords_for_languages():
+    english = stopwords_for(('english',))
+    both = stopwords_for(('english', 'french'))
+    assert 'the' in english and 'les' not in english
+    assert english < both and 'les' in both
+    assert stopwords_for(('english', 'klingon')) == english
+    assert stopwords_for(('english',)) is english
+    assert stopwords_for() >= both
+
+
+def test_detect_languages():
+    french = ['le chat et la souris sont dans les maisons avec nous'] * 20
+    assert detect_languages(french) == ('french',)
+    english = ['the cat and the mouse are in the house with them'] * 20
+    assert 'english' in detect_languages(english)
+    assert detect_languages(['xq zzv', 'qqq']) == ('english',)
@@ -0,0 +1,44 @@
+"""
+Chunked ingestion folded into running statistics
+"""
+import io
+import pandas as pd
+from processor.transformers.chat_eda import iter_lines, statistics
+
+
+def test_iter_lines_across_chunk_edges():
+    data = 'first\nsecond ✨ line\r\nthird'.encode()
+    assert list(iter_lines(io.BytesIO(data), chunk_size=3)) == [
+        'first', 'second ✨ line\r', 'third']
+
+
+def test_batches_end_on_message_boundaries(whatsapp, synthetic_chat):
+    batches = list(whatsapp.iter_batches(
+        io.BytesIO(synthetic_chat), chunk_size=1024, batch_messages=500))
+    whole = next(whatsapp.iter_batches(
+        io.BytesIO(synthetic_chat), batch_messages=10 ** 6))
+    assert len(batches) > 1
+    joined = pd.concat(batches)
+    assert list(joined.index) == list(range(len(whole)))
+    assert list(joined['message']) == list(whole['message'])
+
+
+def test_chunk_size_does_not_change_statistics(whatsapp, synthetic_chat):
+    small = whatsapp.process_stream(io.BytesIO(synthetic_chat), 997)
+    large = whatsapp.process_stream(io.BytesIO(synthetic_chat))
+    assert small[2] == large[2]
+    assert small[0]['message'].equals(large[0]['message'])
+
+
+def test_folded_statistics_equal_whole_chat(whatsapp, synthetic_chat):
+    raw_df, data_frame, stats, _, _ = whatsapp.process_stream(
+        io.BytesIO(synthetic_chat))
+    assert stats == statistics(raw_df, data_frame)
+
+
+def test_statistics_only_stream(whatsapp, synthetic_chat):
+    raw_df, data_frame, stats, links, cloud_df = whatsapp.process_stream(
+        io.BytesIO(synthetic_chat), keep_frames=False)
+    assert raw_df is None and data_frame is None
+    assert links is None and cloud_df is None
+    assert stats == whatsapp.process_stream(io.BytesIO(synthetic_chat))[2]
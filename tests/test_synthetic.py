@@ -0,0 +1,71 @@
+"""Synthetic exports and the benchmark comparison"""
+import io
+import pytest
+import benchmark
+from processor.common.synthetic import (
+    EXPORT_FORMATS, GROUP_NAME, SyntheticConfig, iter_chat_lines,
+    write_chat, member_names)
+
+
+def test_equal_configs_give_equal_exports():
+    config = SyntheticConfig(lines=500)
+    assert list(iter_chat_lines(config)) == list(iter_chat_lines(config))
+    assert list(iter_chat_lines(config._replace(seed=1))) != \
+        list(iter_chat_lines(config))
+
+
+def test_write_chat_line_count():
+    buffer = io.BytesIO()
+    written = write_chat(buffer, SyntheticConfig(lines=1234))
+    assert written == len(buffer.getvalue())
+    assert buffer.getvalue().decode('utf-8').count('\n') == 1234
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        iter_chat_lines(SyntheticConfig(export_format='nokia'))
+
+
+def test_member_names_distinct():
+    names = member_names(60)
+    assert len(set(names)) == 60
+
+
+@pytest.mark.parametrize('export_format', sorted(EXPORT_FORMATS))
+def test_every_format_processes(whatsapp, export_format):
+    buffer = io.BytesIO()
+    write_chat(buffer, SyntheticConfig(
+        export_format=export_format, lines=2000, members=5))
+    buffer.seek(0)
+    chat = whatsapp.process_chat(buffer)
+    assert chat is not None
+    # The opening notice is written in the name of the group
+    assert set(chat.members.index) <= {GROUP_NAME, *member_names(5)}
+    assert chat.stats['group_name'] == GROUP_NAME
+    assert chat.stats['media_message'] > 0
+    assert chat.stats['link_shared'] > 0
+
+
+def _result(seconds, megabytes):
+    return {'cases': {'android-10': {'stages': {
+        'parse': {'seconds': seconds, 'peak_megabytes': megabytes}}}}}
+
+
+def test_compare_flags_regressions_beyond_noise():
+    _, regressed = benchmark.compare(
+        _result(1.0, 100.0), _result(1.5, 100.0), 0.2)
+    assert regressed['stage'].tolist() == ['parse']
+    _, regressed = benchmark.compare(
+        _result(1.0, 100.0), _result(1.1, 150.0), 0.2)
+    assert regressed['stage'].tolist() == ['parse']
+    # Slower by less than MIN_SECONDS is noise
+    _, regressed = benchmark.compare(
+        _result(0.001, 1.0), _result(0.005, 1.0), 0.2)
+    assert regressed.empty
+
+
+def test_generate_command(tmp_path):
+    output = tmp_path / 'chat.txt'
+    assert benchmark.main([
+        'generate', str(output), '--format', 'ios', '--lines', '100']) == 0
+    assert output.read_text(encoding='utf-8').count('\n') == 100
@@ -0,0 +1,70 @@
+"""
+Time cube answers against value_counts over the message rows
+"""
+import pandas as pd
+from processor.transformers.aggregates import TimeCube
+
+
+def _counts(series):
+    return series.value_counts().sort_index()
+
+
+def test_cube_matches_value_counts(config, processed_chat):
+    data_frame = processed_chat.data_frame
+    cube = TimeCube.build(data_frame, config['whatsapp']['weeks'])
+    stamps = data_frame['datetime']
+    assert cube.per_hour().sort_index().equals(_counts(stamps.dt.hour))
+    assert cube.per_day_of_month().sort_index().equals(
+        _counts(stamps.dt.day))
+    minutes = stamps.dt.strftime('%H:%M')
+    assert cube.per_minute().to_dict() == _counts(minutes).to_dict()
+    weekdays = stamps.dt.weekday.map(config['whatsapp']['weeks'])
+    assert cube.per_weekday().to_dict() == _counts(weekdays).to_dict()
+    dates = cube.per_date()
+    assert dates[dates > 0].to_dict() == _counts(stamps.dt.normalize())\
+        .to_dict()
+    assert cube.per_member().to_dict() == _counts(
+        data_frame['name'].astype(object)).to_dict()
+
+
+def test_empty_buckets_are_left_out(config):
+    data_frame = pd.DataFrame({
+        'datetime': pd.to_datetime(['2021-01-04 10:15', '2021-01-04 10:45']),
+        'name': ['Max', 'Nux']})
+    cube = TimeCube.build(data_frame, config['whatsapp']['weeks'])
+    assert cube.per_hour().to_dict() == {10: 2}
+    assert cube.per_weekday().to_dict() == {'Monday': 2}
+    assert cube.per_day_of_month().to_dict() == {4: 2}
+    assert cube.per_minute().to_dict() == {'10:15': 1, '10:45': 1}
+
+
+def test_merge_equals_build_of_both(config, processed_chat):
+    data_frame = processed_chat.data_frame
+    weeks = config['whatsapp']['weeks']
+    half = len(data_frame) // 2
+    merged = TimeCube.build(data_frame.iloc[:half], weeks).merge(
+        TimeCube.build(data_frame.iloc[half:], weeks))
+    whole = TimeCube.build(data_frame, weeks)
+    assert merged.per_date().equals(whole.per_date())
+    assert merged.per_minute().equals(whole.per_minute())
+    assert merged.per_member().sort_index().equals(
+        whole.per_member().sort_index())
+
+
+def test_between_slices_dates(config, processed_chat):
+    data_frame = processed_chat.data_frame
+    cube = TimeCube.build(data_frame, config['whatsapp']['weeks'])
+    first, last = cube.dates[3], cube.dates[10]
+    part = cube.between(first, last)
+    stamps = data_frame['datetime']
+    inside = (stamps >= first) & (stamps < last + pd.Timedelta(days=1))
+    assert part.per_date().sum() == inside.sum()
+    assert part.per_hour().to_dict() == _counts(
+        stamps[inside].dt.hour).to_dict()
+
+
+def test_empty_cube(config):
+    cube = TimeCube.build(
+        pd.DataFrame({'datetime': pd.to_datetime([]), 'name': []}),
+        config['whatsapp']['weeks'])
+    assert cube.per_hour().empty and cube.per_date().empty
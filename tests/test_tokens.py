@@ -0,0 +1,61 @@
+"""Token frequency tables behind the Word Clouds"""
+import pandas as pd
+from wordcloud import WordCloud, STOPWORDS
+from processor.transformers.aggregates import (
+    token_frequencies, chat_frequencies, member_frequencies, collocations)
+
+CLOUD_DF = pd.DataFrame({
+    'name': ['Ann', 'Bob', 'Ann'],
+    'message': [
+        "the cat's toy and the cat", "2021 was the year", "don't stop"]})
+
+
+def test_token_frequencies_follow_wordcloud_tokens():
+    frequencies = token_frequencies(CLOUD_DF)
+    assert frequencies.index.names == ['name', 'token']
+    assert frequencies.to_dict() == {
+        ('Ann', 'and'): 1, ('Ann', 'cat'): 2, ('Ann', "don't"): 1,
+        ('Ann', 'stop'): 1, ('Ann', 'the'): 2, ('Ann', 'toy'): 1,
+        ('Bob', 'the'): 1, ('Bob', 'was'): 1, ('Bob', 'year'): 1,
+        # Bigrams stay inside their message, numbers are skipped
+        ('Ann', 'the cat'): 2, ('Ann', 'cat toy'): 1, ('Ann', 'toy and'): 1,
+        ('Ann', 'and the'): 1, ('Ann', "don't stop"): 1,
+        ('Bob', 'was the'): 1, ('Bob', 'the year'): 1}
+
+
+def test_chat_and_member_tables():
+    frequencies = token_frequencies(CLOUD_DF)
+    assert chat_frequencies(frequencies)['the'] == 3
+    assert member_frequencies(frequencies, 'Bob').to_dict() == {
+        'the': 1, 'was': 1, 'year': 1, 'was the': 1, 'the year': 1}
+    assert member_frequencies(frequencies, 'Eve').empty
+
+
+def test_processed_chat_tables(processed_chat):
+    chat = processed_chat
+    assert chat.tokens.sum() == chat.chat_tokens.sum()
+    pd.testing.assert_series_equal(
+        chat.chat_tokens, chat_frequencies(chat.tokens))
+    assert set(chat.tokens.index.get_level_values('name')) <= set(
+        chat.cloud_df['name'])
+
+
+def test_collocations_match_wordcloud():
+    text = ' '.join(
+        ['fury road convoy engine chrome'] * 40 +
+        ['desert storm ahead of the rig', 'engine road fury storm'] * 30)
+    cloud_df = pd.DataFrame({'name': ['Max'], 'message': [text]})
+    stopwords = frozenset(STOPWORDS)
+    counts = collocations(
+        chat_frequencies(token_frequencies(cloud_df)), stopwords)
+    expected = WordCloud(
+        stopwords=stopwords, normalize_plurals=False).process_text(text)
+    assert counts.to_dict() == expected
+    assert any(' ' in token for token in expected)
+
+
+def test_collocations_drop_stopwords_and_rare_pairs():
+    frequencies = token_frequencies(CLOUD_DF).groupby(level='token').sum()
+    counts = collocations(frequencies, frozenset(['the', 'and', 'was']))
+    assert counts.to_dict() == {
+        'cat': 2, "don't": 1, 'stop': 1, 'toy': 1, 'year': 1}
@@ -0,0 +1,120 @@
+"""Chat sources of plain text and zip uploads, attachment usage"""
+import io
+import zipfile
+import pandas as pd
+import pytest
+from processor.common.cache import LRUCache, content_hash
+from processor.common.uploads import (
+    ChatSource, collect_sources, open_source, parse_source,
+    attachment_usage)
+from processor.transformers.chat_eda import WhatsAppConfig
+
+CHAT = (
+    "[20/01/21, 7:52:59 PM] Ann: hello\n"
+    "[20/01/21, 7:53:10 PM] Bob: <attached: 00000012-PHOTO-a.jpg>\n"
+    "[21/01/21, 8:00:00 AM] Ann: bye\n").encode('utf-8')
+
+
+class Upload(io.BytesIO):
+    """Stand-in for a streamlit UploadedFile"""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+
+def _archive(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def source_config(config):
+    return WhatsAppConfig(**config['whatsapp'])
+
+
+def test_plain_text_source(source_config):
+    upload = Upload('chat.txt', CHAT)
+    sources, attachments = collect_sources(
+        [upload], source_config, LRUCache(2 ** 20))
+    assert sources == [ChatSource(
+        'chat.txt', content_hash(io.BytesIO(CHAT), source_config), None,
+        upload)]
+    assert attachments == {}
+    with open_source(sources[0]) as stream:
+        assert stream.read() == CHAT
+    assert not upload.closed
+
+
+def test_archive_members_streamed(source_config):
+    photo = b'\xff' * 5000
+    upload = Upload('export.zip', _archive({
+        'Group/_chat.txt': CHAT,
+        'Group/00000012-PHOTO-a.jpg': photo,
+        'Group/notes.pdf': b'%PDF'}))
+    sources, attachments = collect_sources(
+        [upload], source_config, LRUCache(2 ** 20))
+    assert [(s.label, s.member) for s in sources] == [
+        ('export.zip/_chat.txt', 'Group/_chat.txt')]
+    assert sources[0].key == content_hash(io.BytesIO(CHAT), source_config)
+    with open_source(sources[0]) as stream:
+        assert isinstance(stream, zipfile.ZipExtFile)
+        assert stream.read() == CHAT
+        stream.seek(10)
+        assert stream.read() == CHAT[10:]
+    assert stream.closed
+    index = attachments['export.zip/_chat.txt']
+    assert index.set_index('file')['kind'].to_dict() == {
+        '00000012-PHOTO-a.jpg': 'image', 'notes.pdf': 'document'}
+    assert index.set_index('file').loc['00000012-PHOTO-a.jpg', 'size'] \
+        == len(photo)
+
+
+def test_reruns_read_nothing(source_config, monkeypatch):
+    listings = LRUCache(2 ** 20)
+    data = _archive({'_chat.txt': CHAT})
+    first, _ = collect_sources(
+        [Upload('export.zip', data)], source_config, listings)
+
+    def unread(*args):
+        raise AssertionError("upload read on a rerun")
+    # Streamlit hands out a new file object of the same upload
+    upload = Upload('export.zip', data)
+    monkeypatch.setattr(upload, 'read', unread)
+    monkeypatch.setattr(
+        'processor.common.uploads.content_hash', unread)
+    again, _ = collect_sources([upload], source_config, listings)
+    assert [source.key for source in again] == [
+        source.key for source in first]
+    assert again[0].upload is upload
+
+
+def test_parse_source(config):
+    chat, upload = parse_source('chat.txt', CHAT, config['whatsapp'])
+    assert len(chat.raw_df) == 3
+    assert upload is not None
+
+
+def test_attachment_usage_ios_and_android():
+    raw_df = pd.DataFrame({
+        'name': ['Ann', 'Bob', 'Bob', 'Ann'],
+        'message': [
+            '<attached: 00000012-PHOTO-a.jpg>',
+            '‎IMG-20210201-WA0001.jpg (file attached)',
+            'Trip plan.pdf (file attached)',
+            'no attachment here']})
+    attachments = pd.DataFrame({
+        'file': [
+            '00000012-PHOTO-a.jpg', 'IMG-20210201-WA0001.jpg',
+            'Trip plan.pdf'],
+        'size': [2 ** 20, 2 ** 21, 2 ** 19],
+        'kind': ['image', 'image', 'document']})
+    usage = attachment_usage(raw_df, attachments)
+    assert usage.set_index(['name', 'kind'])['files'].to_dict() == {
+        ('Ann', 'image'): 1, ('Bob', 'image'): 1, ('Bob', 'document'): 1}
+    assert usage.set_index(['name', 'kind'])['megabytes'].to_dict() == {
+        ('Ann', 'image'): 1.0, ('Bob', 'image'): 2.0,
+        ('Bob', 'document'): 0.5}